@@ -0,0 +1,559 @@
+# AdviseeMatrix cohort analytics
+#
+# Department-level figures over every saved matrix: pass rates per course,
+# GPA distributions per major section and the students still blocked on a
+# required course. Matrices are copied out of the matrix store into a
+# columnar dataset in $ADVISEE_ANALYTICS_DIR (default: analytics/ next to
+# this module) and queried with DuckDB:
+#
+# - slots: one Parquet file per major, one row per course taken (Completed
+#   or In Progress), with credits and quality points precomputed from the
+#   catalog's grading scale. Rows are sorted by course code, so a query for
+#   one course only reads the row groups whose code range contains it;
+# - students: student_id, major and save time of every matrix;
+# - aggregates: per major course outcomes, section GPA histograms and
+#   student counts.
+#
+# manifest.json names the current files. A refresh only reads the matrices
+# saved since the previous one (the store indexes updated_at) and rewrites
+# the slot files and aggregates of the majors those students are or were
+# in; the new manifest replaces the old one atomically, so readers never see
+# a half-written dataset. The dashboards read only the aggregate files, and
+# query results are cached per dataset generation.
+#
+# Refreshes run from a scheduled job (the refresh command below) or on a
+# background thread the dashboard starts when the dataset is older than
+# REFRESH_INTERVAL; the dashboard itself only reads the last dataset and
+# shows when it was refreshed.
+#
+# Usage:
+#   python advisee_analytics.py refresh [--full]
+#   python advisee_analytics.py pass-rates [--major KEY] [--limit 50]
+#   python advisee_analytics.py gpa --major KEY
+#   python advisee_analytics.py blocked BIOL2373 [--major KEY]
+
+import argparse
+import csv
+import fcntl
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import duckdb
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from advisee_catalog import get_catalog
+from advisee_store import get_store
+
+ANALYTICS_DIR_ENV = 'ADVISEE_ANALYTICS_DIR'
+DEFAULT_ANALYTICS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'analytics')
+
+TAKEN_STATUSES = ('Completed', 'In Progress')
+# A completed course passes unless it has one of these grades
+FAILING_GRADES = ('F',)
+GPA_BUCKET = 0.5
+
+SLOT_SCHEMA = pa.schema([
+    ('student_id', pa.string()),
+    ('major', pa.string()),
+    ('section', pa.string()),
+    ('slot', pa.int16()),
+    ('code', pa.string()),
+    ('credits', pa.int16()),
+    ('grade', pa.string()),
+    ('status', pa.string()),
+    ('earned_credits', pa.int16()),
+    ('gpa_credits', pa.int16()),
+    ('qp', pa.float64()),
+    ('passed', pa.bool_())
+])
+STUDENT_SCHEMA = pa.schema([('student_id', pa.string()), ('major', pa.string()), ('updated_at', pa.float64())])
+
+# Slot rows held in memory before they are written to the staging file
+STAGING_ROWS = 200_000
+ROW_GROUP_SIZE = 65_536
+# Matrices saved this many seconds before the previous refresh are read
+# again, in case their write-behind batch was committed after it
+REFRESH_OVERLAP = 60
+# Seconds between the refreshes the analytics page triggers
+REFRESH_INTERVAL = 300
+CACHE_SIZE = 256
+
+logger = logging.getLogger('advisee.analytics')
+
+# Per major aggregates over the slot files: their columns as a typed empty
+# row, and the queries computing them
+AGGREGATES = {
+    'course_stats': "NULL::VARCHAR AS major, NULL::VARCHAR AS code, 0::BIGINT AS attempts, 0::BIGINT AS passed,"
+                    " 0::BIGINT AS in_progress, 0::BIGINT AS passed_students, 0::BIGINT AS in_progress_students",
+    'section_gpa': "NULL::VARCHAR AS major, NULL::VARCHAR AS section, 0::DOUBLE AS bucket, 0::BIGINT AS students"
+}
+AGGREGATE_QUERIES = {
+    'course_stats': """
+        SELECT major, code,
+               count(*) FILTER (WHERE status = 'Completed' AND grade <> '') AS attempts,
+               count(*) FILTER (WHERE passed) AS passed,
+               count(*) FILTER (WHERE status = 'In Progress') AS in_progress,
+               count(DISTINCT student_id) FILTER (WHERE passed) AS passed_students,
+               count(DISTINCT student_id) FILTER (WHERE status = 'In Progress') AS in_progress_students
+        FROM read_parquet({slots}) GROUP BY major, code""",
+    # Section GPA of every student with graded courses in it, in buckets
+    'section_gpa': """
+        SELECT major, section, floor(qp / gpa_credits / {bucket}) * {bucket} AS bucket, count(*) AS students
+        FROM (SELECT major, section, student_id, sum(qp) AS qp, sum(gpa_credits) AS gpa_credits
+              FROM read_parquet({slots}) WHERE status = 'Completed'
+              GROUP BY major, section, student_id HAVING sum(gpa_credits) > 0)
+        GROUP BY major, section, bucket"""
+}
+
+
+def sql_string(value):
+    """A SQL string literal"""
+    return "'" + value.replace("'", "''") + "'"
+
+
+def sql_files(paths):
+    """A DuckDB list literal of Parquet file paths"""
+    return '[' + ', '.join(sql_string(path) for path in paths) + ']'
+
+
+def partition_name(major_key, generation):
+    return f"slots_{re.sub(r'[^A-Za-z0-9._-]', '_', major_key)}_{generation}.parquet"
+
+
+class SlotRows:
+    """Columns of slot rows collected from matrix records"""
+
+    def __init__(self, scale):
+        self.scale = scale
+        self.columns = {name: [] for name in SLOT_SCHEMA.names}
+
+    def __len__(self):
+        return len(self.columns['student_id'])
+
+    def add(self, record):
+        """Add the taken courses of one matrix record"""
+        scale, columns = self.scale, self.columns
+        student_id, major_key = record['student_id'], record['current_major']
+        for row_id, entry in record['course_entries'].items():
+            if entry.get('status') not in TAKEN_STATUSES:
+                continue
+            section, _, slot = row_id.rpartition('_')
+            grade_code = scale.encode(entry.get('grade') or '')
+            credits = int(entry.get('credits') or 0)
+            completed = entry['status'] == 'Completed' and grade_code != 0
+            counts_gpa = completed and scale.counts_gpa[grade_code]
+            columns['student_id'].append(student_id)
+            columns['major'].append(major_key)
+            columns['section'].append(section)
+            columns['slot'].append(int(slot))
+            columns['code'].append((entry.get('code') or '').strip().upper())
+            columns['credits'].append(credits)
+            columns['grade'].append(scale.decode(grade_code))
+            columns['status'].append(entry['status'])
+            columns['earned_credits'].append(credits if completed and scale.counts_credits[grade_code] else 0)
+            columns['gpa_credits'].append(credits if counts_gpa else 0)
+            columns['qp'].append(scale.quality_points(grade_code, credits) if counts_gpa else 0.0)
+            columns['passed'].append(completed and scale.decode(grade_code) not in FAILING_GRADES)
+
+    def take(self):
+        """The collected rows as an Arrow table; starts collecting afresh"""
+        table = pa.table(self.columns, schema=SLOT_SCHEMA)
+        self.columns = {name: [] for name in SLOT_SCHEMA.names}
+        return table
+
+
+class CohortAnalytics:
+    """Columnar copy of the matrix store and the cohort queries over it"""
+
+    def __init__(self, directory, store=None):
+        self.directory = directory
+        self.store = store
+        self.connection = duckdb.connect()
+        self.refresh_error = None
+        self._lock = threading.Lock()
+        self._refresher = None
+        self._refresher_lock = threading.Lock()
+        self._manifest = None
+        self._manifest_stamp = None
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    # -------------------------------------------------------------------------
+    # Refresh
+    # -------------------------------------------------------------------------
+
+    @contextmanager
+    def exclusive(self):
+        """Hold the dataset's lock file, so one process refreshes it at a time"""
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, open(self.path('.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def refresh(self, full=False):
+        """Bring the dataset up to date with the matrix store; returns what was done"""
+        started = time.perf_counter()
+        with self.exclusive():
+            manifest = self.manifest(reload=True)
+            scale = get_catalog().grading_scale
+            # Quality points are precomputed, so a new grading scale means a full rebuild
+            full = full or manifest is None or manifest['scale_version'] != scale.version
+            since = None if full else manifest['watermark'] - REFRESH_OVERLAP
+            generation = manifest['generation'] + 1 if manifest else 1
+            staging = tempfile.mkdtemp(prefix='.staging-', dir=self.directory)
+            try:
+                changed = self.stage(staging, since, scale)
+                if changed['students'] or full:
+                    manifest = self.rebuild(staging, manifest, generation, full, changed, scale)
+                else:
+                    # Nothing new, but the dataset is now known to be current
+                    manifest = dict(manifest, refreshed_at=time.time())
+                    self.write_manifest(manifest)
+            finally:
+                shutil.rmtree(staging, ignore_errors=True)
+        return {
+            'full': full,
+            'students_read': changed['students'],
+            'majors_rewritten': changed.get('majors', 0),
+            'generation': manifest['generation'] if manifest else 0,
+            'elapsed_s': round(time.perf_counter() - started, 3)
+        }
+
+    def refreshing(self):
+        """Whether a background refresh is running"""
+        return self._refresher is not None and self._refresher.is_alive()
+
+    def refresh_in_background(self, interval=REFRESH_INTERVAL):
+        """Start a refresh on a background thread when the dataset is older than interval seconds
+
+        Returns whether a refresh is running. At most one runs per process;
+        a scheduled refresh job keeps the dataset fresh enough that none starts.
+        """
+        with self._refresher_lock:
+            if self.refreshing():
+                return True
+            manifest = self.manifest()
+            if manifest is not None and time.time() - manifest['refreshed_at'] < interval:
+                return False
+            self._refresher = threading.Thread(target=self._refresh_logged, name='advisee-analytics-refresh',
+                                               daemon=True)
+            self._refresher.start()
+            return True
+
+    def _refresh_logged(self):
+        try:
+            self.refresh()
+            self.refresh_error = None
+        except Exception as e:
+            self.refresh_error = f'{type(e).__name__}: {e}'
+            logger.exception("Cohort analytics refresh failed")
+
+    def stage(self, staging, since, scale):
+        """Write the matrices saved after since to staging slot and student files"""
+        store = self.store or get_store()
+        rows = SlotRows(scale)
+        students = {'student_id': [], 'major': [], 'updated_at': []}
+        with pq.ParquetWriter(os.path.join(staging, 'slots.parquet'), SLOT_SCHEMA) as writer:
+            for record in store.iter_records(since=since):
+                students['student_id'].append(record['student_id'])
+                students['major'].append(record['current_major'] or None)
+                students['updated_at'].append(record['updated_at'])
+                if record['current_major']:
+                    rows.add(record)
+                    if len(rows) >= STAGING_ROWS:
+                        writer.write_table(rows.take())
+            writer.write_table(rows.take())
+        pq.write_table(pa.table(students, schema=STUDENT_SCHEMA), os.path.join(staging, 'students.parquet'))
+        return {'students': len(students['student_id'])}
+
+    def rebuild(self, staging, manifest, generation, full, changed, scale):
+        """Merge staged matrices into the dataset and write its new manifest"""
+        con = self.connection.cursor()
+        staged_slots = sql_string(os.path.join(staging, 'slots.parquet'))
+        staged_students = sql_string(os.path.join(staging, 'students.parquet'))
+        old = (manifest or {}).get('files', {}) if not full else {}
+        partitions = {} if full else dict(manifest['partitions'])
+
+        # Majors whose slot files change: those the saved students are in now
+        # and those they were in before
+        affected = {major for (major,) in con.execute(
+            f"SELECT DISTINCT major FROM read_parquet({staged_students}) WHERE major IS NOT NULL").fetchall()}
+        if old:
+            affected |= {major for (major,) in con.execute(
+                f"SELECT DISTINCT s.major FROM read_parquet({sql_string(self.path(old['students']))}) s"
+                f" JOIN read_parquet({staged_students}) c USING (student_id) WHERE s.major IS NOT NULL").fetchall()}
+        changed['majors'] = len(affected)
+
+        for major_key in sorted(affected):
+            sources = [f"SELECT * FROM read_parquet({staged_slots}) WHERE major = {sql_string(major_key)}"]
+            if major_key in partitions:
+                sources.append(
+                    f"SELECT * FROM read_parquet({sql_string(self.path(partitions[major_key]))})"
+                    f" WHERE student_id NOT IN (SELECT student_id FROM read_parquet({staged_students}))"
+                )
+            name = partition_name(major_key, generation)
+            con.execute(
+                f"COPY ({' UNION ALL '.join(sources)} ORDER BY code, student_id) TO {sql_string(self.path(name))}"
+                f" (FORMAT parquet, COMPRESSION zstd, ROW_GROUP_SIZE {ROW_GROUP_SIZE})"
+            )
+            partitions[major_key] = name
+
+        files = {name: f'{name}_{generation}.parquet' for name in ('students', 'major_students', *AGGREGATES)}
+        students = f"SELECT * FROM read_parquet({staged_students})"
+        if old:
+            students += (f" UNION ALL SELECT * FROM read_parquet({sql_string(self.path(old['students']))})"
+                         f" WHERE student_id NOT IN (SELECT student_id FROM read_parquet({staged_students}))")
+        self.copy(con, f"{students} ORDER BY student_id", files['students'])
+        self.copy(con, f"SELECT major, count(*) AS students FROM read_parquet({sql_string(self.path(files['students']))})"
+                       " WHERE major IS NOT NULL GROUP BY major ORDER BY major", files['major_students'])
+
+        # Aggregates are recomputed for the affected majors only
+        for name, empty in AGGREGATES.items():
+            parts = []
+            if affected:
+                slots = sql_files([self.path(partitions[major_key]) for major_key in sorted(affected)])
+                parts.append(AGGREGATE_QUERIES[name].format(slots=slots, bucket=GPA_BUCKET))
+            if old:
+                keep = ', '.join(sql_string(major_key) for major_key in sorted(affected)) or 'NULL'
+                parts.append(f"SELECT * FROM read_parquet({sql_string(self.path(old[name]))})"
+                             f" WHERE major NOT IN ({keep})")
+            # An empty dataset still gets (empty) aggregate files
+            parts = parts or [f"SELECT {empty} WHERE false"]
+            self.copy(con, f"{' UNION ALL '.join(parts)} ORDER BY ALL", files[name])
+
+        rows = 0
+        if partitions:
+            [(rows,)] = con.execute(
+                f"SELECT count(*) FROM read_parquet({sql_files([self.path(name) for name in partitions.values()])})"
+            ).fetchall()
+        [(students_total, last_saved)] = con.execute(
+            f"SELECT count(*), max(updated_at) FROM read_parquet({sql_string(self.path(files['students']))})"
+        ).fetchall()
+        watermark = max(manifest['watermark'] if manifest and not full else 0.0, last_saved or 0.0)
+        new_manifest = {
+            'generation': generation,
+            'watermark': watermark,
+            'scale_version': scale.version,
+            'refreshed_at': time.time(),
+            'students': students_total,
+            'rows': rows,
+            'partitions': partitions,
+            'files': files
+        }
+        self.write_manifest(new_manifest)
+
+        # Files older than the previous generation, which readers that loaded
+        # the previous manifest may still be querying, are no longer needed
+        current = set(partitions.values()) | set(files.values())
+        if manifest:
+            current |= set(manifest['partitions'].values()) | set(manifest['files'].values())
+        for name in os.listdir(self.directory):
+            if name.endswith('.parquet') and name not in current:
+                os.remove(self.path(name))
+        return new_manifest
+
+    def copy(self, con, query, name):
+        con.execute(f"COPY ({query}) TO {sql_string(self.path(name))} (FORMAT parquet, COMPRESSION zstd)")
+
+    def write_manifest(self, manifest):
+        fd, tmp_path = tempfile.mkstemp(prefix='.manifest-', dir=self.directory)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp_path, self.path('manifest.json'))
+
+    def manifest(self, reload=False):
+        """The current manifest, re-read when another process has refreshed the dataset"""
+        try:
+            stat = os.stat(self.path('manifest.json'))
+        except FileNotFoundError:
+            return None
+        stamp = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if reload or stamp != self._manifest_stamp:
+            with open(self.path('manifest.json'), encoding='utf-8') as f:
+                self._manifest = json.load(f)
+            self._manifest_stamp = stamp
+        return self._manifest
+
+    # -------------------------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------------------------
+
+    def query(self, sql, params=()):
+        """Rows of a query as dicts, cached until the dataset changes"""
+        manifest = self.manifest()
+        if manifest is None:
+            return []
+        key = (manifest['generation'], sql, tuple(params))
+        with self._cache_lock:
+            rows = self._cache.get(key)
+            if rows is not None:
+                self._cache.move_to_end(key)
+                return rows
+        cursor = self.connection.cursor().execute(sql, list(params))
+        columns = [column[0] for column in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        with self._cache_lock:
+            self._cache[key] = rows
+            while len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return rows
+
+    def aggregate(self, name):
+        """SQL source for one of the aggregate files"""
+        return f"read_parquet({sql_string(self.path(self.manifest()['files'][name]))})"
+
+    def overview(self):
+        """Students, slot rows and majors in the dataset, and when it was refreshed"""
+        manifest = self.manifest()
+        if manifest is None:
+            return None
+        return {
+            'students': manifest['students'],
+            'rows': manifest['rows'],
+            'majors': len(manifest['partitions']),
+            'refreshed_at': manifest['refreshed_at'],
+            'age_s': max(0.0, time.time() - manifest['refreshed_at']),
+            'generation': manifest['generation']
+        }
+
+    def pass_rates(self, major_key=None, limit=50, min_attempts=1):
+        """Attempts, passes and pass rate per course, most attempted first"""
+        if self.manifest() is None:
+            return []
+        where, params = ("WHERE major = ?", [major_key]) if major_key else ("", [])
+        return self.query(f"""
+            SELECT code, sum(attempts)::INTEGER AS attempts, sum(passed)::INTEGER AS passed,
+                   round(sum(passed) * 100.0 / sum(attempts), 1) AS pass_rate,
+                   sum(in_progress)::INTEGER AS in_progress
+            FROM {self.aggregate('course_stats')} {where}
+            GROUP BY code HAVING sum(attempts) >= ?
+            ORDER BY attempts DESC, code LIMIT ?""", params + [min_attempts, limit])
+
+    def gpa_distribution(self, major_key):
+        """Students per GPA bucket in each section of a major"""
+        if self.manifest() is None:
+            return []
+        return self.query(f"""
+            SELECT section, bucket, students::INTEGER AS students FROM {self.aggregate('section_gpa')}
+            WHERE major = ? ORDER BY section, bucket""", [major_key])
+
+    def blocked(self, code, major_key=None):
+        """Students in majors that require a course who have not passed it yet"""
+        code = code.strip().upper()
+        catalog = get_catalog()
+        majors = [major_key] if major_key else list(catalog.major_requirements)
+        requiring = [key for key in majors if key in catalog.major_requirements and any(
+            slot_code == code and required
+            for slot_code, required in zip(catalog.plan(key).codes, catalog.plan(key).required)
+        )]
+        result = {'code': code, 'majors': requiring, 'students': 0, 'passed': 0, 'in_progress': 0, 'blocked': 0}
+        if not requiring or self.manifest() is None:
+            return result
+        placeholders = ', '.join('?' * len(requiring))
+        [counts] = self.query(f"""
+            SELECT (SELECT coalesce(sum(students), 0) FROM {self.aggregate('major_students')}
+                    WHERE major IN ({placeholders}))::INTEGER AS students,
+                   coalesce(sum(passed_students), 0)::INTEGER AS passed,
+                   coalesce(sum(in_progress_students), 0)::INTEGER AS in_progress
+            FROM {self.aggregate('course_stats')} WHERE code = ? AND major IN ({placeholders})""",
+            requiring + [code] + requiring)
+        result.update(counts, blocked=counts['students'] - counts['passed'])
+        return result
+
+    def course_grades(self, code, major_key=None):
+        """Grade distribution of one course, read from the slot files with the code filter pushed down"""
+        manifest = self.manifest()
+        if manifest is None:
+            return []
+        partitions = manifest['partitions']
+        names = [partitions[major_key]] if major_key in partitions else [] if major_key else list(partitions.values())
+        if not names:
+            return []
+        return self.query(f"""
+            SELECT grade, count(*)::INTEGER AS students FROM read_parquet({sql_files(self.path(name) for name in names)})
+            WHERE code = ? AND status = 'Completed' AND grade <> ''
+            GROUP BY grade ORDER BY students DESC, grade""", [code.strip().upper()])
+
+
+_analytics = {}
+_analytics_lock = threading.Lock()
+
+
+def format_age(seconds):
+    """How long ago something happened, e.g. 12 minutes ago"""
+    minutes = int(seconds // 60)
+    if minutes < 1:
+        return "just now"
+    if minutes < 60:
+        return f"{minutes} minute{'s' if minutes != 1 else ''} ago"
+    hours = minutes // 60
+    if hours < 48:
+        return f"{hours} hour{'s' if hours != 1 else ''} ago"
+    return f"{hours // 24} days ago"
+
+
+def analytics_dir():
+    """Directory of the columnar dataset this process uses"""
+    return os.environ.get(ANALYTICS_DIR_ENV) or DEFAULT_ANALYTICS_DIR
+
+
+def get_analytics(directory=None):
+    """Return the process-wide cohort analytics"""
+    directory = os.path.abspath(directory or analytics_dir())
+    analytics = _analytics.get(directory)
+    if analytics is None:
+        with _analytics_lock:
+            analytics = _analytics.setdefault(directory, CohortAnalytics(directory))
+    return analytics
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cohort analytics over the saved AdviseeMatrix matrices")
+    commands = parser.add_subparsers(dest='command', required=True)
+    command = commands.add_parser('refresh', help="bring the columnar dataset up to date with the matrix store")
+    command.add_argument('--full', action='store_true', help="rebuild it from scratch")
+    command = commands.add_parser('pass-rates', help="pass rates per course")
+    command.add_argument('--major')
+    command.add_argument('--limit', type=int, default=50)
+    command = commands.add_parser('gpa', help="GPA distribution per section of a major")
+    command.add_argument('--major', required=True)
+    command = commands.add_parser('blocked', help="students who still need a required course")
+    command.add_argument('code')
+    command.add_argument('--major')
+    args = parser.parse_args(argv)
+
+    analytics = get_analytics()
+    if args.command == 'refresh':
+        print(json.dumps(analytics.refresh(full=args.full)))
+        return 0
+    if analytics.manifest() is None:
+        parser.error("no analytics dataset yet; run the refresh command first")
+    if args.command == 'blocked':
+        print(json.dumps(analytics.blocked(args.code, args.major)))
+        return 0
+    rows = analytics.pass_rates(args.major, args.limit) if args.command == 'pass-rates' else analytics.gpa_distribution(args.major)
+    writer = csv.writer(sys.stdout)
+    if rows:
+        writer.writerow(rows[0].keys())
+    writer.writerows(row.values() for row in rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+# AdviseeMatrix headless batch degree audit
+#
+# Computes the same section/overall credits, quality points and GPA figures
+# as the Progress Summary in advisee_matrix_streamlit.py, but for a whole
+# cohort at once. Transcripts are loaded into dense NumPy arrays
+# (student x requirement slot) and every figure is computed in one
+# vectorized pass.
+#
+# Usage:
+#   python advisee_audit.py transcripts.csv --major BIOL -o audit.csv
+#
+# The transcript CSV has one row per filled-in course slot:
+#   student_id,major,section,slot,code,credits,grade,status
+# where (section, slot) identify the requirement row exactly as the app keys
+# course_entries (f"{section}_{slot}"). The major column may be omitted when
+# --major is given.
+
+import argparse
+import csv
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from advisee_catalog import get_catalog
+from advisee_core import STATUS_OPTIONS
+from advisee_grading import DEFAULT_SCALE, NO_GRADE
+from advisee_progress import progress_standing
+
+# Statuses are stored as their index in the option list the app shows; grades
+# as grading scale codes
+STATUS_CODES = {status: code for code, status in enumerate(STATUS_OPTIONS)}
+COMPLETED = STATUS_CODES['Completed']
+
+
+class TranscriptArrays:
+    """Dense per-slot transcript data for a cohort of students in one major"""
+
+    def __init__(self, student_ids, credits, grades, status):
+        self.student_ids = student_ids
+        self.credits = credits
+        self.grades = grades
+        self.status = status
+
+    def __len__(self):
+        return len(self.student_ids)
+
+
+class AuditResult:
+    """Section and overall figures for every student of a cohort"""
+
+    def __init__(self, engine, student_ids, section_credits, section_gpa_credits, section_qp, overall_qp):
+        self.engine = engine
+        self.student_ids = student_ids
+        self.section_credits = section_credits
+        self.section_gpa_credits = section_gpa_credits
+        self.section_qp = section_qp
+        self.overall_credits = section_credits.sum(axis=1)
+        self.overall_gpa_credits = section_gpa_credits.sum(axis=1)
+        self.overall_qp = overall_qp
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.section_gpa = np.where(section_gpa_credits > 0, section_qp / section_gpa_credits, 0.0)
+            self.overall_gpa = np.where(self.overall_gpa_credits > 0, overall_qp / self.overall_gpa_credits, 0.0)
+        self.section_progress = section_credits / engine.section_required * 100
+        self.overall_progress = self.overall_credits / engine.total_credits * 100
+        self.remaining_credits = engine.total_credits - self.overall_credits
+
+    def summary(self, index):
+        """Return one student's figures in the shape the Progress Summary shows"""
+        sections = []
+        for s, name in enumerate(self.engine.section_names):
+            sections.append({
+                'section': name,
+                'required_credits': int(self.engine.section_required[s]),
+                'credits': int(self.section_credits[index, s]),
+                'qp': float(self.section_qp[index, s]),
+                'gpa': float(self.section_gpa[index, s]),
+                'progress': float(self.section_progress[index, s])
+            })
+        return {
+            'student_id': self.student_ids[index],
+            'major': self.engine.major_key,
+            'sections': sections,
+            'overall_credits': int(self.overall_credits[index]),
+            'overall_qp': float(self.overall_qp[index]),
+            'overall_gpa': float(self.overall_gpa[index]),
+            'overall_progress': float(self.overall_progress[index]),
+            'total_credits': self.engine.total_credits,
+            'remaining_credits': int(self.remaining_credits[index]),
+            'standing': progress_standing(self.overall_progress[index])
+        }
+
+    def header(self):
+        """Column names for tabular output"""
+        columns = ['student_id', 'major']
+        for name in self.engine.section_names:
+            columns += [f'{name} credits', f'{name} qp', f'{name} gpa']
+        columns += ['overall_credits', 'overall_qp', 'overall_gpa', 'overall_progress', 'remaining_credits']
+        return columns
+
+    def rows(self):
+        """Yield one output row per student"""
+        for i, student_id in enumerate(self.student_ids):
+            row = [student_id, self.engine.major_key]
+            for s in range(len(self.engine.section_names)):
+                row += [int(self.section_credits[i, s]), f'{self.section_qp[i, s]:.2f}', f'{self.section_gpa[i, s]:.2f}']
+            row += [
+                int(self.overall_credits[i]),
+                f'{self.overall_qp[i]:.2f}',
+                f'{self.overall_gpa[i]:.2f}',
+                f'{self.overall_progress[i]:.1f}',
+                int(self.remaining_credits[i])
+            ]
+            yield row
+
+
+class BatchAuditEngine:
+    """Vectorized degree audit for every student in one major"""
+
+    def __init__(self, plan, scale=DEFAULT_SCALE):
+        self.plan = plan
+        self.scale = scale
+        self.major_key = plan.major_key
+        self.total_credits = plan.total_credits
+        self.section_names = [section.name for section in plan.sections]
+        self.section_bounds = [(section.start, section.stop) for section in plan.sections]
+        self.n_slots = len(plan)
+        self.section_required = np.array([section.required_credits for section in plan.sections], dtype=np.float64)
+        self.default_credits = np.array(plan.default_credits, dtype=np.int16)
+
+    def empty_arrays(self, student_ids):
+        """Allocate arrays for students with nothing entered yet"""
+        n = len(student_ids)
+        return TranscriptArrays(
+            list(student_ids),
+            np.tile(self.default_credits, (n, 1)),
+            np.zeros((n, self.n_slots), dtype=np.uint8),
+            np.zeros((n, self.n_slots), dtype=np.uint8)
+        )
+
+    def from_course_entries(self, entries_by_student):
+        """Build arrays from {student_id: course_entries} dicts as kept in session state"""
+        arrays = self.empty_arrays(entries_by_student.keys())
+        for row, course_entries in enumerate(entries_by_student.values()):
+            for col, row_id in enumerate(self.plan.row_ids):
+                entry = course_entries.get(row_id)
+                if entry is None:
+                    continue
+                arrays.credits[row, col] = entry['credits']
+                arrays.grades[row, col] = entry['grade']
+                arrays.status[row, col] = STATUS_CODES.get(entry['status'], 0)
+        return arrays
+
+    def from_frame(self, frame):
+        """Build arrays from a transcript DataFrame (one row per filled-in slot)"""
+        student_codes, student_ids = pd.factorize(frame['student_id'])
+        section_start = {name: start for name, (start, stop) in zip(self.section_names, self.section_bounds)}
+        section_size = {name: stop - start for name, (start, stop) in zip(self.section_names, self.section_bounds)}
+
+        slots = frame['slot'].to_numpy(dtype=np.int64)
+        starts = frame['section'].map(section_start)
+        sizes = frame['section'].map(section_size)
+        invalid = starts.isna().to_numpy() | (slots < 0) | (slots >= sizes.fillna(0).to_numpy())
+        if invalid.any():
+            bad = frame[invalid].iloc[0]
+            raise ValueError(f"{self.major_key} has no requirement slot {bad['section']!r} #{bad['slot']}")
+        cols = starts.to_numpy(dtype=np.int64) + slots
+
+        arrays = self.empty_arrays(list(student_ids))
+        arrays.credits[student_codes, cols] = frame['credits'].to_numpy(dtype=np.int16)
+        arrays.grades[student_codes, cols] = frame['grade'].map(self.scale.codes).fillna(NO_GRADE).to_numpy(dtype=np.uint8)
+        arrays.status[student_codes, cols] = frame['status'].map(STATUS_CODES).fillna(0).to_numpy(dtype=np.uint8)
+        return arrays
+
+    def audit(self, arrays):
+        """Compute every section and overall figure for a cohort in one pass"""
+        points, counts_gpa, counts_credits = self.scale.numpy_tables()
+        counted = (arrays.status == COMPLETED) & (arrays.grades != NO_GRADE)
+        credits = arrays.credits.astype(np.int64)
+        earned = np.where(counted & counts_credits[arrays.grades], credits, 0)
+        in_gpa = counted & counts_gpa[arrays.grades]
+        gpa_credits = np.where(in_gpa, credits, 0)
+        qp = np.where(in_gpa, points[arrays.grades] * arrays.credits, 0.0)
+
+        n = len(arrays)
+        section_credits = np.zeros((n, len(self.section_bounds)), dtype=np.int64)
+        section_gpa_credits = np.zeros((n, len(self.section_bounds)), dtype=np.int64)
+        section_qp = np.zeros((n, len(self.section_bounds)), dtype=np.float64)
+        overall_qp = np.zeros(n, dtype=np.float64)
+        for s, (start, stop) in enumerate(self.section_bounds):
+            section_credits[:, s] = earned[:, start:stop].sum(axis=1)
+            section_gpa_credits[:, s] = gpa_credits[:, start:stop].sum(axis=1)
+            # Quality points are summed slot by slot and then section by
+            # section, in the order the app's ProgressAccumulator builds its
+            # totals, so the floating point results match the Progress
+            # Summary exactly
+            for col in range(start, stop):
+                section_qp[:, s] += qp[:, col]
+            overall_qp += section_qp[:, s]
+
+        return AuditResult(self, arrays.student_ids, section_credits, section_gpa_credits, section_qp, overall_qp)
+
+
+def read_transcripts(path, major=None):
+    """Load a transcript CSV and split it by major"""
+    frame = pd.read_csv(
+        path,
+        dtype={'student_id': str, 'major': str, 'section': str, 'code': str, 'grade': str, 'status': str},
+        keep_default_na=False
+    )
+    frame['slot'] = pd.to_numeric(frame['slot'])
+    frame['credits'] = pd.to_numeric(frame['credits'].replace('', 0))
+    if major:
+        return {major: frame}
+    return {major_key: group for major_key, group in frame.groupby('major', sort=False)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the AdviseeMatrix degree audit for a whole cohort")
+    parser.add_argument('transcripts', help="transcript CSV (one row per course slot)")
+    parser.add_argument('--major', help="audit every student against this major instead of the major column")
+    parser.add_argument('-o', '--output', help="write results to this CSV instead of stdout")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    catalog = get_catalog()
+    records = read_transcripts(args.transcripts, args.major)
+
+    out = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        writer = csv.writer(out)
+        students = 0
+        for major_key, frame in records.items():
+            if major_key not in catalog.major_requirements:
+                parser.error(f"unknown major {major_key!r}")
+            engine = BatchAuditEngine(catalog.plan(major_key), catalog.grading_scale)
+            result = engine.audit(engine.from_frame(frame))
+            writer.writerow(result.header())
+            writer.writerows(result.rows())
+            students += len(result.student_ids)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Audited {students} students in {elapsed:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
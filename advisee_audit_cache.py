@@ -0,0 +1,208 @@
+# AdviseeMatrix audit result cache
+#
+# Students of a cohort share most of their transcripts - a first-year class
+# all has the same Level 1 core - so the same section figures get computed
+# over and over, by the audit service and by batch re-audits. AuditCache
+# keeps audit results addressed by their content:
+#
+# - a section's figures (earned credits, GPA credits, quality points) under
+#   (major, section, grading scale version, the section's counted courses as
+#   (slot, code, credits, grade) tuples in slot order);
+# - a whole audit summary under (major, grading scale version, every
+#   section's counted courses);
+# - the same summary under the transcript as given: the row id, grade,
+#   credits and code of each completed entry, in the record's order. A
+#   transcript seen before is answered from this key alone, without sorting
+#   the entries into sections, which is most of an audit's cost.
+#
+# Only completed courses add to the figures, so only they go into the keys,
+# and a changed grade is never answered from the cache. A re-audit after one
+# grade change misses the transcript, the summary and the section the course
+# is in, and reuses the figures of every other section. Audits for a
+# student (audit_record() passes the student id) also remember the
+# student's last transcript: when a grade change gives the student a new
+# one, the summary under the old transcript is dropped at once rather than
+# left to age out of the LRU. cached() keeps other audit results the same
+# way, e.g. the what-if comparison of a list of courses against every major.
+#
+# The keys are the canonical tuples themselves, hashed by the dict: a
+# cryptographic digest of them costs more than the audit it would save.
+#
+# Transcripts, summaries, sections and other results share one LRU of at
+# most $ADVISEE_AUDIT_CACHE_SIZE entries (default 20000, about 30 MB with
+# 60-slot majors; 0 disables the cache). The cache holds results of one
+# catalog: it is emptied when an audit is asked for against another one, as
+# when the catalog file, and with it the requirements or the grading scale,
+# changes.
+
+import os
+import threading
+from collections import OrderedDict
+
+from advisee_progress import audit_summary, counted_courses, section_figures
+
+AUDIT_CACHE_SIZE_ENV = 'ADVISEE_AUDIT_CACHE_SIZE'
+DEFAULT_AUDIT_CACHE_SIZE = 20000
+
+
+class AuditCache:
+    """Bounded LRU of audit results addressed by transcript content"""
+
+    def __init__(self, max_entries=DEFAULT_AUDIT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        # student id -> key of the student's last transcript, at most max_entries
+        self.students = OrderedDict()
+        self.catalog = None
+        self.transcript_hits = 0
+        self.transcript_misses = 0
+        self.hits = 0
+        self.misses = 0
+        self.section_hits = 0
+        self.section_misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.catalog_changes = 0
+        self._lock = threading.Lock()
+
+    def _bind(self, catalog):
+        # Called with the lock held
+        if catalog is not self.catalog:
+            if self.catalog is not None:
+                self.catalog_changes += 1
+            self.entries.clear()
+            self.students.clear()
+            self.catalog = catalog
+
+    def _get(self, key):
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+
+    def _put(self, key, value):
+        # Only keys just missed are put, and new keys go in at the end
+        self.entries[key] = value
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def _seen(self, student_id, key):
+        # Called with the lock held: the student's transcript is now key, so
+        # the summary under their previous one is stale
+        previous = self.students.pop(student_id, None)
+        if previous is not None and previous != key and self.entries.pop(previous, None) is not None:
+            self.invalidations += 1
+        self.students[student_id] = key
+        if len(self.students) > self.max_entries:
+            self.students.popitem(last=False)
+
+    def audit(self, catalog, major_key, course_entries, student_id=None):
+        """Progress Summary figures of course entries against a major
+
+        The summary may be shared with other callers and must not be changed.
+        """
+        plan, scale = catalog.plan(major_key), catalog.grading_scale
+        if not self.max_entries:
+            return audit_summary(plan, [section_figures(courses, scale)
+                                        for courses in counted_courses(plan, course_entries, scale)])
+
+        # The completed entries as given: a transcript audited before is
+        # answered without sorting out its counted courses again
+        transcript = ('transcript', major_key, tuple([
+            (row_id, entry['grade'], entry['credits'], entry.get('code'))
+            for row_id, entry in course_entries.items() if entry['status'] == 'Completed']))
+        with self._lock:
+            self._bind(catalog)
+            if student_id is not None:
+                self._seen(student_id, transcript)
+            summary = self._get(transcript)
+            if summary is not None:
+                self.transcript_hits += 1
+                return summary
+            self.transcript_misses += 1
+
+        sections = [tuple(courses) for courses in counted_courses(plan, course_entries, scale)]
+        key = (major_key, scale.version, tuple(sections))
+        with self._lock:
+            self._bind(catalog)
+            summary = self._get(key)
+            if summary is not None:
+                self.hits += 1
+                self._put(transcript, summary)
+                return summary
+            self.misses += 1
+            section_keys = [(major_key, s, scale.version, courses) for s, courses in enumerate(sections)]
+            figures = [self._get(section_key) for section_key in section_keys]
+
+        missed = [s for s, section in enumerate(figures) if section is None]
+        for s in missed:
+            figures[s] = section_figures(sections[s], scale)
+        summary = audit_summary(plan, figures)
+        with self._lock:
+            if catalog is self.catalog:
+                self.section_hits += len(sections) - len(missed)
+                self.section_misses += len(missed)
+                for s in missed:
+                    self._put(section_keys[s], figures[s])
+                self._put(key, summary)
+                self._put(transcript, summary)
+        return summary
+
+    def cached(self, catalog, key, compute):
+        """compute(), cached against catalog under key, a canonical tuple of what the result depends on"""
+        if not self.max_entries:
+            return compute()
+        with self._lock:
+            self._bind(catalog)
+            value = self._get(key)
+            if value is not None:
+                self.hits += 1
+                return value
+            self.misses += 1
+        value = compute()
+        with self._lock:
+            if catalog is self.catalog:
+                self._put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.students.clear()
+
+    def stats(self):
+        """Counters and size, e.g. for metrics"""
+        with self._lock:
+            return {
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'transcript_hits': self.transcript_hits,
+                'transcript_misses': self.transcript_misses,
+                'hits': self.hits,
+                'misses': self.misses,
+                'section_hits': self.section_hits,
+                'section_misses': self.section_misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'catalog_changes': self.catalog_changes
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def audit_cache_size():
+    """Entries the process's audit cache holds at most, 0 for no cache"""
+    return int(os.environ.get(AUDIT_CACHE_SIZE_ENV, DEFAULT_AUDIT_CACHE_SIZE))
+
+
+def get_audit_cache():
+    """Return the process-wide audit cache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AuditCache(audit_cache_size())
+    return _cache
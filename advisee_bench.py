@@ -0,0 +1,237 @@
+# AdviseeMatrix benchmarks
+#
+# Usage:
+#   python advisee_bench.py suite [--courses 2000] [--majors 20] [--slots 60] [-o results.json]
+#   python advisee_bench.py render [--runs 20]
+#   python advisee_bench.py store [--runs 20] [--sessions 300]
+#   python advisee_bench.py forms [--students 2000]
+#   python advisee_bench.py match [--runs 20]
+#   python advisee_bench.py whatif [--runs 20]
+#   python advisee_bench.py session [--slots 60]
+#   python advisee_bench.py startup [--courses 50000] [--budget-ms 1500]
+#   python advisee_bench.py service [--requests 2000] [--concurrency 32] [--batch-size 100]
+#   python advisee_bench.py analytics [--students 100000] [--runs 20]
+#   python advisee_bench.py planner [--courses 2000] [--students 2000]
+#   python advisee_bench.py audit [--students 2000]
+#   python advisee_bench.py cache [--students 2000]
+#   python advisee_bench.py export [--students 2000]
+#   python advisee_bench.py generate out_dir [--courses 2000] [--majors 20] [--students 2000]
+#   python advisee_bench.py compare base.json head.json [--threshold 0.1]
+#
+# The suite runs the app against a synthetic catalog (N courses, M majors
+# with fixed, subject wildcard and ELEC slots) and synthetic transcripts,
+# and measures cold start, per-rerun script time through Streamlit's AppTest
+# harness, Progress Summary and cohort audit computation, declaration form
+# rendering and memory per session. generate writes the same synthetic data
+# to files: catalog.json (usable as $ADVISEE_CATALOG_PATH), transcripts.csv
+# for advisee_audit.py and registrar.csv for advisee_import.py.
+#
+# startup times a new replica's first page (app import plus first script
+# run, in fresh interpreters) with the catalog as JSON and as a snapshot
+# (advisee_snapshot.py), lists the heavy libraries the app imports before
+# its first page, and exits non-zero if the snapshot start-up exceeds the
+# budget.
+#
+# service starts the audit service (advisee_service.py) on a store of
+# synthetic matrices and reports its throughput and latency percentiles for
+# single and batch audits under the service's own load generator.
+#
+# analytics builds the cohort analytics dataset (advisee_analytics.py) from a
+# store of synthetic matrices and times the full refresh, an incremental
+# refresh after one save, and the dashboard's queries cold and cached.
+#
+# planner plans every synthetic student's remaining courses to two target
+# terms over a catalog whose courses have prerequisite chains and offerings.
+#
+# audit audits a synthetic cohort by the Progress Summary's running totals
+# over decoded entries and by audit_record, which the audit service uses,
+# and again after one grade change per student, checking that both give
+# the same figures. audit_record goes through the process's audit cache,
+# cold on the first pass.
+#
+# cache audits the cohort without the audit cache, with it cold and warm,
+# and again after one grade change per student, which drops each student's
+# old summary, checking that every pass gives the running totals' figures.
+#
+# export writes every matrix of a store of synthetic matrices to CSV, XLSX
+# and Parquet with advisee_export.py, in fresh interpreters, for the roster
+# and a roster four times its size, and reports throughput and the peak
+# memory of each run, which should not grow with the roster.
+#
+# The scenarios are in advisee_bench_app.py (the app and the modules behind
+# its pages) and advisee_bench_backend.py (the service, analytics, planner,
+# audits, the audit cache and export); the synthetic data and timing helpers they share are in
+# advisee_bench_common.py.
+#
+# Results are printed as JSON, together with the commit and library versions
+# they were taken with, so runs can be compared between commits; compare
+# lists the timings and sizes that got worse by more than the threshold and
+# exits non-zero if there are any.
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from importlib import metadata
+
+from advisee_bench_app import (STARTUP_BUDGET_MS, bench_forms, bench_match, bench_render, bench_session,
+                               bench_startup, bench_store, bench_suite, bench_whatif)
+from advisee_bench_backend import bench_analytics, bench_audit, bench_cache, bench_export, bench_planner, bench_service
+from advisee_bench_common import ROOT, write_synthetic_data
+
+VERSIONED_PACKAGES = ('streamlit', 'numpy', 'pandas', 'jinja2')
+
+# Timings and sizes are better lower, throughputs higher
+LOWER_IS_BETTER = ('_ms', '_s', '_bytes')
+HIGHER_IS_BETTER = ('_per_s',)
+
+
+BENCHMARKS = {
+    'suite': bench_suite,
+    'render': bench_render,
+    'store': bench_store,
+    'forms': bench_forms,
+    'match': bench_match,
+    'whatif': bench_whatif,
+    'session': bench_session,
+    'startup': bench_startup,
+    'service': bench_service,
+    'analytics': bench_analytics,
+    'planner': bench_planner,
+    'audit': bench_audit,
+    'cache': bench_cache,
+    'export': bench_export,
+}
+
+
+# -----------------------------------------------------------------------------
+# Results
+# -----------------------------------------------------------------------------
+
+def run_metadata(args):
+    """Where and with what a benchmark run was taken"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    versions = {}
+    for package in VERSIONED_PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return {
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'packages': versions,
+        'args': {name: value for name, value in vars(args).items() if name not in ('command', 'output')}
+    }
+
+
+def flatten(results, prefix=''):
+    """Nested result dicts as {dotted.path: number}"""
+    flat = {}
+    for key, value in results.items():
+        path = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(flatten(value, path + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def compare_results(base, head, threshold):
+    """(path, base, head, relative change, regressed) for every comparable figure"""
+    base = flatten({key: value for key, value in base.items() if key != 'meta'})
+    head = flatten({key: value for key, value in head.items() if key != 'meta'})
+    rows = []
+    for path in sorted(base.keys() & head.keys()):
+        if path.endswith(HIGHER_IS_BETTER):
+            worse = -1
+        elif path.endswith(LOWER_IS_BETTER):
+            worse = 1
+        else:
+            continue
+        old, new = base[path], head[path]
+        change = (new - old) / old if old else 0.0
+        rows.append((path, old, new, change, change * worse > threshold))
+    return rows
+
+
+def compare(args):
+    with open(args.base, encoding='utf-8') as f:
+        base = json.load(f)
+    with open(args.head, encoding='utf-8') as f:
+        head = json.load(f)
+    rows = compare_results(base, head, args.threshold)
+    width = max((len(row[0]) for row in rows), default=0)
+    for path, old, new, change, regressed in rows:
+        print(f"{path:<{width}}  {old:>12}  {new:>12}  {change:+8.1%}{'  REGRESSION' if regressed else ''}")
+    regressions = sum(1 for row in rows if row[4])
+    print(f"{regressions} of {len(rows)} figures regressed by more than {args.threshold:.0%}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run AdviseeMatrix benchmarks")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    options = argparse.ArgumentParser(add_help=False)
+    options.add_argument('--runs', type=int, default=20, help="timed iterations per case")
+    options.add_argument('--sessions', type=int, default=300, help="concurrent sessions to simulate")
+    options.add_argument('--students', type=int, default=2000, help="roster size for batch benchmarks")
+    options.add_argument('--courses', type=int, default=2000, help="courses in the synthetic catalog")
+    options.add_argument('--majors', type=int, default=20, help="majors in the synthetic catalog")
+    options.add_argument('--slots', type=int, default=60, help="requirement slots per synthetic major")
+    options.add_argument('--seed', type=int, default=0, help="seed for the synthetic data")
+    options.add_argument('--cold-runs', type=int, default=3, help="fresh interpreters to time the cold start in")
+    options.add_argument('--memory-sessions', type=int, default=3, help="sessions to measure memory over")
+
+    for name, benchmark in BENCHMARKS.items():
+        command = commands.add_parser(name, parents=[options], help=benchmark.__doc__)
+        command.add_argument('-o', '--output', help="also write the results to this JSON file")
+        if name == 'startup':
+            command.add_argument('--budget-ms', type=float, default=STARTUP_BUDGET_MS,
+                                 help="start-up time the snapshot catalog must stay within")
+        if name == 'service':
+            command.add_argument('--requests', type=int, default=2000, help="single audit requests to send")
+            command.add_argument('--concurrency', type=int, default=32, help="concurrent clients")
+            command.add_argument('--batch-size', type=int, default=100, help="students per batch request")
+
+    command = commands.add_parser('generate', parents=[options], help="write a synthetic catalog and transcripts")
+    command.add_argument('out_dir')
+
+    command = commands.add_parser('compare', help="compare two result files")
+    command.add_argument('base')
+    command.add_argument('head')
+    command.add_argument('--threshold', type=float, default=0.1, help="relative change counted as a regression")
+    args = parser.parse_args(argv)
+
+    if args.command == 'compare':
+        sys.exit(compare(args))
+    if args.command == 'generate':
+        path = write_synthetic_data(args.out_dir, args)
+        print(f"Wrote {path} and {args.students} students' transcripts to {args.out_dir}", file=sys.stderr)
+        return
+
+    results = {'meta': run_metadata(args), args.command: BENCHMARKS[args.command](args)}
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    if args.command == 'startup' and not results['startup']['within_budget']:
+        print(f"Start-up took {results['startup']['snapshot']['startup_ms']} ms, "
+              f"over the {args.budget_ms:g} ms budget", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
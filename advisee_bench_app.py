@@ -0,0 +1,535 @@
+# AdviseeMatrix benchmarks of the app
+#
+# Scenarios that drive the Streamlit app or the modules behind its pages:
+# reruns, saves, declaration forms, slot matching, the what-if audit,
+# session memory, the full suite and a new replica's start-up. Run them
+# through advisee_bench.py.
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from advisee_bench_common import (APP_PATH, environment, fresh_interpreter, latency_stats, synthetic_catalog,
+                                  synthetic_record, synthetic_records, write_synthetic_data)
+
+WIDGET_TYPES = ('text_input', 'number_input', 'selectbox', 'toggle', 'button')
+
+# Run in a fresh interpreter: import the app, then its first script runs
+COLD_INIT_SCRIPT = """
+import json, resource, sys, time
+started = time.perf_counter()
+import advisee_matrix_streamlit
+imported = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=600)
+harness = time.perf_counter()
+at.run()
+first_run = time.perf_counter()
+at.selectbox(key='major_select').set_value(at.selectbox(key='major_select').options[1]).run()
+first_major = time.perf_counter()
+at.run()
+warm_run = time.perf_counter()
+if at.exception:
+    sys.exit(str(at.exception))
+print(json.dumps({
+    'import_s': imported - started,
+    'first_run_s': first_run - harness,
+    'first_major_s': first_major - first_run,
+    'warm_run_s': warm_run - first_major,
+    'max_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+}))
+"""
+
+# Run in a fresh interpreter: load a catalog file and build what the first
+# page looks up, then again under tracemalloc for the private heap it takes
+# (pages of a mapped snapshot are shared and not counted)
+CATALOG_LOAD_SCRIPT = """
+import json, sys, time, tracemalloc
+from advisee_catalog import load_catalog
+def first_page(path):
+    catalog = load_catalog(path)
+    loaded = time.perf_counter()
+    catalog.course_index()
+    catalog.plan(next(iter(catalog.major_requirements)))
+    return catalog, loaded
+started = time.perf_counter()
+catalog, loaded = first_page(sys.argv[1])
+finished = time.perf_counter()
+del catalog
+tracemalloc.start()
+catalog, _ = first_page(sys.argv[1])
+print(json.dumps({
+    'load_s': loaded - started,
+    'index_and_plan_s': finished - loaded,
+    'heap_bytes': tracemalloc.get_traced_memory()[0]
+}))
+"""
+
+# Libraries the app should only import when a feature needs them
+HEAVY_MODULES = ('pandas', 'numpy', 'jinja2', 'pyarrow', 'openpyxl')
+HEAVY_IMPORTS_SCRIPT = """
+import json, sys
+import advisee_matrix_streamlit
+print(json.dumps([name for name in sys.argv[1:] if name in sys.modules]))
+"""
+
+# Import plus first script run of a new replica with a snapshot catalog
+STARTUP_BUDGET_MS = 1500
+
+
+def count_widgets(at):
+    """Count interactive elements in an AppTest element tree"""
+    count = sum(len(getattr(at, name)) for name in WIDGET_TYPES)
+    # Data editors show up as dataframe elements
+    return count + len(at.get('arrow_data_frame')) + len(at.get('dataframe'))
+
+
+def render_latency(runs, major_option=1, course_entries=None):
+    """Script time per grade edit in the classic per-row layout and in grid mode"""
+    from streamlit.testing.v1 import AppTest
+
+    from advisee_catalog import get_catalog
+    from advisee_store import decode_entries
+
+    catalog = get_catalog()
+    scale = catalog.grading_scale
+    results = {}
+    for mode in ('classic', 'grid'):
+        at = AppTest.from_file(APP_PATH, default_timeout=120)
+        at.session_state['grid_mode'] = mode == 'grid'
+        if course_entries is not None:
+            at.session_state['course_entries'] = decode_entries(course_entries, scale)
+        at.run()
+        major_select = at.selectbox(key='major_select')
+        major_select.set_value(major_select.options[major_option]).run()
+        row_id = catalog.plan(at.session_state['current_major']).row_ids[0]
+
+        samples = []
+        for i in range(runs):
+            grade = scale.encode('A' if i % 2 else 'B')
+            started = time.perf_counter()
+            if mode == 'classic':
+                at.selectbox(key=f'status_{row_id}').set_value('Completed')
+                at.selectbox(key=f'grade_{row_id}').set_value(grade).run()
+            else:
+                # AppTest cannot drive a data editor, so apply the same edit to
+                # the entries the editor writes back to and rerun. This times the
+                # full script; a real grid edit only reruns the workspace fragment.
+                at.session_state['course_entries'][row_id].update(status='Completed', grade=grade)
+                at.run()
+            samples.append(time.perf_counter() - started)
+            if at.exception:
+                raise RuntimeError(f"{mode} run failed: {at.exception}")
+
+        results[mode] = dict(latency_stats(samples), widgets=count_widgets(at))
+    return results
+
+
+def bench_render(args):
+    """Script time per grade edit with the real catalog's first major"""
+    return render_latency(args.runs)
+
+
+def bench_store(args):
+    """Save/load latency of concurrent sessions, write-behind versus write-through"""
+    from advisee_catalog import get_catalog
+    from advisee_store import MatrixStore
+
+    plan = get_catalog().plan(next(iter(get_catalog().major_requirements)))
+    results = {}
+    for mode, flush_interval in (('write_behind', 0.5), ('write_through', None)):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = MatrixStore(os.path.join(tmp, 'bench.db'), flush_interval=flush_interval)
+            saves, loads = [], []
+            lock = threading.Lock()
+
+            def session(n):
+                # One advisor: restore the matrix, then a burst of widget edits
+                rng = random.Random(n)
+                student_id = f'S{n:06d}'
+                record = synthetic_record(plan, rng)
+                record['student_info']['student_id'] = student_id
+                own_loads, own_saves = [], []
+                started = time.perf_counter()
+                store.load(student_id)
+                own_loads.append(time.perf_counter() - started)
+                for _ in range(args.runs):
+                    row = record['course_entries'][rng.choice(plan.row_ids)]
+                    row['grade'] = rng.choice(['A', 'B', 'C'])
+                    started = time.perf_counter()
+                    store.save(student_id, record)
+                    own_saves.append(time.perf_counter() - started)
+                    time.sleep(rng.uniform(0, 0.02))
+                with lock:
+                    loads.extend(own_loads)
+                    saves.extend(own_saves)
+
+            started = time.perf_counter()
+            threads = [threading.Thread(target=session, args=(n,)) for n in range(args.sessions)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            store.close()
+            elapsed = time.perf_counter() - started
+
+            # Reload every saved matrix through a fresh store
+            reader = MatrixStore(os.path.join(tmp, 'bench.db'), flush_interval=None)
+            reloads = []
+            for n in range(args.sessions):
+                started = time.perf_counter()
+                assert reader.load(f'S{n:06d}') is not None
+                reloads.append(time.perf_counter() - started)
+            reader.close()
+
+        results[mode] = {
+            'sessions': args.sessions,
+            'saves': len(saves),
+            'transactions': store.batches_written,
+            'rows_written': store.rows_written,
+            'wall_s': round(elapsed, 2),
+            'save': latency_stats(saves),
+            'load': latency_stats(loads),
+            'reload': latency_stats(reloads)
+        }
+    return results
+
+
+def bench_forms(args):
+    """Declaration form throughput for a roster, single worker versus one per CPU"""
+    from advisee_catalog import get_catalog
+    from advisee_forms import write_forms_zip
+
+    catalog = get_catalog()
+    plan = catalog.plan(next(iter(catalog.major_requirements)))
+    rng = random.Random(0)
+    records = []
+    for n in range(args.students):
+        record = synthetic_record(plan, rng)
+        record['student_id'] = f'S{n:06d}'
+        record['student_info'].update(student_id=record['student_id'], first_name='Student', surname=str(n),
+                                      academic_year='2026', semester='Fall', graduation_term='Spring 2028')
+        records.append(record)
+
+    results = {}
+    for workers in sorted({1, os.cpu_count() or 1}):
+        for formats in (('html',), ('pdf',), ('html', 'pdf')):
+            with tempfile.TemporaryDirectory() as tmp:
+                out = os.path.join(tmp, 'forms.zip')
+                started = time.perf_counter()
+                written, _ = write_forms_zip(records, out, formats, workers, path=catalog.path)
+                elapsed = time.perf_counter() - started
+                results[f"{'+'.join(formats)}_{workers}_workers"] = {
+                    'forms': written,
+                    'wall_s': round(elapsed, 2),
+                    'forms_per_s': round(written / elapsed, 1),
+                    'zip_bytes': os.path.getsize(out)
+                }
+    return results
+
+
+def bench_match(args):
+    """Optimal slot matching for real and synthetic (hundreds of slots) majors"""
+    from advisee_catalog import Catalog, get_catalog
+    from advisee_matching import match_courses
+
+    rng = random.Random(0)
+    catalog = get_catalog()
+    cases = {key: (catalog.plan(key), list(catalog.course_data)) for key in catalog.major_requirements}
+    for slots in (300, 900):
+        data = synthetic_catalog(courses=5000, majors=1, slots=slots, seed=slots)
+        synthetic = Catalog(data['course_data'], data['major_requirements'], version='bench')
+        cases[f'synthetic_{slots}_slots'] = (synthetic.plan('M000'), list(synthetic.course_data))
+
+    results = {}
+    for name, (plan, codes) in cases.items():
+        courses = [
+            {'code': code, 'credits': 3, 'grade': 'A', 'status': 'Completed'}
+            for code in rng.sample(codes, min(len(codes), len(plan) + len(plan) // 2))
+        ]
+        samples = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            match = match_courses(plan, courses)
+            samples.append(time.perf_counter() - started)
+        results[name] = dict(latency_stats(samples), slots=len(plan), courses=len(courses),
+                             matched=match.matched, required_filled=match.required_filled())
+    return results
+
+
+def bench_whatif(args):
+    """What-if audit against 60 majors versus a single-major matching"""
+    from advisee_catalog import Catalog
+    from advisee_matching import match_courses
+    from advisee_whatif import EligibilityMatrix
+
+    rng = random.Random(0)
+    data = synthetic_catalog(courses=20000, majors=60, slots=120)
+    catalog = Catalog(data['course_data'], data['major_requirements'], version='bench')
+
+    started = time.perf_counter()
+    matrix = EligibilityMatrix(catalog)
+    build = time.perf_counter() - started
+
+    codes = list(catalog.course_data)
+    courses = [{'code': code, 'credits': 3, 'grade': 1, 'status': 'Completed'} for code in rng.sample(codes, 40)]
+    plan = catalog.plan('M000')
+    single, whatif = [], []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        match_courses(plan, courses)
+        single.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        matrix.evaluate(courses)
+        whatif.append(time.perf_counter() - started)
+    return {
+        'majors': len(catalog.major_requirements),
+        'catalog_courses': len(codes),
+        'transcript_courses': len(courses),
+        'matrix_build_s': round(build, 2),
+        'single_major_audit': latency_stats(single),
+        'all_majors_what_if': latency_stats(whatif)
+    }
+
+
+def cold_init(runs, script=COLD_INIT_SCRIPT, *args):
+    """Import and first-run times of the app in fresh interpreters, using the current environment"""
+    samples = [fresh_interpreter(script, *(args or (APP_PATH,))) for _ in range(runs)]
+    results = {'runs': runs}
+    for name in samples[0]:
+        median = statistics.median(sample[name] for sample in samples)
+        results[name] = int(median) if name.endswith('_bytes') else round(median, 3)
+    return results
+
+
+def summary_latency(catalog, records, runs):
+    """Progress Summary totals per session and the batch audit of the whole cohort"""
+    from advisee_audit import BatchAuditEngine
+    from advisee_progress import ProgressAccumulator
+    from advisee_store import decode_entries
+
+    scale = catalog.grading_scale
+    major_key = records[0]['current_major']
+    plan = catalog.plan(major_key)
+    cohort = {record['student_id']: decode_entries(record['course_entries'], scale)
+              for record in records if record['current_major'] == major_key}
+    entries = list(cohort.values())
+
+    totals = ProgressAccumulator(plan, scale)
+    rebuilds, updates = [], []
+    for i in range(runs):
+        course_entries = entries[i % len(entries)]
+        started = time.perf_counter()
+        totals.rebuild(course_entries)
+        rebuilds.append(time.perf_counter() - started)
+        slot = i % len(plan)
+        entry = dict(course_entries[plan.row_ids[slot]], status='Completed', grade=scale.encode('A' if i % 2 else 'B'))
+        started = time.perf_counter()
+        totals.update(slot, entry)
+        updates.append(time.perf_counter() - started)
+
+    engine = BatchAuditEngine(plan, scale)
+    started = time.perf_counter()
+    engine.audit(engine.from_course_entries(cohort))
+    elapsed = time.perf_counter() - started
+    return {
+        'slots': len(plan),
+        'rebuild': latency_stats(rebuilds),
+        'update': latency_stats(updates),
+        'cohort_students': len(cohort),
+        'cohort_audit_s': round(elapsed, 3),
+        'cohort_students_per_s': round(len(cohort) / elapsed, 1)
+    }
+
+
+def declaration_latency(catalog, records, runs):
+    """Declaration form rendering per student, as HTML and as PDF"""
+    from advisee_forms import form_context, get_template, render_form_html, render_form_pdf
+
+    started = time.perf_counter()
+    get_template()
+    compile_time = time.perf_counter() - started
+    results = {'template_compile_s': round(compile_time, 4)}
+    for fmt, render in (('html', render_form_html), ('pdf', render_form_pdf)):
+        samples, size = [], 0
+        for i in range(runs):
+            record = records[i % len(records)]
+            started = time.perf_counter()
+            context = form_context(record['student_info'], catalog.major_requirements[record['current_major']]['name'])
+            size = len(render(context))
+            samples.append(time.perf_counter() - started)
+        results[fmt] = dict(latency_stats(samples), form_bytes=size)
+    return results
+
+
+def session_memory(catalog, record, sessions):
+    """Python heap allocated per AppTest session loaded with a full matrix"""
+    from streamlit.testing.v1 import AppTest
+
+    from advisee_metrics import session_state_bytes
+    from advisee_store import decode_entries
+
+    scale = catalog.grading_scale
+    major_key = record['current_major']
+    major_display = f"{major_key} - {catalog.major_requirements[major_key]['name']}"
+    plan = catalog.plan(major_key)
+
+    def run_session():
+        at = AppTest.from_file(APP_PATH, default_timeout=120)
+        at.session_state['course_entries'] = decode_entries(record['course_entries'], scale)
+        at.run()
+        at.selectbox(key='major_select').set_value(major_display).run()
+        at.selectbox(key=f'grade_{plan.row_ids[0]}').set_value(scale.encode('A')).run()
+        if at.exception:
+            raise RuntimeError(f"session run failed: {at.exception}")
+        return at
+
+    # The first session also builds the process-wide catalog caches
+    run_session()
+    peaks, retained, state_bytes = [], [], []
+    for _ in range(sessions):
+        tracemalloc.start()
+        at = run_session()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peaks.append(peak)
+        retained.append(current)
+        state_bytes.append(session_state_bytes(at.session_state.to_dict()))
+    return {
+        'sessions': sessions,
+        'slots': len(plan),
+        'peak_bytes': int(statistics.median(peaks)),
+        'retained_bytes': int(statistics.median(retained)),
+        'session_state_bytes': int(statistics.median(state_bytes))
+    }
+
+
+def state_breakdown(state):
+    """Session state bytes with compact and with dict-of-dicts course entries, and of the row widgets"""
+    from advisee_matrix_streamlit import ROW_WIDGET_PREFIXES
+    from advisee_metrics import session_state_bytes
+
+    compact = session_state_bytes(state)
+    as_dicts = dict(state, course_entries={row_id: dict(entry) for row_id, entry in state['course_entries'].items()})
+    widgets = {key: value for key, value in state.items() if key.startswith(ROW_WIDGET_PREFIXES)}
+    return {
+        'before_bytes': session_state_bytes(as_dicts),
+        'after_bytes': compact,
+        'row_widget_bytes': session_state_bytes(widgets)
+    }
+
+
+def bench_session(args):
+    """Bytes per session before and after compact course entries, and once spilled when idle"""
+    from streamlit.testing.v1 import AppTest
+
+    from advisee_catalog import Catalog, get_catalog
+    from advisee_matrix_streamlit import rerun_session, spill_session
+    from advisee_metrics import session_state_bytes
+    from advisee_session import CourseEntries, get_sessions
+    from advisee_store import decode_entries
+
+    results = {'course_entries': {}}
+    for slots in (60, 150, 300):
+        data = synthetic_catalog(args.courses, args.majors, slots, args.seed)
+        catalog = Catalog(data['course_data'], data['major_requirements'], version='bench')
+        entries = decode_entries(synthetic_records(catalog, 1, args.seed)[0]['course_entries'], catalog.grading_scale)
+        results['course_entries'][f'{slots}_slots'] = {
+            'dict_bytes': session_state_bytes(entries),
+            'compact_bytes': session_state_bytes(CourseEntries(catalog.row_layout(), entries)),
+            'layout_rows': len(catalog.row_layout())
+        }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_synthetic_data(tmp, argparse.Namespace(**dict(vars(args), students=1)))
+        with environment(ADVISEE_CATALOG_PATH=path, ADVISEE_DB_PATH=os.path.join(tmp, 'bench.db'),
+                         ADVISEE_SPILL_DIR=os.path.join(tmp, 'spill')):
+            catalog = get_catalog()
+            record = synthetic_records(catalog, 1, args.seed)[0]
+            registry = get_sessions(spill_session, rerun_session)
+            for mode in ('classic', 'grid'):
+                at = AppTest.from_file(APP_PATH, default_timeout=120)
+                at.session_state['grid_mode'] = mode == 'grid'
+                at.session_state['course_entries'] = decode_entries(record['course_entries'], catalog.grading_scale)
+                at.run()
+                major_select = at.selectbox(key='major_select')
+                major_select.set_value(major_select.options[1]).run()
+                if at.exception:
+                    raise RuntimeError(f"{mode} run failed: {at.exception}")
+                breakdown = state_breakdown(at.session_state.to_dict())
+
+                # Mark the session as idle past the TTL; the run the sweeper
+                # asks for spills it
+                registry.sweep(now=time.monotonic() + registry.ttl + 1)
+                at.run()
+                spill_files = [os.path.join(tmp, 'spill', name) for name in os.listdir(os.path.join(tmp, 'spill'))]
+                breakdown['spilled_bytes'] = session_state_bytes(at.session_state.to_dict())
+                breakdown['spill_file_bytes'] = sum(os.path.getsize(name) for name in spill_files)
+
+                # ... and back
+                started = time.perf_counter()
+                at.button[0].click().run()
+                breakdown['restore_run_s'] = round(time.perf_counter() - started, 3)
+                if at.exception:
+                    raise RuntimeError(f"{mode} restore failed: {at.exception}")
+                results[mode] = dict(breakdown, slots=len(catalog.plan(record['current_major'])))
+            results['sessions_spilled'] = registry.spilled
+            results['sessions_restored'] = registry.restored
+    return results
+
+
+def bench_suite(args):
+    """Cold start, rerun, summary, form and memory figures against a synthetic catalog"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_synthetic_data(tmp, args)
+        with environment(ADVISEE_CATALOG_PATH=path, ADVISEE_DB_PATH=os.path.join(tmp, 'bench.db')):
+            from advisee_catalog import get_catalog
+
+            catalog = get_catalog()
+            records = synthetic_records(catalog, args.students, args.seed)
+            return {
+                'catalog': {
+                    'courses': len(catalog.course_data),
+                    'majors': len(catalog.major_requirements),
+                    'slots_per_major': len(catalog.plan(records[0]['current_major'])),
+                    'students': len(records)
+                },
+                'cold_init': cold_init(args.cold_runs),
+                'rerun': render_latency(args.runs, course_entries=records[0]['course_entries']),
+                'summary': summary_latency(catalog, records, max(args.runs, 100)),
+                'declaration': declaration_latency(catalog, records, max(args.runs, 100)),
+                'memory': session_memory(catalog, records[0], args.memory_sessions)
+            }
+
+
+def bench_startup(args):
+    """Cold start of a new replica with a JSON catalog and with a catalog snapshot, against a budget"""
+    from advisee_snapshot import build_snapshot
+
+    results = {'catalog': {'courses': args.courses, 'majors': args.majors, 'slots_per_major': args.slots}}
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {'json': os.path.join(tmp, 'catalog.json'), 'snapshot': os.path.join(tmp, 'catalog.snapshot')}
+        with open(paths['json'], 'w', encoding='utf-8') as f:
+            json.dump(synthetic_catalog(args.courses, args.majors, args.slots, args.seed), f, indent=1)
+        build_snapshot(paths['json'], paths['snapshot'])
+        results['catalog'].update({f'{kind}_bytes': os.path.getsize(path) for kind, path in paths.items()})
+
+        for kind, path in paths.items():
+            with environment(ADVISEE_CATALOG_PATH=path, ADVISEE_DB_PATH=os.path.join(tmp, 'bench.db')):
+                app = cold_init(args.cold_runs)
+            results[kind] = {
+                'catalog_load': cold_init(args.cold_runs, CATALOG_LOAD_SCRIPT, path),
+                'app': app,
+                'startup_ms': round((app['import_s'] + app['first_run_s']) * 1000, 1)
+            }
+        results['heavy_imports_at_startup'] = fresh_interpreter(HEAVY_IMPORTS_SCRIPT, *HEAVY_MODULES)
+
+    results['budget_ms'] = args.budget_ms
+    results['within_budget'] = results['snapshot']['startup_ms'] <= args.budget_ms
+    return results
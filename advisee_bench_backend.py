@@ -0,0 +1,306 @@
+# AdviseeMatrix benchmarks of the back-end
+#
+# Scenarios for what runs beside the app: the audit service, cohort
+# analytics, the graduation planner, headless audits, the audit cache and
+# the registrar export. Run them through advisee_bench.py.
+
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from advisee_bench_common import (ROOT, environment, fresh_interpreter, iter_synthetic_records, latency_stats,
+                                  synthetic_catalog, synthetic_records)
+
+# Run in a fresh interpreter: export a store with advisee_export.py
+EXPORT_SCRIPT = """
+import json, resource, sys, time
+import advisee_export
+started = time.perf_counter()
+advisee_export.main(sys.argv[1:])
+elapsed = time.perf_counter() - started
+print(json.dumps({'elapsed_s': elapsed, 'max_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024}))
+"""
+
+
+def wait_for(url, timeout=60):
+    """Poll a URL until it answers, e.g. a service that is starting up"""
+    from urllib.error import URLError
+    from urllib.request import urlopen
+
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urlopen(url, timeout=5):
+                return
+        except (URLError, ConnectionError):
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)
+
+
+def bench_service(args):
+    """Audit service throughput and p99 latency for single and batch audits under local load"""
+    import asyncio
+    import socket
+
+    from advisee_catalog import load_catalog
+    from advisee_service import generate_load
+    from advisee_store import MatrixStore
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'catalog.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(synthetic_catalog(args.courses, args.majors, args.slots, args.seed), f)
+        records = synthetic_records(load_catalog(path), args.students, args.seed)
+        db = os.path.join(tmp, 'bench.db')
+        store = MatrixStore(db)
+        for record in records:
+            store.save(record['student_id'], record)
+        store.close()
+        student_ids = [record['student_id'] for record in records]
+
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        url = f'http://127.0.0.1:{port}'
+        with environment(ADVISEE_CATALOG_PATH=path, ADVISEE_DB_PATH=db):
+            server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'advisee_service.py'), 'serve', '--port', str(port)],
+                                      cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for(f'{url}/health')
+            # Start the worker processes before timing
+            asyncio.run(generate_load(url, student_ids, 50, args.concurrency))
+            return {
+                'workers': os.cpu_count(),
+                'students': len(student_ids),
+                'single': asyncio.run(generate_load(url, student_ids, args.requests, args.concurrency)),
+                'batch': asyncio.run(generate_load(url, student_ids, max(1, args.requests // args.batch_size),
+                                                   min(args.concurrency, 4), args.batch_size))
+            }
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+def bench_analytics(args):
+    """Cohort analytics refresh and dashboard query times over a store of synthetic matrices"""
+    from advisee_analytics import CohortAnalytics
+    from advisee_catalog import load_catalog
+    from advisee_store import MatrixStore
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'catalog.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(synthetic_catalog(args.courses, args.majors, args.slots, args.seed), f)
+        catalog = load_catalog(path)
+        store = MatrixStore(os.path.join(tmp, 'bench.db'))
+        for i, record in enumerate(iter_synthetic_records(catalog, args.students, args.seed), 1):
+            store.save(record['student_id'], record)
+            if i % 5000 == 0:
+                store.flush()
+        store.flush()
+        # Spread the saves over the past week, as a real store's are; rows saved
+        # within REFRESH_OVERLAP of the newest are read again by every refresh
+        with store.pool.connection() as connection:
+            connection.execute('UPDATE matrices SET updated_at = updated_at - 3600 - rowid * ?', (7 * 86400 / args.students,))
+
+        major_key = next(iter(catalog.major_requirements))
+        plan = catalog.plan(major_key)
+        code = next(code for code, required in zip(plan.codes, plan.required) if required)
+        with environment(ADVISEE_CATALOG_PATH=path):
+            analytics = CohortAnalytics(os.path.join(tmp, 'analytics'), store)
+
+            def dashboard():
+                analytics.overview()
+                analytics.pass_rates()
+                analytics.pass_rates(major_key)
+                analytics.gpa_distribution(major_key)
+                analytics.blocked(code)
+
+            full = analytics.refresh(full=True)
+            cold, cached, grades = [], [], []
+            for _ in range(args.runs):
+                analytics._cache.clear()
+                started = time.perf_counter()
+                dashboard()
+                cold.append(time.perf_counter() - started)
+                started = time.perf_counter()
+                dashboard()
+                cached.append(time.perf_counter() - started)
+                started = time.perf_counter()
+                analytics.course_grades(code)
+                grades.append(time.perf_counter() - started)
+
+            # One student changes major: two majors' slot files are rewritten
+            record = store.load('S000000')
+            record['current_major'] = list(catalog.major_requirements)[-1]
+            store.save('S000000', record)
+            store.flush()
+            incremental = analytics.refresh()
+            dataset_bytes = sum(entry.stat().st_size for entry in os.scandir(analytics.directory) if entry.is_file())
+        store.close()
+        return {
+            'students': args.students,
+            'rows': analytics.overview()['rows'],
+            'dataset_bytes': dataset_bytes,
+            'full_refresh_s': full['elapsed_s'],
+            'incremental_refresh_s': incremental['elapsed_s'],
+            'incremental_majors_rewritten': incremental['majors_rewritten'],
+            'dashboard_cold': latency_stats(cold),
+            'dashboard_cached': latency_stats(cached),
+            'course_grades_scan': latency_stats(grades)
+        }
+
+
+def bench_planner(args):
+    """Graduation plans for synthetic students over a catalog with prerequisite chains"""
+    from advisee_catalog import Catalog
+    from advisee_planner import current_term, parse_term, plan_graduation
+    from advisee_store import decode_entries
+
+    data = synthetic_catalog(args.courses, args.majors, args.slots, args.seed)
+    catalog = Catalog(data['course_data'], data['major_requirements'], version='bench')
+    scale = catalog.grading_scale
+    start = current_term('Fall', '2026')
+    seasons = ('Fall', 'Spring', 'Summer')
+    cases = {
+        # Every slot still open
+        'new_student': [(major_key, {}) for major_key in catalog.major_requirements],
+        # Synthetic transcripts, about half of each major taken
+        'transcripts': [(record['current_major'], decode_entries(record['course_entries'], scale))
+                        for record in iter_synthetic_records(catalog, args.students, args.seed)]
+    }
+
+    results = {}
+    for name, students in cases.items():
+        for graduation in ('Spring 2028', 'Spring 2030', 'Spring 2032'):
+            samples, states = [], []
+            outcomes = {'feasible': 0, 'infeasible': 0, 'undecided': 0}
+            for major_key, course_entries in students:
+                started = time.perf_counter()
+                plan = plan_graduation(catalog, major_key, course_entries, start, parse_term(graduation), seasons)
+                samples.append(time.perf_counter() - started)
+                states.append(plan.states)
+                outcomes[{True: 'feasible', False: 'infeasible', None: 'undecided'}[plan.feasible]] += 1
+            results[f"{name}_by_{graduation.replace(' ', '_').lower()}"] = dict(
+                latency_stats(samples), students=len(students), max_states=max(states), **outcomes)
+    return results
+
+
+def bench_audit(args):
+    """Cohort audits by running totals over decoded entries and by audit_record, before and after a grade change"""
+    from advisee_catalog import Catalog
+    from advisee_progress import ProgressAccumulator, audit_record
+    from advisee_store import decode_entries
+
+    data = synthetic_catalog(args.courses, args.majors, args.slots, args.seed)
+    catalog = Catalog(data['course_data'], data['major_requirements'], version='bench')
+    scale = catalog.grading_scale
+    records = synthetic_records(catalog, args.students, args.seed)
+
+    def accumulated(record):
+        totals = ProgressAccumulator(catalog.plan(record['current_major']), scale)
+        totals.rebuild(decode_entries(record['course_entries'], scale))
+        return totals.summary()
+
+    def audited(record):
+        summary = audit_record(catalog, record)
+        return {key: value for key, value in summary.items() if key not in ('student_id', 'catalog_version')}
+
+    def audit_pass(audit):
+        started = time.perf_counter()
+        summaries = [audit(record) for record in records]
+        return round((time.perf_counter() - started) * 1000, 3), summaries
+
+    results = {}
+    results['accumulator_ms'], expected = audit_pass(accumulated)
+    results['audit_record_ms'], summaries = audit_pass(audited)
+    matches = summaries == expected
+
+    rng = random.Random(args.seed)
+    for record in records:
+        entry = record['course_entries'][rng.choice(list(record['course_entries']))]
+        entry.update(status='Completed', grade='B' if entry['grade'] == 'A' else 'A')
+    results['one_change_accumulator_ms'], expected = audit_pass(accumulated)
+    results['one_change_audit_record_ms'], summaries = audit_pass(audited)
+    matches &= summaries == expected
+    return dict(results, students=len(records), matches=matches)
+
+
+def bench_cache(args):
+    """Cohort audits through the audit cache: cold, repeated, and after one grade change per student"""
+    from advisee_audit_cache import AuditCache
+    from advisee_catalog import Catalog
+    from advisee_progress import ProgressAccumulator
+    from advisee_store import decode_entries
+
+    data = synthetic_catalog(args.courses, args.majors, args.slots, args.seed)
+    catalog = Catalog(data['course_data'], data['major_requirements'], version='bench')
+    scale = catalog.grading_scale
+    records = synthetic_records(catalog, args.students, args.seed)
+
+    def accumulated(record):
+        totals = ProgressAccumulator(catalog.plan(record['current_major']), scale)
+        totals.rebuild(decode_entries(record['course_entries'], scale))
+        return totals.summary()
+
+    def audit_pass(audit):
+        started = time.perf_counter()
+        summaries = [audit(catalog, record['current_major'], record['course_entries'], record['student_id'])
+                     for record in records]
+        return round((time.perf_counter() - started) * 1000, 3), summaries
+
+    results, matches = {}, True
+    expected = [accumulated(record) for record in records]
+    cache = AuditCache(max(AuditCache().max_entries, 8 * len(records)))
+    for name, audit in (('uncached', AuditCache(0).audit), ('cold', cache.audit), ('warm', cache.audit)):
+        results[f'{name}_ms'], summaries = audit_pass(audit)
+        matches &= summaries == expected
+
+    rng = random.Random(args.seed)
+    for record in records:
+        entry = record['course_entries'][rng.choice(list(record['course_entries']))]
+        entry.update(status='Completed', grade='B' if entry['grade'] == 'A' else 'A')
+    expected = [accumulated(record) for record in records]
+    results['one_change_ms'], summaries = audit_pass(cache.audit)
+    matches &= summaries == expected
+    return dict(results, students=len(records), matches=matches, **cache.stats())
+
+
+def bench_export(args):
+    """Streaming export of a store to CSV, XLSX and Parquet: throughput and peak memory at two roster sizes"""
+    from advisee_catalog import load_catalog
+    from advisee_export import FORMATS
+    from advisee_store import MatrixStore
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'catalog.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(synthetic_catalog(args.courses, args.majors, args.slots, args.seed), f)
+        catalog = load_catalog(path)
+        for students in (args.students, 4 * args.students):
+            db = os.path.join(tmp, f'{students}.db')
+            store = MatrixStore(db)
+            for i, record in enumerate(iter_synthetic_records(catalog, students, args.seed), 1):
+                store.save(record['student_id'], record)
+                if i % 5000 == 0:
+                    store.flush()
+            store.flush()
+            rows = sum(len(catalog.plan(record['current_major'])) for record in store.iter_records())
+            for fmt in FORMATS:
+                output = os.path.join(tmp, f'export.{fmt}')
+                with environment(ADVISEE_CATALOG_PATH=path):
+                    run = fresh_interpreter(EXPORT_SCRIPT, output, '--db', db)
+                results[f'{fmt}_{students}_students'] = {
+                    'rows': rows,
+                    'elapsed_s': round(run['elapsed_s'], 3),
+                    'rows_per_s': round(rows / run['elapsed_s'], 1),
+                    'max_rss_bytes': run['max_rss_bytes'],
+                    'file_bytes': os.path.getsize(output)
+                }
+    return results
@@ -0,0 +1,218 @@
+# AdviseeMatrix benchmark support
+#
+# What every benchmark scenario shares: timing summaries, temporary
+# environment variables, fresh interpreters, and the synthetic catalogs and
+# transcripts the scenarios run against (advisee_bench.py generate writes
+# them to files).
+
+import contextlib
+import csv
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(ROOT, 'advisee_matrix_streamlit.py')
+LEVELS = (1, 2, 3)
+GRADE_CHOICES = ('A', 'A-', 'B+', 'B', 'C', '')
+STATUS_CHOICES = ('Completed', 'Completed', 'In Progress', 'Not Taken')
+
+
+def latency_stats(samples):
+    """Summarize a list of durations in seconds as milliseconds"""
+    samples = sorted(samples)
+    return {
+        'runs': len(samples),
+        'median_ms': round(statistics.median(samples) * 1000, 3),
+        'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 3),
+        'max_ms': round(samples[-1] * 1000, 3)
+    }
+
+
+@contextlib.contextmanager
+def environment(**variables):
+    """Temporarily set environment variables"""
+    saved = {name: os.environ.get(name) for name in variables}
+    os.environ.update(variables)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def fresh_interpreter(script, *args):
+    """Run a script in a new Python process and return the JSON it prints last"""
+    output = subprocess.run([sys.executable, '-c', script, *args], cwd=ROOT,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+# -----------------------------------------------------------------------------
+# Synthetic data
+# -----------------------------------------------------------------------------
+
+def subject_codes(n):
+    """n distinct four-letter subject codes that cannot be mistaken for placeholders"""
+    letters = 'ABCDEFGHIJKLMNOPQRSTUVWYZ'
+    codes = []
+    for i in range(len(letters) ** 4):
+        code = ''.join(letters[i // len(letters) ** p % len(letters)] for p in (3, 2, 1, 0))
+        if code != 'ELEC':
+            codes.append(code)
+            if len(codes) == n:
+                break
+    return codes
+
+
+def synthetic_major(rng, subjects, slots, course_codes=None, name='Synthetic'):
+    """Major requirements with a mix of fixed, subject wildcard and ELEC slots
+
+    Fixed slots name courses from course_codes ({level: [codes]}) when given,
+    so transcripts drawn from the catalog can fill them.
+    """
+    sections = []
+    for level in LEVELS:
+        courses = []
+        for i in range(max(1, slots // len(LEVELS))):
+            kind = i % 4
+            if kind == 0:
+                if course_codes:
+                    code = rng.choice(course_codes[level])
+                else:
+                    code = f'{rng.choice(subjects)}{level}{rng.randint(0, 999):03d}'
+                required = True
+            elif kind == 3:
+                code, required = f'ELEC{level}XXX', False
+            else:
+                code, required = f'{rng.choice(subjects)}{level}XXX', False
+            courses.append({'code': code, 'credits': 3, 'required': required})
+        sections.append({'section': f'Level {level} Courses', 'required_credits': 3 * len(courses), 'courses': courses})
+    return {'name': name, 'total_credits': sum(s['required_credits'] for s in sections), 'requirements': sections}
+
+
+def synthetic_catalog(courses=2000, majors=20, slots=60, seed=0):
+    """Catalog data (the catalog.json layout) with the given numbers of courses and majors"""
+    rng = random.Random(seed)
+    subjects = subject_codes(max(4, courses // 100))
+    course_data = {}
+    while len(course_data) < courses:
+        subject, level = rng.choice(subjects), rng.choice(LEVELS)
+        code = f'{subject}{level}{rng.randint(0, 999):03d}'
+        course_data.setdefault(code, {
+            'name': f'{subject} Topics {len(course_data)}',
+            'credits': 3,
+            'level': level,
+            'type': rng.choice(('core', 'elective'))
+        })
+    add_prerequisites(course_data, seed)
+    by_level = {level: sorted(code for code, course in course_data.items() if course['level'] == level) for level in LEVELS}
+    major_requirements = {
+        f'M{m:03d}': synthetic_major(rng, subjects, slots, by_level, name=f'Synthetic Major {m}')
+        for m in range(majors)
+    }
+    return {'course_data': course_data, 'major_requirements': major_requirements}
+
+
+def add_prerequisites(course_data, seed=0):
+    """Give synthetic courses prerequisites and the seasons they run in
+
+    Prerequisites are courses generated earlier at the same or a lower
+    level, so they chain without cycles. They are drawn from a generator of
+    their own, so the courses and majors stay those of earlier commits.
+    """
+    rng = random.Random(f'prerequisites-{seed}')
+    earlier = {level: [] for level in LEVELS}
+    for code, course in course_data.items():
+        prerequisites = set()
+        for _ in range(rng.choice((0, 1, 1, 2))):
+            level = rng.randint(LEVELS[0], course['level'])
+            if earlier[level]:
+                prerequisites.add(rng.choice(earlier[level]))
+        course['prerequisites'] = sorted(prerequisites)
+        course['offered'] = list(rng.choice((('Fall',), ('Spring',), ('Fall', 'Spring'), ('Fall', 'Spring', 'Summer'))))
+        earlier[course['level']].append(code)
+
+
+def synthetic_record(plan, rng, index=None):
+    """A matrix record with every slot of a plan filled in
+
+    Wildcard slots get a catalog course fitting them when a course index is
+    given, otherwise a made-up ELEC code.
+    """
+    course_entries = {}
+    for slot, row_id in enumerate(plan.row_ids):
+        code = plan.default_codes[slot]
+        if not code:
+            fitting = index.resolve(plan.codes[slot]) if index is not None else ()
+            code = rng.choice(fitting) if fitting else f'ELEC{rng.randint(1000, 3999)}'
+        course_entries[row_id] = {
+            'code': code,
+            'credits': plan.default_credits[slot],
+            'grade': rng.choice(GRADE_CHOICES),
+            'status': rng.choice(STATUS_CHOICES)
+        }
+    return {'student_info': {'student_id': ''}, 'current_major': plan.major_key, 'course_entries': course_entries}
+
+
+def synthetic_records(catalog, students, seed=0):
+    """Matrix records for a cohort spread over the catalog's majors"""
+    return list(iter_synthetic_records(catalog, students, seed))
+
+
+def iter_synthetic_records(catalog, students, seed=0):
+    """synthetic_records, one at a time, for cohorts too large to hold in memory"""
+    rng = random.Random(seed)
+    majors = list(catalog.major_requirements)
+    index = catalog.course_index()
+    for n in range(students):
+        record = synthetic_record(catalog.plan(majors[n % len(majors)]), rng, index)
+        record['student_id'] = f'S{n:06d}'
+        record['student_info'].update(student_id=record['student_id'], first_name='Student', surname=str(n),
+                                      academic_year='2026', semester='Fall', graduation_term='Spring 2028')
+        yield record
+
+
+def write_transcripts(records, path):
+    """Write records as a transcript CSV for advisee_audit.py"""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(('student_id', 'major', 'section', 'slot', 'code', 'credits', 'grade', 'status'))
+        for record in records:
+            for row_id, entry in record['course_entries'].items():
+                section, slot = row_id.rsplit('_', 1)
+                writer.writerow((record['student_id'], record['current_major'], section, slot,
+                                 entry['code'], entry['credits'], entry['grade'], entry['status']))
+
+
+def write_registrar_export(records, path):
+    """Write records as a registrar export (one row per course taken) for advisee_import.py"""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(('student_id', 'first_name', 'surname', 'course_code', 'credits', 'grade', 'status'))
+        for record in records:
+            info = record['student_info']
+            for entry in record['course_entries'].values():
+                if entry['status'] != 'Not Taken':
+                    writer.writerow((record['student_id'], info['first_name'], info['surname'],
+                                     entry['code'], entry['credits'], entry['grade'], entry['status']))
+
+
+def write_synthetic_data(out_dir, args):
+    """Write a synthetic catalog and transcripts into out_dir; returns the catalog path"""
+    from advisee_catalog import load_catalog
+
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, 'catalog.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(synthetic_catalog(args.courses, args.majors, args.slots, args.seed), f, indent=1)
+    records = synthetic_records(load_catalog(path), args.students, args.seed)
+    write_transcripts(records, os.path.join(out_dir, 'transcripts.csv'))
+    write_registrar_export(records, os.path.join(out_dir, 'registrar.csv'))
+    return path
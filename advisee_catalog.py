@@ -0,0 +1,150 @@
+# AdviseeMatrix shared course catalog and major requirements
+#
+# The catalog lives in an external JSON data file (catalog.json next to this
+# module, or the file named by $ADVISEE_CATALOG_PATH). It is loaded once per
+# process, frozen into read-only mappings and tuples, and shared by every
+# Streamlit session and batch tool in the process - the same semantics as
+# st.cache_resource. Each lookup stats the data file and transparently
+# reloads it when it has changed, so catalog edits go live without a restart.
+# A changed file that does not load - half written, or not a valid catalog -
+# is logged and the last catalog that did load is kept until the file
+# changes again. The file may also be a binary snapshot compiled from catalog.json
+# (advisee_snapshot.py), which is memory-mapped instead of parsed.
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from types import MappingProxyType
+
+from advisee_course_index import CourseIndex
+from advisee_grading import DEFAULT_SCALE, GradingScale
+from advisee_plan import compile_plan
+from advisee_session import RowLayout
+
+CATALOG_PATH_ENV = 'ADVISEE_CATALOG_PATH'
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'catalog.json')
+
+logger = logging.getLogger('advisee.catalog')
+
+
+def freeze(value):
+    """Recursively convert dicts and lists into read-only mappings and tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class Catalog:
+    """Immutable course catalog and major requirements"""
+
+    def __init__(self, course_data, major_requirements, version='', path=None, grading_scale=None,
+                 course_index=None):
+        self.course_data = freeze(course_data)
+        self.major_requirements = freeze(major_requirements)
+        self.grading_scale = grading_scale or DEFAULT_SCALE
+        self.version = version
+        self.path = path
+        self._plans = {}
+        self._course_index = course_index
+        self._row_layout = None
+
+    def plan(self, major_key):
+        """Compiled requirement plan for a major, built once per catalog version"""
+        plan = self._plans.get(major_key)
+        if plan is None:
+            plan = self._plans[major_key] = compile_plan(major_key, self.major_requirements, self.course_data)
+        return plan
+
+    def course_index(self):
+        """Course code index over the catalog, built once per catalog version"""
+        if self._course_index is None:
+            self._course_index = CourseIndex(self.course_data)
+        return self._course_index
+
+    def row_layout(self):
+        """Positions of every requirement row across majors, for compact course entries"""
+        if self._row_layout is None:
+            self._row_layout = RowLayout(self.major_requirements)
+        return self._row_layout
+
+
+def load_catalog(path):
+    """Read and freeze a catalog data file, or map a catalog snapshot"""
+    from advisee_snapshot import MAGIC, load_snapshot
+
+    with open(path, 'rb') as f:
+        raw = f.read(len(MAGIC))
+        if raw == MAGIC:
+            return load_snapshot(path)
+        raw += f.read()
+    data = json.loads(raw)
+    return Catalog(
+        data['course_data'],
+        data['major_requirements'],
+        version=hashlib.sha1(raw).hexdigest()[:12],
+        path=path,
+        grading_scale=GradingScale(data['grading_scale']) if data.get('grading_scale') else None
+    )
+
+
+class CatalogStore:
+    """Process-wide holder of one catalog file, reloaded when the file changes"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._catalog = None
+        self._stamp = None
+
+    def _file_stamp(self):
+        stat = os.stat(self.path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def get(self):
+        """Return the current catalog, reloading it if the data file changed
+
+        Once a catalog has loaded, a file that fails to load is logged and
+        the last catalog is returned instead.
+        """
+        stamp = self._file_stamp()
+        if self._catalog is not None and stamp == self._stamp:
+            return self._catalog
+        with self._lock:
+            # Another thread may have reloaded while we waited for the lock
+            stamp = self._file_stamp()
+            if self._catalog is None or stamp != self._stamp:
+                try:
+                    catalog = load_catalog(self.path)
+                except (OSError, ValueError, KeyError, TypeError):
+                    if self._catalog is None:
+                        raise
+                    logger.exception("Catalog %s did not load; keeping version %s", self.path,
+                                     self._catalog.version)
+                else:
+                    self._catalog = catalog
+                # Not tried again until the file changes again
+                self._stamp = stamp
+            return self._catalog
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def catalog_path():
+    """Path of the catalog data file this process uses"""
+    return os.environ.get(CATALOG_PATH_ENV) or DEFAULT_CATALOG_PATH
+
+
+def get_catalog(path=None):
+    """Return the shared catalog for this process"""
+    path = os.path.abspath(path or catalog_path())
+    store = _stores.get(path)
+    if store is None:
+        with _stores_lock:
+            store = _stores.setdefault(path, CatalogStore(path))
+    return store.get()
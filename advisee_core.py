@@ -0,0 +1,41 @@
+# AdviseeMatrix core definitions
+# Shared by the Streamlit app and the headless batch tools, so nothing in
+# here may import streamlit. Grades and quality points are defined by the
+# grading scale in advisee_grading.py.
+
+STATUS_OPTIONS = ['Not Taken', 'Completed', 'In Progress']
+SEMESTER_OPTIONS = ['Fall', 'Winter', 'Spring', 'Summer']
+# Most credits a course slot can carry, as the app's credit inputs allow
+MAX_CREDITS = 6
+
+
+def is_placeholder_code(code):
+    """Check whether a requirement code is an elective/wildcard placeholder"""
+    return 'ELEC' in code or 'XXX' in code
+
+
+def split_course_code(code):
+    """Split a course code into its subject letters and number, e.g. BIOL3105 -> ('BIOL', '3105')"""
+    code = code.strip().upper()
+    number_start = len(code) - len(code.lstrip('ABCDEFGHIJKLMNOPQRSTUVWXYZ'))
+    return code[:number_start], code[number_start:]
+
+
+def placeholder_pattern(code):
+    """Subject and level prefix a placeholder accepts, e.g. BIOL3XXX -> ('BIOL', '3')"""
+    subject, number = split_course_code(code)
+    # ELEC placeholders take a course from any subject
+    if subject == 'ELEC':
+        subject = ''
+    return subject, number.rstrip('X')
+
+
+def parse_credits(value):
+    """Credits of a course as a whole number from 0 to MAX_CREDITS; raises ValueError otherwise"""
+    try:
+        credits = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"credits {value!r} is not a number") from None
+    if not credits.is_integer() or not 0 <= credits <= MAX_CREDITS:
+        raise ValueError(f"credits {value!r} is not a whole number from 0 to {MAX_CREDITS}")
+    return int(credits)
@@ -0,0 +1,94 @@
+# AdviseeMatrix course code index
+#
+# Answers "which catalog courses satisfy this slot?" for wildcard slots such
+# as BIOL3XXX (any BIOL level-3 course) and ELEC2XXX (any level-2 course),
+# checks codes typed into elective rows, and lists the courses the code
+# selectbox offers for a slot.
+#
+# The index is two sorted arrays over the catalog's course codes: one
+# ordered by code (subject then number) and one ordered by number then
+# subject. Every wildcard is a contiguous range in one of them, found by
+# binary search, so lookups cost O(log n) plus the size of the answer however
+# large the catalog is. It is built once per catalog
+# version by Catalog.course_index(), or read ready-sorted from a catalog
+# snapshot.
+
+import re
+from bisect import bisect_left
+
+from advisee_core import is_placeholder_code, placeholder_pattern, split_course_code
+
+COURSE_CODE_RE = re.compile(r'^[A-Z]{2,5}[0-9]{4}$')
+
+# Sorts after every character that appears in a course code
+RANGE_END = '\uffff'
+
+
+def prefix_range(keys, prefix):
+    """Bounds of the run of sorted keys starting with prefix"""
+    return bisect_left(keys, prefix), bisect_left(keys, prefix + RANGE_END)
+
+
+class CourseIndex:
+    """Sorted-array index of catalog course codes by subject and level"""
+
+    __slots__ = ('codes', 'number_keys', 'number_codes')
+
+    def __init__(self, course_data):
+        # The catalog also names placeholder codes; only real courses are indexed
+        self.codes = tuple(sorted(code for code in course_data if not is_placeholder_code(code)))
+        by_number = sorted((number + ' ' + subject, subject + number)
+                           for subject, number in map(split_course_code, self.codes))
+        self.number_keys = tuple(key for key, _ in by_number)
+        self.number_codes = tuple(code for _, code in by_number)
+
+    @classmethod
+    def from_sorted(cls, codes, number_keys, number_codes):
+        """An index over arrays that are already sorted, e.g. read from a catalog snapshot"""
+        index = cls.__new__(cls)
+        index.codes = codes
+        index.number_keys = number_keys
+        index.number_codes = number_codes
+        return index
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, code):
+        i = bisect_left(self.codes, code)
+        return i < len(self.codes) and self.codes[i] == code
+
+    def resolve(self, slot_code):
+        """Catalog courses that can fill a slot with this code"""
+        if not is_placeholder_code(slot_code):
+            return (slot_code,) if slot_code in self else ()
+        subject, number = placeholder_pattern(slot_code)
+        if subject:
+            start, stop = prefix_range(self.codes, subject + number)
+            matches = self.codes[start:stop]
+            if not number:
+                # BIOLXXXX must not pick up BIOLA1000
+                matches = tuple(code for code in matches if split_course_code(code)[0] == subject)
+            return matches
+        # Any subject: these come out in course number order
+        start, stop = prefix_range(self.number_keys, number)
+        return self.number_codes[start:stop]
+
+    def satisfies(self, code, slot_code):
+        """Whether a course code fits a slot, by the same rules as the slot index"""
+        if not is_placeholder_code(slot_code):
+            return code == slot_code
+        subject, number = split_course_code(code)
+        pattern_subject, pattern_number = placeholder_pattern(slot_code)
+        return pattern_subject in ('', subject) and number.startswith(pattern_number)
+
+    def check_code(self, code, slot_code=None):
+        """Problem with a typed course code, or None if it is a catalog course fitting the slot"""
+        code = code.strip().upper()
+        if not COURSE_CODE_RE.match(code):
+            return f"{code} is not a course code (e.g. BIOL3105)"
+        if code not in self:
+            return f"{code} is not in the course catalog"
+        if slot_code is not None and not self.satisfies(code, slot_code):
+            return f"{code} does not satisfy {slot_code}"
+        return None
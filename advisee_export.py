@@ -0,0 +1,223 @@
+# AdviseeMatrix registrar export
+#
+# Writes filled-in matrices out with one row per requirement slot of the
+# student's major:
+#
+#   student_id, major, section, code, name, credits, grade, status, qp
+#
+# Slots nothing has been entered for carry the requirement's own code and
+# credits, no grade and status Not Taken; qp is the quality points the slot
+# adds to the Progress Summary. The app exports the matrix on screen; the
+# command line exports one saved matrix or every matrix in the store.
+#
+# Rows come from a generator over the store's streaming cursor and are
+# written as they come, so memory stays flat however many matrices are
+# exported:
+#
+# - csv: the csv module, CHUNK_ROWS rows at a time;
+# - xlsx: an openpyxl write-only workbook, which streams rows to a
+#   temporary file as they are appended; a sheet holds at most
+#   XLSX_MAX_ROWS rows, so larger exports continue on further sheets;
+# - parquet: a pyarrow ParquetWriter, one row group of CHUNK_ROWS rows at
+#   a time.
+#
+# Matrices without a major, or with one the catalog no longer has, are
+# skipped.
+#
+# Usage:
+#   python advisee_export.py out.parquet [--student S000001] [--format csv|xlsx|parquet] [--db advisee_matrix.db]
+
+import argparse
+import csv
+import io
+import itertools
+import os
+import re
+import sys
+import tempfile
+import time
+
+from advisee_plan import CUSTOM_COURSE_NAME
+from advisee_progress import entry_contribution
+
+EXPORT_COLUMNS = ('student_id', 'major', 'section', 'code', 'name', 'credits', 'grade', 'status', 'qp')
+FORMATS = ('csv', 'xlsx', 'parquet')
+MIME_TYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'parquet': 'application/vnd.apache.parquet'
+}
+CHUNK_ROWS = 10000
+# Rows of an Excel worksheet, header included
+XLSX_MAX_ROWS = 1048576
+
+
+class ExportCounts:
+    """Matrices and rows an export has written so far"""
+
+    __slots__ = ('matrices', 'skipped', 'rows')
+
+    def __init__(self):
+        self.matrices = 0
+        self.skipped = 0
+        self.rows = 0
+
+
+def matrix_rows(catalog, records, counts=None):
+    """Export rows, one per requirement slot, of stored matrix records (letter grades)"""
+    scale = catalog.grading_scale
+    counts = counts if counts is not None else ExportCounts()
+    # Names of the courses typed into elective slots; looked up in the
+    # catalog once per export
+    names = {}
+    for record in records:
+        major_key = record.get('current_major')
+        if major_key not in catalog.major_requirements:
+            counts.skipped += 1
+            continue
+        counts.matrices += 1
+        plan = catalog.plan(major_key)
+        course_entries = record.get('course_entries') or {}
+        student_id = record.get('student_id') or (record.get('student_info') or {}).get('student_id') or ''
+        section_names = [section.name for section in plan.sections]
+        for slot, row_id in enumerate(plan.row_ids):
+            entry = course_entries.get(row_id)
+            if entry is None:
+                code, credits, grade, status = plan.default_codes[slot], plan.default_credits[slot], '', 'Not Taken'
+            else:
+                code, credits, status = entry.get('code') or '', entry['credits'], entry['status']
+                grade = entry['grade'] or ''
+            if plan.placeholder[slot]:
+                name = names.get(code)
+                if name is None:
+                    name = names[code] = catalog.course_data.get(code, {}).get('name', CUSTOM_COURSE_NAME)
+            else:
+                name = plan.names[slot]
+            qp = entry_contribution({'credits': credits, 'grade': scale.encode(grade), 'status': status}, scale)[2]
+            counts.rows += 1
+            yield (student_id, major_key, section_names[plan.section_index[slot]], code, name, credits, grade, status, qp)
+
+
+def chunked(rows, size=CHUNK_ROWS):
+    """Lists of up to size rows"""
+    rows = iter(rows)
+    while chunk := list(itertools.islice(rows, size)):
+        yield chunk
+
+
+def write_csv(rows, f):
+    """Write export rows to a binary file as UTF-8 CSV"""
+    text = io.TextIOWrapper(f, encoding='utf-8', newline='')
+    try:
+        writer = csv.writer(text)
+        writer.writerow(EXPORT_COLUMNS)
+        for chunk in chunked(rows):
+            writer.writerows(chunk)
+    finally:
+        text.flush()
+        text.detach()
+
+
+def write_xlsx(rows, f):
+    """Write export rows to a binary file as an Excel workbook"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet, sheet_rows, sheets = None, XLSX_MAX_ROWS, 0
+    for row in rows:
+        if sheet_rows == XLSX_MAX_ROWS:
+            sheets += 1
+            sheet = workbook.create_sheet(f'Matrices {sheets}' if sheets > 1 else 'Matrices')
+            sheet.append(EXPORT_COLUMNS)
+            sheet_rows = 1
+        sheet.append(row)
+        sheet_rows += 1
+    if sheet is None:
+        workbook.create_sheet('Matrices').append(EXPORT_COLUMNS)
+    workbook.save(f)
+
+
+def write_parquet(rows, f):
+    """Write export rows to a binary file as Parquet, one row group per chunk"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('student_id', pa.string()), ('major', pa.string()), ('section', pa.string()),
+        ('code', pa.string()), ('name', pa.string()), ('credits', pa.int32()),
+        ('grade', pa.string()), ('status', pa.string()), ('qp', pa.float64())
+    ])
+    with pq.ParquetWriter(f, schema) as writer:
+        for chunk in chunked(rows):
+            columns = zip(*chunk)
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema))
+        # A file with no row groups is still a valid, empty table
+
+
+WRITERS = {'csv': write_csv, 'xlsx': write_xlsx, 'parquet': write_parquet}
+
+
+def export_matrices(catalog, records, f, fmt):
+    """Write the export rows of matrix records to a binary file in a format; returns the counts"""
+    counts = ExportCounts()
+    WRITERS[fmt](matrix_rows(catalog, records, counts), f)
+    return counts
+
+
+def export_bytes(catalog, records, fmt):
+    """The export of a few matrix records as bytes, e.g. for a download"""
+    buffer = io.BytesIO()
+    export_matrices(catalog, records, buffer, fmt)
+    return buffer.getvalue()
+
+
+def export_filename(student_id, fmt):
+    """File name for one student's export"""
+    return f"matrix_{re.sub(r'[^A-Za-z0-9._-]', '_', student_id)}.{fmt}"
+
+
+def main(argv=None):
+    from advisee_catalog import get_catalog
+    from advisee_store import get_store
+
+    parser = argparse.ArgumentParser(description="Export saved advisee matrices, one row per requirement slot")
+    parser.add_argument('output', help="file to write")
+    parser.add_argument('--format', choices=FORMATS, help="file format (default: from the output's extension)")
+    parser.add_argument('--student', help="export only this student's matrix")
+    parser.add_argument('--db', help="matrix database (default: $ADVISEE_DB_PATH)")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or os.path.splitext(args.output)[1].lstrip('.').lower()
+    if fmt not in FORMATS:
+        parser.error(f"cannot tell the format of {args.output}; pass --format {{{','.join(FORMATS)}}}")
+    store = get_store(args.db)
+    if args.student:
+        record = store.load(args.student)
+        if record is None:
+            parser.error(f"no saved matrix for student {args.student}")
+        records = [dict(record, student_id=args.student)]
+    else:
+        records = store.iter_records()
+
+    # Written beside the output and renamed over it, so an interrupted
+    # export never leaves a truncated file behind
+    started = time.perf_counter()
+    directory = os.path.dirname(os.path.abspath(args.output))
+    fd, tmp_path = tempfile.mkstemp(prefix='.export-', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            counts = export_matrices(get_catalog(), records, f, fmt)
+        os.replace(tmp_path, args.output)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    elapsed = time.perf_counter() - started
+    skipped = f" ({counts.skipped} without a known major skipped)" if counts.skipped else ""
+    print(f"Exported {counts.rows} rows of {counts.matrices} matrices{skipped} to {args.output} in {elapsed:.2f}s",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
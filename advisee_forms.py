@@ -0,0 +1,271 @@
+# AdviseeMatrix declaration of major forms
+#
+# Renders the Declaration of Major Form shown in advisee_matrix_streamlit.py
+# from a single Jinja2 template, as HTML and as a one-page PDF, and renders
+# forms for a whole roster in batch: saved matrices are fanned out to a
+# process pool in chunks and the finished forms are written into a zip
+# archive as they complete. Each worker loads the catalog and compiles the
+# template once, in the pool initializer.
+#
+# Usage:
+#   python advisee_forms.py declarations.zip [--roster ids.txt] [--format html pdf]
+#
+# Without --roster, a form is rendered for every matrix in the matrix store.
+# A roster is a text or CSV file with one student ID per line (a header line
+# "student_id" is skipped).
+
+import argparse
+import os
+import re
+import sys
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+from advisee_catalog import catalog_path, get_catalog, load_catalog
+from advisee_store import get_store
+
+FORMATS = ('html', 'pdf')
+
+FORM_TEMPLATE = """
+<div style='border: 2px solid #333; padding: 20px; margin: 20px 0;'>
+    <h3 style='text-align: center; margin-bottom: 30px;'>DECLARATION OF MAJOR FORM</h3>
+
+    <p><strong>Academic Year:</strong> {{ academic_year }}</p>
+    <p><strong>Semester:</strong> {{ semester }}</p>
+    <p><strong>Student ID:</strong> {{ student_id }}</p>
+    <p><strong>Name:</strong> {{ name }}</p>
+    <p><strong>Contact No:</strong> {{ contact_no }}</p>
+    <p><strong>Email:</strong> {{ email }}</p>
+
+    <br>
+    <p><strong>I intend to graduate at the end of:</strong> {{ graduation_term }}</p>
+    <p><strong>Declaring Major in:</strong> {{ major_name }}</p>
+
+    <br><br>
+    {% for signer in signers %}
+    <p>{{ signer }}: ___________________________ Date: ___________</p>
+    {% if not loop.last %}<br>{% endif %}
+    {% endfor %}
+
+    <p style='text-align: center; margin-top: 30px; font-size: 12px;'>
+        Generated by AdviseeMatrix on {{ generated_at }}
+    </p>
+</div>
+"""
+
+SIGNERS = ('Student Signature', 'Academic Advisor Signature', 'Department Approval')
+
+_template = None
+
+
+def get_template():
+    """The compiled form template, compiled once per process"""
+    global _template
+    if _template is None:
+        from jinja2 import Environment
+
+        _template = Environment(autoescape=True).from_string(FORM_TEMPLATE)
+    return _template
+
+
+def form_context(student_info, major_name, generated_at=None):
+    """Template variables for one student's form"""
+    generated_at = generated_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    field = lambda key: str(student_info.get(key) or '')
+    return {
+        'academic_year': field('academic_year'),
+        'semester': field('semester'),
+        'student_id': field('student_id'),
+        'name': f"{field('first_name')} {field('middle_initial')} {field('surname')}",
+        'contact_no': field('contact_no'),
+        'email': field('email'),
+        'graduation_term': field('graduation_term'),
+        'major_name': major_name,
+        'signers': SIGNERS,
+        'generated_at': generated_at
+    }
+
+
+def declaration_context(catalog, student_info, major_key, generated_at=None):
+    """Template variables for a student declaring one of the catalog's majors"""
+    if major_key not in catalog.major_requirements:
+        raise ValueError(f"unknown major {major_key!r}")
+    return form_context(student_info, catalog.major_requirements[major_key]['name'], generated_at)
+
+
+def render_form_html(context):
+    """Declaration form as an HTML fragment"""
+    return get_template().render(context)
+
+
+def pdf_text(text):
+    """Escape a string for a PDF literal string in WinAnsi encoding"""
+    text = text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    return text.encode('cp1252', errors='replace')
+
+
+def render_form_pdf(context):
+    """Declaration form as a one-page PDF document"""
+    fields = (
+        ('Academic Year', 'academic_year'), ('Semester', 'semester'), ('Student ID', 'student_id'),
+        ('Name', 'name'), ('Contact No', 'contact_no'), ('Email', 'email'), None,
+        ('I intend to graduate at the end of', 'graduation_term'), ('Declaring Major in', 'major_name'), None
+    )
+    # Letter page, Helvetica; each field is a bold label and a regular value
+    ops = [b'BT', b'/F2 16 Tf 176 720 Td', b'(DECLARATION OF MAJOR FORM) Tj', b'/F1 11 Tf 22 TL -104 -50 Td']
+    for field in fields:
+        if field is None:
+            ops.append(b'T*')
+            continue
+        label, key = field
+        ops.append(b'/F2 11 Tf (' + pdf_text(label + ': ') + b') Tj /F1 11 Tf (' + pdf_text(context[key]) + b') Tj T*')
+    for signer in context['signers']:
+        ops.append(b'T* (' + pdf_text(f"{signer}: ___________________________ Date: ___________") + b') Tj T*')
+    ops.append(b'/F1 9 Tf T* (' + pdf_text(f"Generated by AdviseeMatrix on {context['generated_at']}") + b') Tj')
+    ops.append(b'ET')
+    # Border around the form
+    ops.append(b'2 w 50 60 512 690 re S')
+    stream = b'\n'.join(ops)
+
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 6 0 R'
+        b' /Resources << /Font << /F1 4 0 R /F2 5 0 R >> >> >>',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>',
+        b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream'
+    ]
+    pdf = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+    xref = len(pdf)
+    pdf += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    for offset in offsets:
+        pdf += b'%010d 00000 n \n' % offset
+    pdf += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(pdf)
+
+
+RENDERERS = {'html': lambda context: render_form_html(context).encode('utf-8'), 'pdf': render_form_pdf}
+
+
+# Pool worker state, set up once per process by init_worker()
+_worker_catalog = None
+
+
+def init_worker(path):
+    """Load the catalog and compile the template in a pool worker"""
+    global _worker_catalog
+    _worker_catalog = load_catalog(path)
+    get_template()
+
+
+def render_chunk(chunk, formats, generated_at):
+    """Render the forms for a chunk of (student_id, student_info, major) tuples"""
+    majors = _worker_catalog.major_requirements
+    rendered = []
+    for student_id, student_info, major_key in chunk:
+        if major_key not in majors:
+            rendered.append((student_id, None))
+            continue
+        context = form_context(dict(student_info, student_id=student_id), majors[major_key]['name'], generated_at)
+        rendered.append((student_id, {fmt: RENDERERS[fmt](context) for fmt in formats}))
+    return rendered
+
+
+def form_filename(student_id, fmt):
+    """Archive member name for a student's form"""
+    return f"declaration_{re.sub(r'[^A-Za-z0-9._-]', '_', student_id)}.{fmt}"
+
+
+def iter_chunks(records, size):
+    """Group matrix records into lists of the fields a form needs"""
+    chunk = []
+    for record in records:
+        chunk.append((record['student_id'], record['student_info'], record['current_major']))
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def write_forms_zip(records, out, formats=FORMATS, workers=None, chunk_size=64, path=None):
+    """Render forms for an iterable of matrix records into a zip archive
+
+    Returns (forms written, student IDs skipped for lack of a known major).
+    """
+    workers = workers or os.cpu_count() or 1
+    generated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    written, skipped = 0, []
+    chunks = iter_chunks(records, chunk_size)
+    with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as archive, \
+            ProcessPoolExecutor(workers, initializer=init_worker, initargs=(path or catalog_path(),)) as pool:
+        # Keep a bounded number of chunks in flight so the roster is streamed
+        # through the pool rather than queued up front
+        running = set()
+        while True:
+            for chunk in chunks:
+                running.add(pool.submit(render_chunk, chunk, formats, generated_at))
+                if len(running) >= workers * 2:
+                    break
+            if not running:
+                break
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                for student_id, files in future.result():
+                    if files is None:
+                        skipped.append(student_id)
+                        continue
+                    for fmt, data in files.items():
+                        archive.writestr(form_filename(student_id, fmt), data)
+                    written += 1
+    return written, skipped
+
+
+def read_roster(path):
+    """Student IDs listed in a roster file"""
+    with open(path, encoding='utf-8-sig') as f:
+        for line in f:
+            student_id = line.split(',')[0].strip()
+            if student_id and student_id.lower() != 'student_id':
+                yield student_id
+
+
+def roster_records(store, student_ids):
+    """Saved matrices for the students on a roster"""
+    for student_id in student_ids:
+        record = store.load(student_id)
+        if record is None:
+            print(f"No saved matrix for {student_id}", file=sys.stderr)
+            continue
+        yield record
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render declaration of major forms for a roster into a zip archive")
+    parser.add_argument('output', help="zip archive to write")
+    parser.add_argument('--roster', help="file of student IDs (default: every saved matrix)")
+    parser.add_argument('--db', help="matrix database (default: $ADVISEE_DB_PATH or advisee_matrix.db)")
+    parser.add_argument('--format', nargs='+', choices=FORMATS, default=list(FORMATS), dest='formats')
+    parser.add_argument('--workers', type=int, help="worker processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    store = get_store(args.db)
+    records = roster_records(store, read_roster(args.roster)) if args.roster else store.iter_records()
+
+    started = time.perf_counter()
+    written, skipped = write_forms_zip(records, args.output, args.formats, args.workers, path=get_catalog().path)
+    elapsed = time.perf_counter() - started
+    if skipped:
+        print(f"Skipped {len(skipped)} students without a declared major", file=sys.stderr)
+    print(f"Wrote {written} forms to {args.output} in {elapsed:.2f}s ({written / elapsed:.0f} forms/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# AdviseeMatrix grading scales
+#
+# Grades are stored everywhere (session state, summaries, batch arrays) as a
+# small integer code: the grade's position in the scale, with 0 meaning "no
+# grade entered". A GradingScale holds one precomputed lookup table per
+# property, so quality point math is a table index in the app and a
+# vectorized gather in the batch paths.
+#
+# A school-specific scale can be supplied as "grading_scale" in the catalog
+# data file, as a list of {"grade", "points", "counts_gpa", "counts_credits"}
+# objects, without touching any of the code that uses it.
+
+import hashlib
+import json
+from array import array
+
+# The scale AdviseeMatrix has always used. Every letter grade, including P
+# and R, counts towards both earned credits and the GPA denominator.
+DEFAULT_GRADES = [
+    {'grade': 'A+', 'points': 4.3}, {'grade': 'A', 'points': 4.0}, {'grade': 'A-', 'points': 3.7},
+    {'grade': 'B+', 'points': 3.3}, {'grade': 'B', 'points': 3.0}, {'grade': 'B-', 'points': 2.7},
+    {'grade': 'C+', 'points': 2.3}, {'grade': 'C', 'points': 2.0}, {'grade': 'C-', 'points': 1.7},
+    {'grade': 'D', 'points': 1.0}, {'grade': 'F', 'points': 0.0}, {'grade': 'P', 'points': 0.0},
+    {'grade': 'R', 'points': 0.0}
+]
+
+NO_GRADE = 0
+
+
+class GradingScale:
+    """Letter grades encoded as small integers with array-backed lookups"""
+
+    def __init__(self, grades):
+        grades = [dict(grade) for grade in grades]
+        self.letters = ('',) + tuple(grade['grade'] for grade in grades)
+        self.codes = {letter: code for code, letter in enumerate(self.letters)}
+        self.points = array('d', [0.0] + [float(grade['points']) for grade in grades])
+        self.counts_gpa = array('b', [0] + [bool(grade.get('counts_gpa', True)) for grade in grades])
+        self.counts_credits = array('b', [0] + [bool(grade.get('counts_credits', True)) for grade in grades])
+        self.version = hashlib.sha1(json.dumps(grades, sort_keys=True).encode()).hexdigest()[:12]
+        self._numpy_tables = None
+
+    def __len__(self):
+        return len(self.letters)
+
+    def encode(self, letter):
+        """Grade code for a letter grade; unknown or empty grades are NO_GRADE"""
+        return self.codes.get(letter, NO_GRADE)
+
+    def decode(self, code):
+        """Letter grade for a grade code"""
+        return self.letters[code]
+
+    def quality_points(self, code, credits):
+        """Calculate quality points based on grade code and credits"""
+        return self.points[code] * credits
+
+    def numpy_tables(self):
+        """Points, counts-toward-GPA and counts-toward-credits tables as NumPy arrays"""
+        if self._numpy_tables is None:
+            import numpy as np
+            self._numpy_tables = (
+                np.array(self.points, dtype=np.float64),
+                np.array(self.counts_gpa, dtype=bool),
+                np.array(self.counts_credits, dtype=bool)
+            )
+        return self._numpy_tables
+
+
+DEFAULT_SCALE = GradingScale(DEFAULT_GRADES)
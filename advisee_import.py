@@ -0,0 +1,298 @@
+# AdviseeMatrix registrar transcript import
+#
+# Streams a registrar CSV or XLSX export (one row per course taken, any
+# number of students) and fills in each student's matrix for a major:
+# course codes are validated against the catalog and matched onto the
+# major's requirement slots (advisee_matching.py), then the matrices are
+# saved to the matrix store.
+#
+# Files are read row by row and only one student's rows are held at a time,
+# so memory stays bounded however large the export is. Exports are expected
+# to list each student's courses together; a student whose rows appear again
+# later in the file has them merged into the matrix saved earlier.
+#
+# Students who already had a saved matrix before the import are skipped
+# (--existing skip, the default), have the courses merged into the slots
+# their matrix still has free (merge) or get a new matrix (replace). Rows
+# that cannot be read, such as credits that are not a whole number, and
+# students of an unknown major are rejected and reported; the rest of the
+# export is still imported.
+#
+# Usage:
+#   python advisee_import.py registrar_export.csv --major BIOL [--existing skip|merge|replace]
+#
+# Recognised columns (case-insensitive): student_id, course_code (or code),
+# credits, grade, status, major, first_name, middle_initial, surname,
+# email, contact_no. Only student_id and course_code are required.
+
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+
+from advisee_catalog import get_catalog
+from advisee_core import STATUS_OPTIONS, parse_credits
+from advisee_matching import match_courses
+from advisee_store import get_store
+
+COLUMN_ALIASES = {
+    'student id': 'student_id', 'studentid': 'student_id', 'id': 'student_id',
+    'code': 'course_code', 'course': 'course_code', 'course code': 'course_code',
+    'credit': 'credits', 'credit hours': 'credits',
+    'last_name': 'surname', 'last name': 'surname', 'first name': 'first_name'
+}
+STUDENT_INFO_COLUMNS = ('first_name', 'middle_initial', 'surname', 'email', 'contact_no')
+EXISTING_POLICIES = ('skip', 'merge', 'replace')
+# Rejected rows the command line lists
+REJECTED_SHOWN = 20
+
+
+def normalize_header(header):
+    """Map export column names onto the names the importer understands"""
+    columns = []
+    for name in header:
+        name = str(name or '').strip().lower()
+        columns.append(COLUMN_ALIASES.get(name, name.replace(' ', '_')))
+    if 'student_id' not in columns or 'course_code' not in columns:
+        raise ValueError("the export needs student_id and course_code columns")
+    return columns
+
+
+def iter_csv_rows(f):
+    """Yield row dicts from a CSV text stream"""
+    reader = csv.reader(f)
+    columns = normalize_header(next(reader))
+    for values in reader:
+        if any(values):
+            yield dict(zip(columns, values))
+
+
+def iter_xlsx_rows(f):
+    """Yield row dicts from an XLSX workbook's first sheet without loading it whole"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(f, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        columns = normalize_header(next(rows))
+        for values in rows:
+            if any(value not in (None, '') for value in values):
+                yield {column: '' if value is None else str(value).strip() for column, value in zip(columns, values)}
+    finally:
+        workbook.close()
+
+
+def iter_rows(source, name=None):
+    """Yield row dicts from a CSV/XLSX path or binary file object"""
+    name = name or (source if isinstance(source, str) else getattr(source, 'name', ''))
+    is_xlsx = name.lower().endswith(('.xlsx', '.xlsm'))
+    if isinstance(source, str):
+        if is_xlsx:
+            yield from iter_xlsx_rows(source)
+        else:
+            with open(source, newline='', encoding='utf-8-sig') as f:
+                yield from iter_csv_rows(f)
+    elif is_xlsx:
+        yield from iter_xlsx_rows(source)
+    else:
+        yield from iter_csv_rows(io.TextIOWrapper(source, encoding='utf-8-sig', newline=''))
+
+
+def iter_students(rows):
+    """Group consecutive rows by student, yielding (student_id, rows)"""
+    student_id, group = None, []
+    for row in rows:
+        row_student = str(row['student_id']).strip()
+        if row_student != student_id and group:
+            yield student_id, group
+            group = []
+        student_id = row_student
+        group.append(row)
+    if group:
+        yield student_id, group
+
+
+def parse_course(row, course_data):
+    """Turn an export row into a course dict with grade letters; raises ValueError for unreadable credits"""
+    code = str(row['course_code']).strip().upper()
+    grade = str(row.get('grade') or '').strip().upper()
+    status = str(row.get('status') or '').strip().title()
+    if status not in STATUS_OPTIONS:
+        status = 'Completed' if grade else 'In Progress'
+    credits = str(row.get('credits') or '').strip()
+    if credits:
+        credits = parse_credits(credits)
+    else:
+        credits = course_data.get(code, {}).get('credits')
+    return {'code': code, 'credits': credits, 'grade': grade, 'status': status}
+
+
+class ImportReport:
+    """Counts from one import run, and the rows it rejected"""
+
+    def __init__(self):
+        self.students = 0
+        self.merged = 0
+        self.skipped = 0
+        self.rows = 0
+        self.placed = 0
+        self.unplaced = 0
+        self.unknown_codes = {}
+        self.unknown_grades = {}
+        # {'row', 'student_id', 'error'} of each rejected row; rows are
+        # numbered from 1 after the header, blank rows not counted
+        self.rejected = []
+
+    def reject(self, row, student_id, error):
+        self.rejected.append({'row': row, 'student_id': student_id, 'error': str(error)})
+
+    def as_dict(self):
+        return {
+            'students': self.students,
+            'merged': self.merged,
+            'skipped': self.skipped,
+            'rows': self.rows,
+            'placed': self.placed,
+            'unplaced': self.unplaced,
+            'rejected': len(self.rejected),
+            'unknown_codes': len(self.unknown_codes),
+            'unknown_grades': len(self.unknown_grades)
+        }
+
+
+class TranscriptImporter:
+    """Builds storable matrix records from registrar export rows"""
+
+    def __init__(self, catalog, major_key=None, strict=False):
+        self.catalog = catalog
+        self.major_key = major_key
+        self.strict = strict
+        self.report = ImportReport()
+
+    def build_record(self, student_id, rows, existing=None, numbers=None):
+        """Matrix record for one student's rows, merged into an existing record
+
+        Rows that cannot be read are rejected into the report under their
+        numbers, by default those following the rows already read; an
+        unknown major raises ValueError.
+        """
+        major_key = self.major_key or str(rows[0].get('major') or '').strip().upper()
+        if major_key not in self.catalog.major_requirements:
+            raise ValueError(f"student {student_id}: unknown major {major_key!r}")
+
+        courses = []
+        numbers = numbers or range(self.report.rows + 1, self.report.rows + len(rows) + 1)
+        self.report.rows += len(rows)
+        for number, row in zip(numbers, rows):
+            try:
+                course = parse_course(row, self.catalog.course_data)
+            except ValueError as e:
+                self.report.reject(number, student_id, e)
+                continue
+            if course['code'] not in self.catalog.course_data:
+                self.report.unknown_codes[course['code']] = self.report.unknown_codes.get(course['code'], 0) + 1
+                if self.strict:
+                    continue
+            if course['grade'] and course['grade'] not in self.catalog.grading_scale.codes:
+                self.report.unknown_grades[course['grade']] = self.report.unknown_grades.get(course['grade'], 0) + 1
+                course['grade'] = ''
+            courses.append(course)
+
+        student_info = dict(existing['student_info']) if existing else {'student_id': student_id}
+        for column in STUDENT_INFO_COLUMNS:
+            if rows[0].get(column):
+                student_info[column] = str(rows[0][column]).strip()
+
+        # Courses only go onto slots the matrix does not already have filled in
+        plan = self.catalog.plan(major_key)
+        previous = existing['course_entries'] if existing and existing['current_major'] == major_key else {}
+        taken = [plan.row_index[row_id] for row_id, entry in previous.items()
+                 if row_id in plan.row_index and entry.get('status') != 'Not Taken']
+        match = match_courses(plan, courses, taken)
+        course_entries, unplaced = match.course_entries(previous), match.unmatched
+
+        self.report.placed += len(courses) - len(unplaced)
+        self.report.unplaced += len(unplaced)
+        return {'student_info': student_info, 'current_major': major_key, 'course_entries': course_entries}
+
+    def import_into(self, store, source, name=None, on_existing='skip'):
+        """Stream an export into the matrix store
+
+        on_existing says what happens to students with a matrix saved before
+        the import: skip, merge or replace. Once a student's group of rows is
+        rejected as a whole, their later groups are rejected too.
+        """
+        if on_existing not in EXISTING_POLICIES:
+            raise ValueError(f"on_existing must be one of {', '.join(EXISTING_POLICIES)}")
+        seen, failed = set(), set()
+        for student_id, rows in iter_students(iter_rows(source, name)):
+            if student_id in failed:
+                # Rows of a student the export lists again after rows that
+                # were rejected: they would land on the matrix saved before
+                # the import, whatever on_existing says, so they go too
+                error = ValueError(f"student {student_id}: an earlier group of their rows was rejected")
+                for number in range(self.report.rows + 1, self.report.rows + len(rows) + 1):
+                    self.report.reject(number, student_id, error)
+                self.report.rows += len(rows)
+                continue
+            existing = store.load(student_id)
+            if student_id in seen:
+                merged = False
+            elif existing is not None and on_existing == 'skip':
+                self.report.skipped += 1
+                self.report.rows += len(rows)
+                continue
+            else:
+                merged = existing is not None and on_existing == 'merge'
+                existing = existing if merged else None
+            seen.add(student_id)
+            try:
+                record = self.build_record(student_id, rows, existing)
+            except ValueError as e:
+                for number in range(self.report.rows + 1, self.report.rows + len(rows) + 1):
+                    self.report.reject(number, student_id, e)
+                self.report.rows += len(rows)
+                failed.add(student_id)
+                continue
+            self.report.merged += merged
+            self.report.students += existing is None
+            store.save(student_id, record)
+        store.flush()
+        return self.report
+
+    def record_for(self, source, student_id, name=None, existing=None):
+        """Matrix record for a single student in an export, or None"""
+        numbered = [(number, row) for number, row in enumerate(iter_rows(source, name), 1)
+                    if str(row['student_id']).strip() == student_id]
+        if not numbered:
+            return None
+        numbers, rows = zip(*numbered)
+        return self.build_record(student_id, list(rows), existing, numbers)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import a registrar transcript export into AdviseeMatrix")
+    parser.add_argument('export', help="registrar CSV or XLSX export")
+    parser.add_argument('--major', help="place every student on this major instead of the major column")
+    parser.add_argument('--db', help="matrix database (default: $ADVISEE_DB_PATH or advisee_matrix.db)")
+    parser.add_argument('--strict', action='store_true', help="skip course codes that are not in the catalog")
+    parser.add_argument('--existing', choices=EXISTING_POLICIES, default='skip',
+                        help="what to do with students who already have a saved matrix (default: skip)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    importer = TranscriptImporter(get_catalog(), args.major, strict=args.strict)
+    report = importer.import_into(get_store(args.db), args.export, on_existing=args.existing)
+    summary = ', '.join(f"{key}={value}" for key, value in report.as_dict().items())
+    print(f"Imported {os.path.basename(args.export)} in {time.perf_counter() - started:.2f}s: {summary}", file=sys.stderr)
+    for rejected in report.rejected[:REJECTED_SHOWN]:
+        print(f"  rejected row {rejected['row']} (student {rejected['student_id']}): {rejected['error']}", file=sys.stderr)
+    if len(report.rejected) > REJECTED_SHOWN:
+        print(f"  ... and {len(report.rejected) - REJECTED_SHOWN} more rejected rows", file=sys.stderr)
+    return 1 if report.rejected else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
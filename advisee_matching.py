@@ -0,0 +1,163 @@
+# AdviseeMatrix course-to-requirement-slot matching
+#
+# Places a student's flat list of courses onto a major's requirement slots
+# as a maximum bipartite matching (courses on one side, slots on the other),
+# instead of by the row each course happened to be typed into. A course can
+# fill a slot when the slot names its code or the slot's wildcard
+# (BIOL3XXX, ELEC2XXX, ...) covers it, and the course carries at least the
+# slot's credits.
+#
+# Courses taken (completed or in progress) are matched before courses only
+# planned (status Not Taken), and required slots before elective ones. Each
+# pass extends the matching of the one before with Hopcroft-Karp,
+# O(E * sqrt(V)), and augmenting paths never unmatch a course or a slot: a
+# planned course never takes the place of a taken one, and among those
+# matchings the result fills as many required slots as possible and as
+# many slots overall.
+
+from array import array
+
+FREE = -1
+
+
+def hopcroft_karp(adjacency, match_left, match_right):
+    """Grow a matching to maximum size in place; returns the number of augmentations
+
+    adjacency[u] lists the right vertices left vertex u may be matched to, in
+    order of preference. match_left/match_right hold the current matching
+    with FREE for unmatched vertices.
+    """
+    n_left = len(adjacency)
+    augmented = 0
+    while True:
+        # Breadth-first layering from every free course
+        layer = [FREE] * n_left
+        queue = [u for u in range(n_left) if match_left[u] == FREE]
+        for u in queue:
+            layer[u] = 0
+        found = False
+        for u in queue:
+            for v in adjacency[u]:
+                w = match_right[v]
+                if w == FREE:
+                    found = True
+                elif layer[w] == FREE:
+                    layer[w] = layer[u] + 1
+                    queue.append(w)
+        if not found:
+            return augmented
+
+        # Vertex-disjoint shortest augmenting paths, by iterative depth-first search
+        edge = [0] * n_left
+        for root in range(n_left):
+            if match_left[root] != FREE:
+                continue
+            stack = [root]
+            while stack:
+                u = stack[-1]
+                if edge[u] == len(adjacency[u]):
+                    layer[u] = FREE
+                    stack.pop()
+                    continue
+                v = adjacency[u][edge[u]]
+                edge[u] += 1
+                w = match_right[v]
+                if w == FREE:
+                    # Flip the path: every course on the stack takes the slot it went through
+                    for x in stack:
+                        y = adjacency[x][edge[x] - 1]
+                        match_left[x] = y
+                        match_right[y] = x
+                    augmented += 1
+                    break
+                if layer[w] == layer[u] + 1:
+                    stack.append(w)
+
+
+class MatchResult:
+    """Assignment of courses to the requirement slots of a plan"""
+
+    def __init__(self, plan, courses, slot_course):
+        self.plan = plan
+        self.courses = courses
+        self.slot_course = slot_course
+        matched = set(slot_course) - {FREE}
+        self.unmatched = [course for i, course in enumerate(courses) if i not in matched]
+
+    @property
+    def matched(self):
+        return len(self.courses) - len(self.unmatched)
+
+    def required_filled(self):
+        """Number of required slots holding a course"""
+        return sum(1 for slot, course in enumerate(self.slot_course)
+                   if course != FREE and self.plan.required[slot])
+
+    def course_entries(self, course_entries=None):
+        """course_entries with each matched course on its slot"""
+        course_entries = dict(course_entries or {})
+        for slot, course in enumerate(self.slot_course):
+            if course == FREE:
+                continue
+            course = self.courses[course]
+            course_entries[self.plan.row_ids[slot]] = {
+                'code': course['code'],
+                'credits': course['credits'] if course['credits'] is not None else self.plan.default_credits[slot],
+                'grade': course['grade'],
+                'status': course['status']
+            }
+        return course_entries
+
+
+def eligible_slots(plan, course, taken=frozenset()):
+    """Free slots a course may fill, most specific first"""
+    credits = course['credits']
+    return [
+        slot for slot in plan.slot_index.candidate_slots(course['code'])
+        if slot not in taken and (credits is None or credits >= plan.default_credits[slot])
+    ]
+
+
+def match_courses(plan, courses, taken=()):
+    """Maximum matching of courses onto a plan's slots, taken courses and required slots first
+
+    courses are dicts with code, credits (None to take the slot's), grade
+    and status. Slots listed in taken are already filled and left alone.
+    """
+    taken = frozenset(taken)
+    adjacency = [eligible_slots(plan, course, taken) for course in courses]
+    match_left = array('i', [FREE] * len(courses))
+    match_right = array('i', [FREE] * len(plan))
+
+    required = plan.required
+    passes = [adjacency]
+    planned = [course['status'] == 'Not Taken' for course in courses]
+    if any(planned):
+        passes.insert(0, [[] if is_planned else slots for is_planned, slots in zip(planned, adjacency)])
+    for candidates in passes:
+        hopcroft_karp([[slot for slot in slots if required[slot]] for slots in candidates], match_left, match_right)
+        hopcroft_karp(candidates, match_left, match_right)
+    return MatchResult(plan, courses, match_right)
+
+
+def entry_courses(plan, course_entries):
+    """The courses entered in a matrix, as a flat list for match_courses
+
+    Courses not taken yet are only those planned for a slot, i.e. with a
+    code other than the slot's own.
+    """
+    courses = []
+    row_index, default_codes = plan.row_index, plan.default_codes
+    for row_id, entry in course_entries.items():
+        slot = row_index.get(row_id)
+        if slot is None or not entry.get('code'):
+            continue
+        if entry.get('status') != 'Not Taken' or entry['code'].strip().upper() != default_codes[slot]:
+            courses.append({
+                'row_id': row_id,
+                'code': entry['code'].strip().upper(),
+                'credits': entry.get('credits'),
+                'grade': entry.get('grade'),
+                'status': entry['status']
+            })
+    return courses
@@ -2,175 +2,156 @@
 # Save this as: advisee_matrix_streamlit.py
 
 import streamlit as st
-import pandas as pd
-import numpy as np
+from streamlit.errors import StreamlitAPIException
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from datetime import datetime
+import hashlib
 import json
 
+from advisee_catalog import get_catalog
+from advisee_core import MAX_CREDITS, SEMESTER_OPTIONS, STATUS_OPTIONS
+from advisee_forms import declaration_context, form_filename, render_form_html, render_form_pdf
+from advisee_import import TranscriptImporter
+from advisee_matching import entry_courses, match_courses
+from advisee_metrics import get_metrics
+from advisee_plan import CUSTOM_COURSE_NAME
+from advisee_progress import ProgressAccumulator
+from advisee_session import CourseEntries, compact_entries, get_sessions
+from advisee_store import decode_entries, encode_entries, get_store
+
+# pandas, numpy (advisee_whatif) and jinja2 (advisee_forms) are imported by the
+# features that need them, not at startup: a new replica's first page only
+# pays for Streamlit and the catalog
+
+# Keys of the per-row widgets in the classic layout
+ROW_WIDGET_PREFIXES = ('code_', 'name_', 'credits_', 'grade_', 'status_')
+
+# Most catalog courses offered as suggestions in an elective row's code box
+CODE_SUGGESTIONS = 200
+
+
+def new_student_info(student_id='', academic_year=None, semester='Fall'):
+    """Sidebar fields of a student nothing has been entered for"""
+    return {
+        'first_name': '',
+        'middle_initial': '',
+        'surname': '',
+        'student_id': student_id,
+        'contact_no': '',
+        'email': '',
+        'academic_year': academic_year or str(datetime.now().year),
+        'semester': semester,
+        'graduation_term': ''
+    }
+
+
+def matrix_fingerprint(record):
+    """Digest of a matrix record, stable across processes, to tell whether it changed since the last save"""
+    return hashlib.sha1(json.dumps(record, sort_keys=True).encode()).hexdigest()
+
+
+def is_grid_editor_key(key):
+    """Whether a session state key belongs to one of the grid mode data editors"""
+    return key.startswith('grid_') and key not in ('grid_mode', 'grid_version')
+
+
+def spill_session(state):
+    """Matrix record of an idle session and the state keys it makes redundant"""
+    if 'course_entries' not in state:
+        return None
+    record = {
+        'student_info': dict(state['student_info']),
+        'current_major': state['current_major'],
+        'course_entries': encode_entries(state['course_entries'], get_catalog().grading_scale)
+    }
+    keys = [
+        key for key in state.filtered_state
+        if key in ('course_entries', 'progress_totals') or key.startswith(ROW_WIDGET_PREFIXES) or is_grid_editor_key(key)
+    ]
+    return record, keys
+
+
+def rerun_session(session_id):
+    """Have Streamlit rerun an idle session so that it spills itself; False if the session has gone"""
+    from streamlit.runtime import Runtime
+
+    if not Runtime.exists():
+        # A bare script run (e.g. AppTest) has no runtime to ask; the session
+        # is spilled on whatever run comes next
+        return True
+    runtime = Runtime.instance()
+    # The session manager and event loop are Streamlit internals. Should a
+    # release move them, the session is not asked to rerun but stays due,
+    # and is spilled on its next rerun, e.g. when the user comes back
+    get_session_info = getattr(getattr(runtime, '_session_mgr', None), 'get_active_session_info', None)
+    get_async_objs = getattr(runtime, '_get_async_objs', None)
+    if get_session_info is None or get_async_objs is None:
+        return True
+    info = get_session_info(session_id)
+    if info is None:
+        return False
+    eventloop = getattr(get_async_objs(), 'eventloop', None)
+    request_rerun = getattr(getattr(info, 'session', None), 'request_rerun', None)
+    if eventloop is None or request_rerun is None:
+        return True
+    # Called from the sweeper thread; AppSession is only used from the
+    # runtime's event loop
+    eventloop.call_soon_threadsafe(request_rerun, None)
+    return True
+
+
+def session_activity():
+    """Mark this session active for the script run; yields its SessionRun"""
+    return get_sessions(spill_session, rerun_session).active(get_script_run_ctx())
+
+
+def render_paused_session():
+    """What a session shows once it has been spilled after going idle"""
+    st.title("🎓 AdviseeMatrix - Degree Planning Tool")
+    st.info("This matrix was put aside after a while without changes. Resume to carry on where you left off.")
+    st.button("Resume")
+
+
 class AdviseeMatrixWeb:
     def __init__(self):
         if 'student_info' not in st.session_state:
-            st.session_state.student_info = {
-                'first_name': '',
-                'middle_initial': '',
-                'surname': '',
-                'student_id': '',
-                'contact_no': '',
-                'email': '',
-                'academic_year': str(datetime.now().year),
-                'semester': 'Fall',
-                'graduation_term': ''
-            }
+            st.session_state.student_info = new_student_info()
         
         if 'current_major' not in st.session_state:
             st.session_state.current_major = None
             
         if 'course_entries' not in st.session_state:
             st.session_state.course_entries = {}
+
+        # A refreshed page keeps its ?student= link, so the matrix saved for
+        # that student can be restored
+        if not st.session_state.student_info['student_id'] and st.query_params.get('student'):
+            st.session_state.student_info['student_id'] = st.query_params['student']
             
+        # The catalog is shared read-only by every session in the process and
+        # only re-read when its data file changes
+        self.catalog = get_catalog()
+        self.grading = self.catalog.grading_scale
+        # Course entries are kept in compact arrays laid out by the catalog's rows
+        course_entries = compact_entries(st.session_state.course_entries, self.catalog.row_layout())
+        if course_entries is not st.session_state.course_entries:
+            st.session_state.course_entries = course_entries
+        self.store = get_store()
+        self.metrics = get_metrics()
         self.setup_course_database()
         self.setup_major_requirements()
 
     def setup_course_database(self):
         """Initialize the course database"""
-        self.course_data = {
-            'BIOL1020': {'name': 'Diversity of Life I', 'credits': 3, 'level': 1, 'type': 'core'},
-            'BIOL1025': {'name': 'Diversity of Life II', 'credits': 3, 'level': 1, 'type': 'core'},
-            'BIOC1015': {'name': 'Intro. To Biochemistry', 'credits': 3, 'level': 1, 'type': 'core'},
-            'BIOL1030': {'name': 'Introduction to Genetics', 'credits': 3, 'level': 1, 'type': 'core'},
-            'BIOL2373': {'name': 'Skills for Biologists', 'credits': 3, 'level': 2, 'type': 'core'},
-            'BIOC2365': {'name': 'Primary Metabolism', 'credits': 3, 'level': 2, 'type': 'elective'},
-            'BIOC2366': {'name': 'Protein Biochemistry', 'credits': 3, 'level': 2, 'type': 'elective'},
-            'BIOC2370': {'name': 'Cell Signals', 'credits': 3, 'level': 2, 'type': 'elective'},
-            'BIOC2371': {'name': 'Molecular Techniques', 'credits': 3, 'level': 2, 'type': 'elective'},
-            'BIOL3XXX': {'name': 'Level 3 Biology Elective', 'credits': 3, 'level': 3, 'type': 'elective'},
-            'BIOC3XXX': {'name': 'Level 3 Biochemistry Elective', 'credits': 3, 'level': 3, 'type': 'elective'},
-            'ECOL3XXX': {'name': 'Level 3 Ecology Elective', 'credits': 3, 'level': 3, 'type': 'elective'},
-            'MICR3XXX': {'name': 'Level 3 Microbiology Elective', 'credits': 3, 'level': 3, 'type': 'elective'},
-        }
+        self.course_data = self.catalog.course_data
 
     def setup_major_requirements(self):
         """Setup major requirements structure"""
-        self.major_requirements = {
-            'BIOL': {
-                'name': 'BSc Biology Major',
-                'total_credits': 90,
-                'requirements': [
-                    {
-                        'section': 'Level 1 Courses',
-                        'required_credits': 24,
-                        'courses': [
-                            {'code': 'BIOL1020', 'credits': 3, 'required': True},
-                            {'code': 'BIOL1025', 'credits': 3, 'required': True},
-                            {'code': 'BIOC1015', 'credits': 3, 'required': True},
-                            {'code': 'BIOL1030', 'credits': 3, 'required': True},
-                            {'code': 'ELEC1XXX', 'credits': 3, 'required': False},
-                            {'code': 'ELEC1XXX', 'credits': 3, 'required': False},
-                            {'code': 'ELEC1XXX', 'credits': 3, 'required': False},
-                            {'code': 'ELEC1XXX', 'credits': 3, 'required': False}
-                        ]
-                    },
-                    {
-                        'section': 'Level 2 Major Courses',
-                        'required_credits': 30,
-                        'courses': [
-                            {'code': 'BIOL2373', 'credits': 3, 'required': True},
-                            {'code': 'BIOC2365', 'credits': 3, 'required': False},
-                            {'code': 'BIOC2366', 'credits': 3, 'required': False},
-                            {'code': 'BIOC2370', 'credits': 3, 'required': False},
-                            {'code': 'BIOC2371', 'credits': 3, 'required': False},
-                            {'code': 'ELEC2XXX', 'credits': 3, 'required': False},
-                            {'code': 'ELEC2XXX', 'credits': 3, 'required': False},
-                            {'code': 'ELEC2XXX', 'credits': 3, 'required': False},
-                            {'code': 'ELEC2XXX', 'credits': 3, 'required': False},
-                            {'code': 'ELEC2XXX', 'credits': 3, 'required': False}
-                        ]
-                    },
-                    {
-                        'section': 'Level 3 Major Courses',
-                        'required_credits': 36,
-                        'courses': [
-                            {'code': 'BIOL3XXX', 'credits': 3, 'required': False},
-                            {'code': 'BIOL3XXX', 'credits': 3, 'required': False},
-                            {'code': 'BIOL3XXX', 'credits': 3, 'required': False},
-                            {'code': 'BIOL3XXX', 'credits': 3, 'required': False},
-                            {'code': 'BIOC3XXX', 'credits': 3, 'required': False},
-                            {'code': 'BIOC3XXX', 'credits': 3, 'required': False},
-                            {'code': 'ECOL3XXX', 'credits': 3, 'required': False},
-                            {'code': 'MICR3XXX', 'credits': 3, 'required': False},
-                            {'code': 'ELEC3XXX', 'credits': 3, 'required': False},
-                            {'code': 'ELEC3XXX', 'credits': 3, 'required': False},
-                            {'code': 'ELEC3XXX', 'credits': 3, 'required': False},
-                            {'code': 'ELEC3XXX', 'credits': 3, 'required': False}
-                        ]
-                    }
-                ]
-            },
-            'BIOC': {
-                'name': 'BSc Biochemistry Major',
-                'total_credits': 90,
-                'requirements': [
-                    {
-                        'section': 'Level 1 Courses',
-                        'required_credits': 24,
-                        'courses': [
-                            {'code': 'BIOL1020', 'credits': 3, 'required': True},
-                            {'code': 'BIOL1025', 'credits': 3, 'required': True},
-                            {'code': 'BIOC1015', 'credits': 3, 'required': True},
-                            {'code': 'BIOL1030', 'credits': 3, 'required': True},
-                            {'code': 'ELEC1XXX', 'credits': 3, 'required': False},
-                            {'code': 'ELEC1XXX', 'credits': 3, 'required': False},
-                            {'code': 'ELEC1XXX', 'credits': 3, 'required': False},
-                            {'code': 'ELEC1XXX', 'credits': 3, 'required': False}
-                        ]
-                    },
-                    {
-                        'section': 'Level 2 Major Courses',
-                        'required_credits': 30,
-                        'courses': [
-                            {'code': 'BIOC2365', 'credits': 3, 'required': True},
-                            {'code': 'BIOC2366', 'credits': 3, 'required': True},
-                            {'code': 'BIOC2370', 'credits': 3, 'required': True},
-                            {'code': 'BIOC2371', 'credits': 3, 'required': True},
-                            {'code': 'ELEC2XXX', 'credits': 3, 'required': False},
-                            {'code': 'ELEC2XXX', 'credits': 3, 'required': False},
-                            {'code': 'ELEC2XXX', 'credits': 3, 'required': False},
-                            {'code': 'ELEC2XXX', 'credits': 3, 'required': False},
-                            {'code': 'ELEC2XXX', 'credits': 3, 'required': False},
-                            {'code': 'ELEC2XXX', 'credits': 3, 'required': False}
-                        ]
-                    },
-                    {
-                        'section': 'Level 3 Major Courses',
-                        'required_credits': 36,
-                        'courses': [
-                            {'code': 'BIOC3XXX', 'credits': 3, 'required': True},
-                            {'code': 'BIOC3XXX', 'credits': 3, 'required': True},
-                            {'code': 'BIOC3XXX', 'credits': 3, 'required': True},
-                            {'code': 'BIOC3XXX', 'credits': 3, 'required': True},
-                            {'code': 'BIOL3XXX', 'credits': 3, 'required': False},
-                            {'code': 'BIOL3XXX', 'credits': 3, 'required': False},
-                            {'code': 'ELEC3XXX', 'credits': 3, 'required': False},
-                            {'code': 'ELEC3XXX', 'credits': 3, 'required': False},
-                            {'code': 'ELEC3XXX', 'credits': 3, 'required': False},
-                            {'code': 'ELEC3XXX', 'credits': 3, 'required': False},
-                            {'code': 'ELEC3XXX', 'credits': 3, 'required': False},
-                            {'code': 'ELEC3XXX', 'credits': 3, 'required': False}
-                        ]
-                    }
-                ]
-            }
-        }
+        self.major_requirements = self.catalog.major_requirements
 
     def calculate_quality_points(self, grade, credits):
         """Calculate quality points based on grade and credits"""
-        grade_points = {
-            'A+': 4.3, 'A': 4.0, 'A-': 3.7,
-            'B+': 3.3, 'B': 3.0, 'B-': 2.7,
-            'C+': 2.3, 'C': 2.0, 'C-': 1.7,
-            'D': 1.0, 'F': 0.0, 'P': 0.0, 'R': 0.0
-        }
-        return grade_points.get(grade, 0.0) * credits
+        return self.grading.quality_points(self.grading.encode(grade), credits)
 
     def run_streamlit_app(self):
         """Main Streamlit application"""
@@ -184,7 +165,7 @@ class AdviseeMatrixWeb:
         st.markdown("---")
 
         # Sidebar for student information
-        with st.sidebar:
+        with st.sidebar, self.metrics.phase('sidebar'):
             st.header("👤 Student Information")
             
             st.session_state.student_info['first_name'] = st.text_input(
@@ -203,6 +184,7 @@ class AdviseeMatrixWeb:
                 "Student ID", 
                 value=st.session_state.student_info['student_id']
             )
+            self.restore_saved_matrix()
             st.session_state.student_info['contact_no'] = st.text_input(
                 "Contact Number", 
                 value=st.session_state.student_info['contact_no']
@@ -217,219 +199,699 @@ class AdviseeMatrixWeb:
             )
             st.session_state.student_info['semester'] = st.selectbox(
                 "Semester", 
-                ['Fall', 'Winter', 'Spring', 'Summer'],
-                index=['Fall', 'Winter', 'Spring', 'Summer'].index(st.session_state.student_info['semester'])
+                SEMESTER_OPTIONS,
+                index=SEMESTER_OPTIONS.index(st.session_state.student_info['semester'])
             )
             st.session_state.student_info['graduation_term'] = st.text_input(
                 "Expected Graduation", 
                 value=st.session_state.student_info['graduation_term']
             )
 
+            self.render_transcript_import()
+
+            st.header("⚙️ Display")
+            st.toggle(
+                "Grid editing",
+                key='grid_mode',
+                help="Edit each requirement section as one table. Edits only rerun the course grid and summary."
+            )
+            st.toggle(
+                "What-if: all majors",
+                key='what_if_mode',
+                help="Compare the completed courses against every major's requirements."
+            )
+            st.toggle(
+                "Graduation planner",
+                key='planner_mode',
+                help="Schedule the remaining courses term by term up to the expected graduation."
+            )
+            st.toggle(
+                "Cohort analytics",
+                key='analytics_mode',
+                help="Pass rates, GPA distributions and blocked students over every saved matrix."
+            )
+
         # Main content area
-        col1, col2 = st.columns([2, 1])
+        if st.session_state.get('grid_mode'):
+            self.render_grid_workspace()
+        else:
+            col1, col2 = st.columns([2, 1])
 
-        with col1:
-            st.header("📚 Major Selection & Course Planning")
-            
-            # Major selection
-            major_options = ['Select a Major'] + [f"{key} - {value['name']}" for key, value in self.major_requirements.items()]
-            selected_major_display = st.selectbox("Choose your major:", major_options)
-            
-            if selected_major_display != 'Select a Major':
-                major_key = selected_major_display.split(' - ')[0]
-                st.session_state.current_major = major_key
-                
-                # Display major requirements
-                major_data = self.major_requirements[major_key]
-                st.subheader(f"📋 {major_data['name']} Requirements")
-                
-                # Course planning interface
-                for req_section in major_data['requirements']:
-                    with st.expander(f"{req_section['section']} (Required: {req_section['required_credits']} credits)", expanded=True):
-                        
-                        # Create a form for this section
-                        for i, course in enumerate(req_section['courses']):
-                            col_code, col_name, col_credits, col_grade, col_status = st.columns([2, 3, 1, 1, 2])
-                            
-                            row_key = f"{req_section['section']}_{i}"
-                            
-                            # Initialize session state for this course if not exists
-                            if row_key not in st.session_state.course_entries:
-                                st.session_state.course_entries[row_key] = {
-                                    'code': course['code'] if not ('ELEC' in course['code'] or 'XXX' in course['code']) else '',
-                                    'credits': course['credits'],
-                                    'grade': '',
-                                    'status': 'Not Taken'
-                                }
-                            
-                            with col_code:
-                                if 'ELEC' in course['code'] or 'XXX' in course['code']:
-                                    st.session_state.course_entries[row_key]['code'] = st.text_input(
-                                        "Course Code", 
-                                        value=st.session_state.course_entries[row_key]['code'],
-                                        key=f"code_{row_key}",
-                                        placeholder="Enter course"
-                                    )
-                                else:
-                                    st.text_input(
-                                        "Course Code", 
-                                        value=course['code'],
-                                        key=f"code_{row_key}",
-                                        disabled=True
-                                    )
-                                    st.session_state.course_entries[row_key]['code'] = course['code']
-                            
-                            with col_name:
-                                course_code = st.session_state.course_entries[row_key]['code']
-                                course_name = self.course_data.get(course_code, {}).get('name', 'Custom Course')
-                                st.text_input(
-                                    "Course Name", 
-                                    value=course_name,
-                                    key=f"name_{row_key}",
-                                    disabled=True
-                                )
-                            
-                            with col_credits:
-                                st.session_state.course_entries[row_key]['credits'] = st.number_input(
-                                    "Credits", 
-                                    min_value=0,
-                                    max_value=6,
-                                    value=st.session_state.course_entries[row_key]['credits'],
-                                    key=f"credits_{row_key}"
-                                )
-                            
-                            with col_grade:
-                                grade_options = [''] + ['A+', 'A', 'A-', 'B+', 'B', 'B-', 'C+', 'C', 'C-', 'D', 'F', 'P', 'R']
-                                st.session_state.course_entries[row_key]['grade'] = st.selectbox(
-                                    "Grade", 
-                                    grade_options,
-                                    index=grade_options.index(st.session_state.course_entries[row_key]['grade']) if st.session_state.course_entries[row_key]['grade'] in grade_options else 0,
-                                    key=f"grade_{row_key}"
-                                )
-                            
-                            with col_status:
-                                status_options = ['Not Taken', 'Completed', 'In Progress']
-                                st.session_state.course_entries[row_key]['status'] = st.selectbox(
-                                    "Status", 
-                                    status_options,
-                                    index=status_options.index(st.session_state.course_entries[row_key]['status']),
-                                    key=f"status_{row_key}"
-                                )
+            with col1, self.metrics.phase('course_planning'):
+                plan = self.render_major_selection()
+                if plan:
+                    self.render_course_rows(plan)
+
+            with col2, self.metrics.phase('progress_summary'):
+                self.render_progress_summary()
+
+        if st.session_state.get('what_if_mode'):
+            with self.metrics.phase('what_if'):
+                self.render_what_if()
+
+        if st.session_state.get('planner_mode'):
+            with self.metrics.phase('planner'):
+                self.render_graduation_plan()
+
+        if st.session_state.get('analytics_mode'):
+            with self.metrics.phase('analytics'):
+                self.render_cohort_analytics()
+
+        # Declaration form section
+        with self.metrics.phase('declaration_form'):
+            st.markdown("---")
+            if st.button("📄 Generate Declaration Form", type="primary"):
+                if st.session_state.current_major:
+                    self.generate_declaration_form()
+                else:
+                    st.error("Please select a major first!")
+
+        with self.metrics.phase('export'):
+            self.render_matrix_export()
+
+        with self.metrics.phase('persist'):
+            self.persist_matrix()
+
+    def matrix_record(self):
+        """The session's matrix as a storable record"""
+        return {
+            'student_info': dict(st.session_state.student_info),
+            'current_major': st.session_state.current_major,
+            'course_entries': encode_entries(st.session_state.course_entries, self.grading)
+        }
+
+    def load_matrix(self, record):
+        """Replace the session's matrix with a saved one"""
+        st.session_state.student_info.update(record['student_info'])
+        st.session_state.current_major = record['current_major']
+        st.session_state.course_entries = CourseEntries(
+            self.catalog.row_layout(),
+            decode_entries(record['course_entries'], self.grading)
+        )
+        st.session_state.pop('progress_totals', None)
+
+        # Keyed widgets keep their own values, so drop the ones showing the
+        # previous entries and start the grid editors afresh
+        for key in [key for key in st.session_state if key.startswith(ROW_WIDGET_PREFIXES)]:
+            del st.session_state[key]
+        st.session_state.grid_version = st.session_state.get('grid_version', 0) + 1
+        major_key = record['current_major']
+        if major_key in self.major_requirements:
+            st.session_state.major_select = f"{major_key} - {self.major_requirements[major_key]['name']}"
+        else:
+            st.session_state.major_select = 'Select a Major'
+
+    def render_transcript_import(self):
+        """Fill the matrix from a registrar transcript export"""
+        with st.expander("📥 Import Transcript"):
+            if 'import_message' in st.session_state:
+                st.success(st.session_state.pop('import_message'))
+            uploaded = st.file_uploader("Registrar export", type=['csv', 'xlsx'])
+            if uploaded is None or uploaded.file_id == st.session_state.get('imported_file_id'):
+                return
+
+            student_id = st.session_state.student_info['student_id'].strip()
+            if not student_id:
+                st.error("Enter the Student ID to import first!")
+                return
+            if not st.session_state.current_major:
+                st.error("Please select a major first!")
+                return
+
+            importer = TranscriptImporter(self.catalog, st.session_state.current_major)
+            try:
+                # Courses fill the slots still free in the matrix on screen
+                record = importer.record_for(uploaded, student_id, name=uploaded.name, existing=self.matrix_record())
+            except ValueError as e:
+                st.error(f"Could not import {uploaded.name}: {e}")
+                return
+            st.session_state.imported_file_id = uploaded.file_id
+            if record is None:
+                st.warning(f"No courses for student {student_id} in {uploaded.name}.")
+                return
+
+            self.load_matrix(record)
+            report = importer.report
+            st.session_state.import_message = (
+                f"Imported {report.placed} courses for {student_id}"
+                + (f"; {report.unplaced} did not fit any requirement slot" if report.unplaced else "")
+                + (f"; {len(report.rejected)} rows rejected (row {report.rejected[0]['row']}: {report.rejected[0]['error']})" if report.rejected else "")
+            )
+            st.rerun()
+
+    def restore_saved_matrix(self):
+        """Load the saved matrix once when a student ID is entered
+
+        Switching to a student with nothing saved starts a blank matrix, which
+        is only saved once something is entered for them.
+        """
+        student_id = st.session_state.student_info['student_id'].strip()
+        previous_id = st.session_state.get('restored_student_id')
+        if not student_id or student_id == previous_id:
+            return
+        st.session_state.restored_student_id = student_id
+        record = self.store.load(student_id)
+        if record is None:
+            # A matrix filled in before any student ID was entered is this
+            # student's; one entered under another ID is not
+            if not previous_id:
+                return
+            info = st.session_state.student_info
+            record = {
+                'student_info': new_student_info(student_id, info['academic_year'], info['semester']),
+                'current_major': None,
+                'course_entries': {}
+            }
+        self.load_matrix(record)
+        st.session_state.saved_fingerprint = matrix_fingerprint(self.matrix_record())
+        # Widgets above the Student ID field already show the old values
+        st.rerun()
+
+    def persist_matrix(self):
+        """Queue the session's matrix for saving if it changed since the last save"""
+        student_id = st.session_state.student_info['student_id'].strip()
+        if not student_id:
+            return
+        record = self.matrix_record()
+        fingerprint = matrix_fingerprint(record)
+        if fingerprint == st.session_state.get('saved_fingerprint'):
+            return
+        st.session_state.saved_fingerprint = fingerprint
+        self.store.save(student_id, record)
+        st.query_params['student'] = student_id
+
+    def render_major_selection(self):
+        """Major selection; returns the selected major's compiled plan or None"""
+        st.header("📚 Major Selection & Course Planning")
+
+        # Major selection
+        major_options = ['Select a Major'] + [f"{key} - {value['name']}" for key, value in self.major_requirements.items()]
+        selected_major_display = st.selectbox("Choose your major:", major_options, key='major_select')
+
+        if selected_major_display == 'Select a Major':
+            return None
+
+        major_key = selected_major_display.split(' - ')[0]
+        st.session_state.current_major = major_key
+
+        # Display major requirements
+        plan = self.catalog.plan(major_key)
+        st.subheader(f"📋 {plan.name} Requirements")
+
+        if 'auto_place_message' in st.session_state:
+            st.info(st.session_state.pop('auto_place_message'))
+        # Runs as a callback so the moved courses are in place before the
+        # row widgets are drawn
+        st.button(
+            "🧩 Auto-place courses",
+            help="Move every entered course to the requirement slot it fits best",
+            on_click=self.auto_place_courses,
+            args=(plan,)
+        )
+        return plan
+
+    def auto_place_courses(self, plan):
+        """Re-seat the entered courses on the plan's slots as a maximum matching"""
+        entries = st.session_state.course_entries
+        match = match_courses(plan, entry_courses(plan, entries))
+        course_entries = match.course_entries(
+            {row_id: entry for row_id, entry in entries.items() if row_id not in plan.row_index}
+        )
+        # A course no slot can take stays in its own row if that is still free
+        dropped = []
+        for course in match.unmatched:
+            if course['row_id'] in course_entries:
+                dropped.append(course['code'])
+            else:
+                course_entries[course['row_id']] = entries[course['row_id']]
+        if dropped:
+            st.session_state.auto_place_message = f"Courses not moved: no free slot would be left for {', '.join(dropped)}."
+            return
+
+        record = self.matrix_record()
+        record['course_entries'] = encode_entries(course_entries, self.grading)
+        self.load_matrix(record)
+        st.session_state.auto_place_message = (
+            f"Placed {match.matched} courses; {match.required_filled()} required slots filled."
+        )
+
+    def init_course_entry(self, plan, slot):
+        """Initialize session state for this course if not exists"""
+        row_key = plan.row_ids[slot]
+        entry = st.session_state.course_entries.get(row_key)
+        if entry is None:
+            st.session_state.course_entries[row_key] = plan.default_entry(slot)
+            entry = st.session_state.course_entries[row_key]
+        return entry
+
+    def progress_totals(self):
+        """Running progress totals for the current major, kept in session state"""
+        plan = self.catalog.plan(st.session_state.current_major)
+        totals = st.session_state.get('progress_totals')
+        if totals is None or totals.plan is not plan or totals.scale is not self.grading:
+            totals = ProgressAccumulator(plan, self.grading)
+            totals.rebuild(st.session_state.course_entries)
+            st.session_state.progress_totals = totals
+        return totals
+
+    def course_name(self, course_code):
+        """Catalog name for a course code"""
+        return self.course_data.get(course_code, {}).get('name', CUSTOM_COURSE_NAME)
+
+    def render_course_rows(self, plan):
+        """Course planning interface with one row of widgets per course slot"""
+        totals = self.progress_totals()
+        course_index = self.catalog.course_index()
+        for section in plan.sections:
+            with st.expander(section.title, expanded=True):
+
+                # Create a form for this section
+                for slot in section.slots():
+                    col_code, col_name, col_credits, col_grade, col_status = st.columns([2, 3, 1, 1, 2])
+
+                    row_key = plan.row_ids[slot]
+                    entry = self.init_course_entry(plan, slot)
+
+                    with col_code:
+                        if plan.placeholder[slot]:
+                            # Suggests the catalog courses that fit the slot;
+                            # any other code can still be typed in
+                            options = list(course_index.resolve(plan.codes[slot])[:CODE_SUGGESTIONS])
+                            if entry['code'] and entry['code'] not in options:
+                                options.insert(0, entry['code'])
+                            code = st.selectbox(
+                                "Course Code",
+                                options,
+                                index=options.index(entry['code']) if entry['code'] else None,
+                                key=f"code_{row_key}",
+                                placeholder=f"Enter course ({plan.codes[slot]})",
+                                accept_new_options=True
+                            )
+                            entry['code'] = (code or '').strip().upper()
+                            course_name = self.course_name(entry['code'])
+                            problem = entry['code'] and course_index.check_code(entry['code'], plan.codes[slot])
+                            if problem:
+                                st.caption(f"⚠️ {problem}")
+                        else:
+                            st.text_input(
+                                "Course Code", 
+                                value=plan.codes[slot],
+                                key=f"code_{row_key}",
+                                disabled=True
+                            )
+                            entry['code'] = plan.codes[slot]
+                            course_name = plan.names[slot]
+
+                    with col_name:
+                        # A keyed widget keeps its first value, so push the
+                        # name of a newly entered code into it
+                        st.session_state[f"name_{row_key}"] = course_name
+                        st.text_input(
+                            "Course Name", 
+                            key=f"name_{row_key}",
+                            disabled=True
+                        )
+
+                    with col_credits:
+                        entry['credits'] = st.number_input(
+                            "Credits", 
+                            min_value=0,
+                            max_value=MAX_CREDITS,
+                            value=entry['credits'],
+                            key=f"credits_{row_key}"
+                        )
+
+                    with col_grade:
+                        # Grades are kept as grading scale codes; the widget
+                        # shows the letters
+                        entry['grade'] = st.selectbox(
+                            "Grade", 
+                            range(len(self.grading)),
+                            format_func=self.grading.decode,
+                            index=entry['grade'] if entry['grade'] < len(self.grading) else 0,
+                            key=f"grade_{row_key}"
+                        )
+
+                    with col_status:
+                        status_options = STATUS_OPTIONS
+                        entry['status'] = st.selectbox(
+                            "Status", 
+                            status_options,
+                            index=status_options.index(entry['status']),
+                            key=f"status_{row_key}"
+                        )
+
+                    totals.update(slot, entry)
+
+    @st.fragment
+    def render_grid_workspace(self):
+        """Grid editing mode: course grid and summary rerun on their own"""
+        # Running as a fragment means an edit in any section reruns only this
+        # workspace (one data editor per section plus the summary) instead of
+        # the whole script with its ~150 per-row widgets. A fragment rerun
+        # is traced as a run of its own.
+        with self.metrics.rerun(), session_activity() as session:
+            if session.restored:
+                # Idle too long: the matrix was spilled to disk, bring it back
+                # and redraw the whole page
+                self.load_matrix(session.restored)
+                st.rerun()
+            col1, col2 = st.columns([2, 1])
+
+            with col1, self.metrics.phase('course_planning'):
+                plan = self.render_major_selection()
+                if plan:
+                    for section in plan.sections:
+                        with st.expander(section.title, expanded=True):
+                            self.render_section_grid(plan, section)
+
+            with col2, self.metrics.phase('progress_summary'):
+                self.render_progress_summary()
+
+            with self.metrics.phase('persist'):
+                self.persist_matrix()
+
+    def render_section_grid(self, plan, section):
+        """Edit all course slots of one requirement section in a single data editor"""
+        import pandas as pd
+
+        rows = []
+        for slot in section.slots():
+            entry = self.init_course_entry(plan, slot)
+            rows.append({
+                'code': entry['code'],
+                'name': self.course_name(entry['code']) if plan.placeholder[slot] else plan.names[slot],
+                'credits': entry['credits'],
+                'grade': self.grading.decode(entry['grade']),
+                'status': entry['status']
+            })
+
+        # The version is bumped whenever course_entries is replaced wholesale,
+        # which discards edits the editor still holds for the old entries
+        edited = st.data_editor(
+            pd.DataFrame(rows),
+            key=f"grid_{section.name}_{st.session_state.get('grid_version', 0)}",
+            hide_index=True,
+            num_rows='fixed',
+            width='stretch',
+            disabled=['name'],
+            column_config={
+                'code': st.column_config.TextColumn("Course Code", help="Only elective rows can be changed"),
+                'name': st.column_config.TextColumn("Course Name"),
+                'credits': st.column_config.NumberColumn("Credits", min_value=0, max_value=MAX_CREDITS, step=1),
+                'grade': st.column_config.SelectboxColumn("Grade", options=list(self.grading.letters)),
+                'status': st.column_config.SelectboxColumn("Status", options=STATUS_OPTIONS, required=True)
+            }
+        )
+
+        totals = self.progress_totals()
+        course_index = self.catalog.course_index()
+        codes_changed = False
+        problems = []
+        for slot, row in zip(section.slots(), edited.to_dict('records')):
+            entry = st.session_state.course_entries[plan.row_ids[slot]]
+            code = (row['code'] or '').strip().upper() if plan.placeholder[slot] else plan.codes[slot]
+            if code and plan.placeholder[slot]:
+                problem = course_index.check_code(code, plan.codes[slot])
+                if problem:
+                    problems.append(problem)
+            codes_changed = codes_changed or code != entry['code']
+            entry['code'] = code
+            entry['credits'] = int(row['credits']) if pd.notna(row['credits']) else 0
+            entry['grade'] = self.grading.encode(row['grade'] or '')
+            entry['status'] = row['status'] or 'Not Taken'
+            totals.update(slot, entry)
+        if problems:
+            st.caption("⚠️ " + "; ".join(problems))
+
+        # Course names are looked up from the codes, so show the new names
+        if codes_changed:
+            try:
+                st.rerun(scope='fragment')
+            except StreamlitAPIException:
+                # Only fragment reruns can be rerun on their own
+                st.rerun()
+
+    def render_progress_summary(self):
+        """Progress Summary column"""
+        st.header("📊 Progress Summary")
+
+        if st.session_state.current_major:
+            # Progress comes from the running totals, which are updated as
+            # each course row is rendered
+            summary = self.progress_totals().summary()
+
+            for section in summary['sections']:
+                st.subheader(section['section'])
 
-        with col2:
-            st.header("📊 Progress Summary")
-            
-            if st.session_state.current_major:
-                # Calculate progress
-                major_data = self.major_requirements[st.session_state.current_major]
-                overall_credits = 0
-                overall_qp = 0
-                
-                for req_section in major_data['requirements']:
-                    section_credits = 0
-                    section_qp = 0
-                    
-                    st.subheader(req_section['section'])
-                    
-                    for i in range(len(req_section['courses'])):
-                        row_key = f"{req_section['section']}_{i}"
-                        if row_key in st.session_state.course_entries:
-                            entry = st.session_state.course_entries[row_key]
-                            if entry['status'] == 'Completed' and entry['grade']:
-                                credits = entry['credits']
-                                qp = self.calculate_quality_points(entry['grade'], credits)
-                                section_credits += credits
-                                section_qp += qp
-                    
-                    section_gpa = section_qp / section_credits if section_credits > 0 else 0.0
-                    progress = (section_credits / req_section['required_credits']) * 100
-                    
-                    st.metric(
-                        label="Credits", 
-                        value=f"{section_credits}/{req_section['required_credits']}",
-                        delta=f"{progress:.1f}% complete"
-                    )
-                    st.metric(
-                        label="Section GPA", 
-                        value=f"{section_gpa:.2f}"
-                    )
-                    
-                    overall_credits += section_credits
-                    overall_qp += section_qp
-                    
-                    st.markdown("---")
-                
-                # Overall summary
-                overall_gpa = overall_qp / overall_credits if overall_credits > 0 else 0.0
-                total_required = major_data['total_credits']
-                overall_progress = (overall_credits / total_required) * 100
-                
-                st.subheader("🎯 Overall Summary")
                 st.metric(
-                    label="Total Credits", 
-                    value=f"{overall_credits}/{total_required}",
-                    delta=f"{overall_progress:.1f}% complete"
+                    label="Credits", 
+                    value=f"{section['credits']}/{section['required_credits']}",
+                    delta=f"{section['progress']:.1f}% complete"
                 )
                 st.metric(
-                    label="Overall GPA", 
-                    value=f"{overall_gpa:.2f}"
+                    label="Section GPA", 
+                    value=f"{section['gpa']:.2f}"
                 )
-                
-                # Progress bar
-                st.progress(overall_progress / 100)
-                
-                if overall_progress >= 100:
-                    st.success("🎓 Congratulations! Degree requirements completed!")
-                elif overall_progress >= 75:
-                    st.info(f"📚 Almost there! {total_required - overall_credits} credits remaining.")
-                else:
-                    st.warning(f"📖 Keep going! {total_required - overall_credits} credits remaining.")
 
-        # Declaration form section
+                st.markdown("---")
+
+            # Overall summary
+            overall_credits = summary['overall_credits']
+            overall_gpa = summary['overall_gpa']
+            total_required = summary['total_credits']
+            overall_progress = summary['overall_progress']
+
+            st.subheader("🎯 Overall Summary")
+            st.metric(
+                label="Total Credits", 
+                value=f"{overall_credits}/{total_required}",
+                delta=f"{overall_progress:.1f}% complete"
+            )
+            st.metric(
+                label="Overall GPA", 
+                value=f"{overall_gpa:.2f}"
+            )
+
+            # Progress bar
+            st.progress(overall_progress / 100)
+
+            if summary['standing'] == 'complete':
+                st.success("🎓 Congratulations! Degree requirements completed!")
+            elif summary['standing'] == 'almost':
+                st.info(f"📚 Almost there! {summary['remaining_credits']} credits remaining.")
+            else:
+                st.warning(f"📖 Keep going! {summary['remaining_credits']} credits remaining.")
+
+    def render_what_if(self):
+        """Ranked table of how far the completed courses go in every major"""
         st.markdown("---")
-        if st.button("📄 Generate Declaration Form", type="primary"):
-            if st.session_state.current_major:
-                self.generate_declaration_form()
+        st.header("🔀 What-if: All Majors")
+        import pandas as pd
+        from advisee_audit_cache import get_audit_cache
+        from advisee_whatif import earned_courses, get_eligibility_matrix
+
+        courses = earned_courses(st.session_state.course_entries, self.grading)
+        if not courses:
+            st.info("Complete some courses with a grade to compare majors.")
+            return
+
+        # Placement depends on the courses' order, codes and credits only
+        key = ('what-if', tuple((course['code'], course['credits']) for course in courses))
+        rows = get_audit_cache().cached(self.catalog, key, lambda: get_eligibility_matrix(self.catalog).evaluate(courses))
+        st.dataframe(
+            pd.DataFrame(rows),
+            hide_index=True,
+            width='stretch',
+            column_config={
+                'major': st.column_config.TextColumn("Major"),
+                'name': st.column_config.TextColumn("Program"),
+                'credits_satisfied': st.column_config.NumberColumn("Credits Satisfied"),
+                'total_credits': st.column_config.NumberColumn("Total Credits"),
+                'remaining_credits': st.column_config.NumberColumn("Remaining"),
+                'progress': st.column_config.ProgressColumn("Progress", min_value=0, max_value=100, format="%.1f%%"),
+                'required_filled': st.column_config.NumberColumn("Required Filled"),
+                'required_slots': st.column_config.NumberColumn("Required Courses"),
+                'courses_used': st.column_config.NumberColumn("Courses Used")
+            }
+        )
+        st.caption(f"{len(courses)} completed courses, each placed on its best-fitting requirement slot per major.")
+
+    def render_graduation_plan(self):
+        """Term-by-term schedule of the unfilled slots up to the expected graduation"""
+        st.markdown("---")
+        st.header("🗓️ Graduation Planner")
+        import pandas as pd
+        from advisee_planner import (CALENDAR_SEASONS, DEFAULT_CREDIT_CAP, DEFAULT_SEASONS, current_term,
+                                     parse_term, plan_graduation, term_label)
+
+        major_key = st.session_state.current_major
+        if not major_key:
+            st.info("Select a major to plan its remaining courses.")
+            return
+        info = st.session_state.student_info
+        try:
+            start = current_term(info['semester'], info['academic_year'])
+            graduation = parse_term(info['graduation_term'])
+        except ValueError:
+            st.info("Enter the current semester, academic year and expected graduation term in the sidebar, "
+                    "e.g. 'Spring 2028'.")
+            return
+
+        col1, col2 = st.columns([3, 1])
+        seasons = col1.multiselect("Terms with classes", CALENDAR_SEASONS, default=list(DEFAULT_SEASONS),
+                                   key='planner_seasons')
+        credit_cap = col2.number_input("Credits per term", min_value=1, max_value=30, value=DEFAULT_CREDIT_CAP,
+                                       key='planner_credit_cap')
+        if not seasons:
+            st.info("Choose the terms the student takes classes in.")
+            return
+
+        try:
+            result = plan_graduation(self.catalog, major_key, st.session_state.course_entries, start, graduation,
+                                     seasons, int(credit_cap))
+        except ValueError as e:
+            # A catalog whose prerequisites form a cycle has no order to plan in
+            st.error(f"❌ Cannot plan this major: {e}. Fix the prerequisites in the catalog.")
+            return
+        if result.feasible:
+            if not result.courses:
+                st.success("🎓 Every requirement slot is already filled.")
+                return
+            st.success(f"✅ Can graduate by {info['graduation_term']}: {len(result.courses)} courses, "
+                       f"finishing in {term_label(result.last_term)}.")
+            st.dataframe(
+                pd.DataFrame(result.rows()),
+                hide_index=True,
+                width='stretch',
+                column_config={
+                    'term': st.column_config.TextColumn("Term"),
+                    'code': st.column_config.TextColumn("Course Code"),
+                    'name': st.column_config.TextColumn("Course Name"),
+                    'credits': st.column_config.NumberColumn("Credits"),
+                    'requirement': st.column_config.TextColumn("Requirement")
+                }
+            )
+        elif result.feasible is False:
+            st.error(f"❌ Cannot graduate by {info['graduation_term']}: {result.reason}")
+        else:
+            st.warning(f"⏳ No schedule found after trying {result.states} partial schedules; "
+                       "try a later graduation term or more terms with classes.")
+        st.caption(f"Planned {len(result.courses)} courses in {result.elapsed * 1000:.0f} ms.")
+
+    def render_cohort_analytics(self):
+        """Pass rates, GPA distributions and blocked students over every saved matrix"""
+        st.markdown("---")
+        st.header("📊 Cohort Analytics")
+        import pandas as pd
+        from advisee_analytics import format_age, get_analytics
+
+        # The page only reads the last dataset; bringing it up to date takes
+        # seconds to minutes and happens on a background thread
+        analytics = get_analytics()
+        refreshing = analytics.refresh_in_background()
+        if analytics.refresh_error:
+            st.warning(f"Could not update the cohort dataset: {analytics.refresh_error}")
+        overview = analytics.overview()
+        if not overview:
+            st.info("The cohort dataset is being built; check back in a few minutes." if refreshing
+                    else "No cohort dataset yet.")
+            return
+        if not overview['students']:
+            st.info("No saved matrices yet.")
+            return
+        refreshed = datetime.fromtimestamp(overview['refreshed_at']).strftime('%Y-%m-%d %H:%M')
+        st.caption(f"{overview['students']} saved matrices, {overview['rows']} courses taken; "
+                   f"updated {refreshed} ({format_age(overview['age_s'])})"
+                   f"{', updating now' if refreshing else ''}.")
+
+        major_key = st.selectbox(
+            "Major",
+            [None] + list(self.major_requirements),
+            format_func=lambda key: "All majors" if key is None else f"{key} - {self.major_requirements[key]['name']}",
+            key='analytics_major'
+        )
+        col1, col2 = st.columns(2)
+        with col1:
+            st.subheader("Pass Rates")
+            st.dataframe(
+                pd.DataFrame(analytics.pass_rates(major_key), columns=['code', 'attempts', 'passed', 'pass_rate', 'in_progress']),
+                hide_index=True,
+                width='stretch',
+                column_config={
+                    'code': st.column_config.TextColumn("Course Code"),
+                    'attempts': st.column_config.NumberColumn("Graded"),
+                    'passed': st.column_config.NumberColumn("Passed"),
+                    'pass_rate': st.column_config.ProgressColumn("Pass Rate", min_value=0, max_value=100, format="%.1f%%"),
+                    'in_progress': st.column_config.NumberColumn("In Progress")
+                }
+            )
+        with col2:
+            st.subheader("GPA Distribution")
+            rows = analytics.gpa_distribution(major_key) if major_key else []
+            if rows:
+                chart = pd.DataFrame(rows).pivot(index='bucket', columns='section', values='students').fillna(0)
+                chart.index = [f"{bucket:.1f}" for bucket in chart.index]
+                st.bar_chart(chart, x_label="Section GPA", y_label="Students")
             else:
-                st.error("Please select a major first!")
+                st.info("Select a major to see its section GPAs." if not major_key else "No graded courses yet.")
+
+        st.subheader("Blocked Students")
+        code = st.text_input("Required course", value='BIOL2373', key='analytics_code')
+        blocked = analytics.blocked(code, major_key)
+        if not blocked['majors']:
+            st.info(f"{blocked['code']} is not a required course of {'this major' if major_key else 'any major'}.")
+            return
+        cols = st.columns(4)
+        cols[0].metric("Students in majors requiring it", blocked['students'])
+        cols[1].metric("Passed", blocked['passed'])
+        cols[2].metric("In progress", blocked['in_progress'])
+        cols[3].metric("Blocked", blocked['blocked'])
+
+    def render_matrix_export(self):
+        """Download of the matrix on screen, one row per requirement slot"""
+        if not st.session_state.current_major:
+            return
+        from advisee_export import FORMATS, MIME_TYPES, export_bytes, export_filename
+
+        col1, col2 = st.columns([1, 3], vertical_alignment='bottom')
+        fmt = col1.selectbox("Export format", FORMATS, format_func=str.upper, key='export_format')
+        catalog, record = self.catalog, self.matrix_record()
+        # Built only when the button is clicked
+        col2.download_button(
+            "⬇️ Export Matrix",
+            data=lambda: export_bytes(catalog, [record], fmt),
+            file_name=export_filename(record['student_info']['student_id'].strip() or 'student', fmt),
+            mime=MIME_TYPES[fmt]
+        )
 
     def generate_declaration_form(self):
         """Generate declaration form"""
         st.subheader("📄 Declaration of Major Form")
         
+        context = declaration_context(self.catalog, st.session_state.student_info, st.session_state.current_major)
         with st.container():
-            st.markdown(f"""
-            <div style='border: 2px solid #333; padding: 20px; margin: 20px 0;'>
-                <h3 style='text-align: center; margin-bottom: 30px;'>DECLARATION OF MAJOR FORM</h3>
-                
-                <p><strong>Academic Year:</strong> {st.session_state.student_info['academic_year']}</p>
-                <p><strong>Semester:</strong> {st.session_state.student_info['semester']}</p>
-                <p><strong>Student ID:</strong> {st.session_state.student_info['student_id']}</p>
-                <p><strong>Name:</strong> {st.session_state.student_info['first_name']} {st.session_state.student_info['middle_initial']} {st.session_state.student_info['surname']}</p>
-                <p><strong>Contact No:</strong> {st.session_state.student_info['contact_no']}</p>
-                <p><strong>Email:</strong> {st.session_state.student_info['email']}</p>
-                
-                <br>
-                <p><strong>I intend to graduate at the end of:</strong> {st.session_state.student_info['graduation_term']}</p>
-                <p><strong>Declaring Major in:</strong> {self.major_requirements[st.session_state.current_major]['name']}</p>
-                
-                <br><br>
-                <p>Student Signature: ___________________________ Date: ___________</p>
-                <br>
-                <p>Academic Advisor Signature: ___________________________ Date: ___________</p>
-                <br>
-                <p>Department Approval: ___________________________ Date: ___________</p>
-                
-                <p style='text-align: center; margin-top: 30px; font-size: 12px;'>
-                    Generated by AdviseeMatrix on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-                </p>
-            </div>
-            """, unsafe_allow_html=True)
+            st.markdown(render_form_html(context), unsafe_allow_html=True)
+        st.download_button(
+            "⬇️ Download PDF",
+            data=render_form_pdf(context),
+            file_name=form_filename(context['student_id'] or 'student', 'pdf'),
+            mime='application/pdf'
+        )
 
 # Initialize and run the app
 def main():
-    app = AdviseeMatrixWeb()
-    app.run_streamlit_app()
+    # Opt-in per-rerun timings, see advisee_metrics.py
+    metrics = get_metrics()
+    with metrics.rerun(), session_activity() as session:
+        if session.spilled:
+            render_paused_session()
+            return
+        with metrics.phase('init'):
+            app = AdviseeMatrixWeb()
+            if session.restored:
+                app.load_matrix(session.restored)
+        app.run_streamlit_app()
 
 if __name__ == "__main__":
     main()
@@ -449,7 +911,31 @@ OPTION 1: Streamlit Cloud (FREE & EASIEST)
    pandas
    numpy
 
-3. Upload both files to a GitHub repository
+3. Upload both files to a GitHub repository, together with catalog.json
+   (the course catalog and major requirements) and the modules the app
+   imports:
+   advisee_analytics.py, advisee_audit_cache.py, advisee_catalog.py,
+   advisee_core.py, advisee_course_index.py, advisee_export.py,
+   advisee_forms.py, advisee_grading.py, advisee_import.py,
+   advisee_matching.py, advisee_metrics.py, advisee_plan.py,
+   advisee_planner.py, advisee_progress.py, advisee_session.py,
+   advisee_snapshot.py, advisee_store.py and advisee_whatif.py.
+   If catalog.json is changed into something that does not load, the app
+   logs the error and keeps the last catalog that did. Set ADVISEE_CATALOG_PATH to use a catalog file stored elsewhere;
+   edits to the file are picked up without restarting the app. For faster
+   cold starts, compile it with `python advisee_snapshot.py catalog.json`
+   and point ADVISEE_CATALOG_PATH at the resulting catalog.snapshot.
+   The Cohort analytics page also needs duckdb and pyarrow; it keeps its
+   Parquet dataset in ADVISEE_ANALYTICS_DIR (default: analytics/ next to
+   the app), which `python advisee_analytics.py refresh` can update on a
+   schedule.
+   Audit results are cached per process, up to ADVISEE_AUDIT_CACHE_SIZE
+   entries (default 20000, 0 to disable).
+   Exporting the matrix as XLSX needs openpyxl, as Parquet pyarrow;
+   `python advisee_export.py` exports every saved matrix.
+   The Graduation planner reads each course's "prerequisites" and "offered"
+   seasons from catalog.json; courses without them have none and run every
+   term.
 
 4. Go to https://share.streamlit.io/
    - Sign in with GitHub
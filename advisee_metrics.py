@@ -0,0 +1,433 @@
+# AdviseeMatrix per-rerun instrumentation
+#
+# Opt-in timing of the Streamlit script: every rerun of run_streamlit_app (and
+# every rerun of the grid workspace fragment on its own) is traced with the
+# wall time of each phase (sidebar, course planning, progress summary, form
+# generation, ...), the number of widgets the run created, the size of the
+# session's st.session_state and how the run ended ('ok', or 'rerun' when it
+# triggered another rerun with st.rerun()).
+#
+# Enable it with any of these environment variables:
+#   ADVISEE_METRICS=1             one JSON line per rerun on stderr
+#   ADVISEE_METRICS_LOG=path      ... appended to a file instead
+#   ADVISEE_METRICS_FILE=path     Prometheus text format file, rewritten at
+#                                 most once a second (node_exporter textfile
+#                                 collector style)
+#   ADVISEE_METRICS_PORT=9464     Prometheus text endpoint on
+#                                 http://127.0.0.1:9464/metrics
+#
+# The Prometheus text also carries the audit cache's counters
+# (advisee_audit_cache.py).
+#
+# Without any of them get_metrics() returns a recorder whose phase() and
+# rerun() do nothing.
+#
+# The log can be summarised afterwards, per phase and per session:
+#   python advisee_metrics.py metrics.jsonl [--top 10]
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import MappingProxyType
+
+METRICS_ENV = 'ADVISEE_METRICS'
+METRICS_LOG_ENV = 'ADVISEE_METRICS_LOG'
+METRICS_FILE_ENV = 'ADVISEE_METRICS_FILE'
+METRICS_PORT_ENV = 'ADVISEE_METRICS_PORT'
+
+# Minimum seconds between rewrites of the metrics file
+FILE_INTERVAL = 1.0
+# Sessions not seen for this many seconds no longer count as active
+SESSION_IDLE = 600
+# Sessions listed individually in the exposition, by script time
+HOT_SESSIONS = 10
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+WIDGET_BUCKETS = (10, 25, 50, 100, 200, 400, 800, 1600)
+BYTES_BUCKETS = (16_000, 64_000, 256_000, 1_000_000, 4_000_000, 16_000_000, 64_000_000)
+
+logger = logging.getLogger('advisee.metrics')
+
+
+def deep_sizeof(value, skip=(), seen=None):
+    """Bytes held by an object graph, not counting instances of the skip types"""
+    seen = set() if seen is None else seen
+    if id(value) in seen or isinstance(value, skip):
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deep_sizeof(key, skip, seen) + deep_sizeof(item, skip, seen) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, skip, seen) for item in value)
+    else:
+        if hasattr(value, '__dict__'):
+            size += deep_sizeof(vars(value), skip, seen)
+        for cls in type(value).__mro__:
+            for name in getattr(cls, '__slots__', ()):
+                if name not in ('__dict__', '__weakref__') and hasattr(value, name):
+                    size += deep_sizeof(getattr(value, name), skip, seen)
+    return size
+
+
+def session_state_bytes(state):
+    """Bytes a session's state holds itself, leaving out the catalog objects every session shares"""
+    from advisee_catalog import Catalog
+    from advisee_grading import GradingScale
+    from advisee_plan import RequirementPlan
+    from advisee_session import RowLayout
+
+    return deep_sizeof(state, (Catalog, GradingScale, RequirementPlan, RowLayout, MappingProxyType))
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram, one series per label value"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, label, value):
+        counts, total = self.series.get(label, ([0] * (len(self.buckets) + 1), 0.0))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+        self.series[label] = (counts, total + value)
+
+    def exposition(self, name, label_name):
+        lines = []
+        for label, (counts, total) in sorted(self.series.items()):
+            labels = f'{label_name}="{label}",' if label_name else ''
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels}le="{bound}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{name}_bucket{{{labels}le="+Inf"}} {cumulative}')
+            selector = f'{{{labels.rstrip(",")}}}' if labels else ''
+            lines.append(f'{name}_sum{selector} {total:.6f}')
+            lines.append(f'{name}_count{selector} {cumulative}')
+        return lines
+
+
+def widgets_this_run():
+    """Widgets the current script run has created so far"""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return 0
+    shared = getattr(ctx, 'shared', None)
+    if shared is not None:
+        return len(shared.widget_ids_this_run.snapshot())
+    return len(getattr(ctx, 'widget_ids_this_run', ()))
+
+
+class RerunTrace:
+    """Phase timings of one script run"""
+
+    __slots__ = ('session', 'kind', 'started', 'phases', 'widgets')
+
+    def __init__(self, session, kind):
+        self.session = session
+        self.kind = kind
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.widgets = {}
+
+    @contextmanager
+    def phase(self, name):
+        started, widgets = time.perf_counter(), widgets_this_run()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - started
+            self.widgets[name] = self.widgets.get(name, 0) + widgets_this_run() - widgets
+
+
+class NullMetrics:
+    """Recorder used when instrumentation is off"""
+
+    enabled = False
+
+    def rerun(self):
+        return nullcontext()
+
+    def phase(self, name):
+        return nullcontext()
+
+
+class RerunMetrics:
+    """Process-wide collector of rerun traces from every session"""
+
+    enabled = True
+
+    def __init__(self, path=None, port=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._written = 0.0
+        self.reruns = {}
+        self.rerun_seconds = Histogram(SECONDS_BUCKETS)
+        self.phase_seconds = Histogram(SECONDS_BUCKETS)
+        self.widgets = Histogram(WIDGET_BUCKETS)
+        self.state_bytes = Histogram(BYTES_BUCKETS)
+        self.sessions = {}
+        self.server = self.serve(port) if port else None
+
+    @contextmanager
+    def rerun(self):
+        """Trace a script run; runs nested in one already being traced are part of it"""
+        from streamlit.runtime.scriptrunner import RerunException, StopException, get_script_run_ctx
+
+        ctx = get_script_run_ctx()
+        if ctx is None or getattr(self._local, 'trace', None) is not None:
+            yield
+            return
+        trace = self._local.trace = RerunTrace(ctx.session_id, 'fragment' if ctx.fragment_ids_this_run else 'full')
+        outcome = 'ok'
+        try:
+            yield
+        except RerunException:
+            outcome = 'rerun'
+            raise
+        except StopException:
+            outcome = 'stop'
+            raise
+        except Exception:
+            outcome = 'error'
+            raise
+        finally:
+            self._local.trace = None
+            self.record(trace, outcome, widgets_this_run(), self.current_state_bytes())
+
+    def phase(self, name):
+        """Time a phase of the script run being traced"""
+        trace = getattr(self._local, 'trace', None)
+        return trace.phase(name) if trace is not None else nullcontext()
+
+    @staticmethod
+    def current_state_bytes():
+        import streamlit as st
+
+        return session_state_bytes(st.session_state.to_dict())
+
+    def record(self, trace, outcome, widgets, state_bytes):
+        """Add a finished script run to the totals and log it"""
+        now = time.time()
+        wall = time.perf_counter() - trace.started
+        with self._lock:
+            key = (trace.kind, outcome)
+            self.reruns[key] = self.reruns.get(key, 0) + 1
+            self.rerun_seconds.observe(trace.kind, wall)
+            for name, seconds in trace.phases.items():
+                self.phase_seconds.observe(name, seconds)
+            self.widgets.observe(trace.kind, widgets)
+            self.state_bytes.observe('', state_bytes)
+
+            session = self.sessions.get(trace.session)
+            if session is None:
+                session = self.sessions[trace.session] = {'reruns': 0, 'seconds': 0.0}
+            session.update(reruns=session['reruns'] + 1, seconds=session['seconds'] + wall,
+                           state_bytes=state_bytes, widgets=widgets, last_seen=now)
+            # Forget sessions that have gone away
+            for session_id in [s for s, stats in self.sessions.items() if now - stats['last_seen'] > SESSION_IDLE]:
+                del self.sessions[session_id]
+            session_reruns = session['reruns']
+
+        logger.info(json.dumps({
+            'ts': round(now, 3),
+            'session': trace.session,
+            'kind': trace.kind,
+            'outcome': outcome,
+            'wall_ms': round(wall * 1000, 2),
+            'phases_ms': {name: round(seconds * 1000, 2) for name, seconds in trace.phases.items()},
+            'phase_widgets': trace.widgets,
+            'widgets': widgets,
+            'session_state_bytes': state_bytes,
+            'session_reruns': session_reruns
+        }))
+        if self.path and now - self._written >= FILE_INTERVAL:
+            self._written = now
+            self.write_file()
+
+    def exposition(self):
+        """All metrics in the Prometheus text format"""
+        with self._lock:
+            lines = ['# HELP advisee_reruns_total Script runs by kind (full or fragment) and outcome',
+                     '# TYPE advisee_reruns_total counter']
+            for (kind, outcome), count in sorted(self.reruns.items()):
+                lines.append(f'advisee_reruns_total{{kind="{kind}",outcome="{outcome}"}} {count}')
+            for name, help_text, histogram, label_name in (
+                ('advisee_rerun_seconds', 'Wall time of a script run', self.rerun_seconds, 'kind'),
+                ('advisee_phase_seconds', 'Wall time of a phase of a script run', self.phase_seconds, 'phase'),
+                ('advisee_rerun_widgets', 'Widgets created by a script run', self.widgets, 'kind'),
+                ('advisee_session_state_bytes', 'Size of st.session_state after a script run', self.state_bytes, None)
+            ):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                lines.extend(histogram.exposition(name, label_name))
+
+            now = time.time()
+            lines += ['# HELP advisee_active_sessions Sessions that ran the script recently',
+                      '# TYPE advisee_active_sessions gauge',
+                      f'advisee_active_sessions {sum(1 for s in self.sessions.values() if now - s["last_seen"] <= SESSION_IDLE)}']
+            hot = sorted(self.sessions.items(), key=lambda item: -item[1]['seconds'])[:HOT_SESSIONS]
+            for name, field, help_text in (
+                ('advisee_session_script_seconds', 'seconds', 'Script time of the busiest sessions'),
+                ('advisee_session_reruns', 'reruns', 'Script runs of the busiest sessions'),
+                ('advisee_session_state_bytes_current', 'state_bytes', 'Session state size of the busiest sessions')
+            ):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} gauge')
+                lines.extend(f'{name}{{session="{session_id}"}} {stats[field]:g}' for session_id, stats in hot)
+
+        # Audit cache counters, once something in the process has audited
+        audit_cache = sys.modules.get('advisee_audit_cache')
+        if audit_cache is not None:
+            stats = audit_cache.get_audit_cache().stats()
+            lines += ['# HELP advisee_audit_cache_lookups_total Audit cache lookups by level and result',
+                      '# TYPE advisee_audit_cache_lookups_total counter']
+            for level, prefix in (('transcript', 'transcript_'), ('result', ''), ('section', 'section_')):
+                for result, field in (('hit', 'hits'), ('miss', 'misses')):
+                    lines.append(f'advisee_audit_cache_lookups_total{{level="{level}",result="{result}"}} '
+                                 f'{stats[prefix + field]}')
+            lines += ['# HELP advisee_audit_cache_evictions_total Audit cache entries evicted to stay within its size',
+                      '# TYPE advisee_audit_cache_evictions_total counter',
+                      f'advisee_audit_cache_evictions_total {stats["evictions"]}',
+                      '# HELP advisee_audit_cache_invalidations_total Audit summaries dropped when a student\'s grades changed',
+                      '# TYPE advisee_audit_cache_invalidations_total counter',
+                      f'advisee_audit_cache_invalidations_total {stats["invalidations"]}',
+                      '# HELP advisee_audit_cache_entries Audit cache entries held',
+                      '# TYPE advisee_audit_cache_entries gauge',
+                      f'advisee_audit_cache_entries {stats["entries"]}']
+        return '\n'.join(lines) + '\n'
+
+    def write_file(self):
+        """Rewrite the metrics file atomically"""
+        tmp = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(self.exposition())
+        os.replace(tmp, self.path)
+
+    def serve(self, port):
+        """Serve the metrics on a local HTTP endpoint from a daemon thread"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                body = metrics.exposition().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        except OSError as e:
+            # Another process (e.g. a second app server) may already serve it
+            logger.warning(f"metrics endpoint not started on port {port}: {e}")
+            return None
+        threading.Thread(target=server.serve_forever, name='advisee-metrics', daemon=True).start()
+        return server
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def configure_logging(path):
+    """Send the rerun log to a file, or stderr, as bare JSON lines"""
+    handler = logging.FileHandler(path, encoding='utf-8') if path else logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def get_metrics():
+    """Return the process-wide rerun recorder, configured from the environment"""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                log_path = os.environ.get(METRICS_LOG_ENV)
+                path = os.environ.get(METRICS_FILE_ENV)
+                port = os.environ.get(METRICS_PORT_ENV)
+                if not (os.environ.get(METRICS_ENV) or log_path or path or port):
+                    _metrics = NullMetrics()
+                else:
+                    if os.environ.get(METRICS_ENV) or log_path:
+                        configure_logging(log_path)
+                    _metrics = RerunMetrics(path, int(port) if port else None)
+    return _metrics
+
+
+def read_log(path):
+    """Rerun records from a metrics log, skipping lines that are not records"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict) and 'phases_ms' in record:
+                yield record
+
+
+def summarize(records, top=10):
+    """Per-phase latency percentiles and the busiest sessions of a metrics log"""
+    phases, walls, sessions = {}, {}, {}
+    for record in records:
+        walls.setdefault(record['kind'], []).append(record['wall_ms'])
+        for name, ms in record['phases_ms'].items():
+            phases.setdefault(name, []).append(ms)
+        session = sessions.setdefault(record['session'], {'reruns': 0, 'wall_ms': 0.0, 'session_state_bytes': 0})
+        session['reruns'] += 1
+        session['wall_ms'] += record['wall_ms']
+        session['session_state_bytes'] = record['session_state_bytes']
+
+    def percentiles(samples):
+        samples = sorted(samples)
+        return {
+            'runs': len(samples),
+            'median_ms': round(statistics.median(samples), 2),
+            'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 2),
+            'max_ms': round(samples[-1], 2)
+        }
+
+    hot = sorted(sessions.items(), key=lambda item: -item[1]['wall_ms'])[:top]
+    return {
+        'reruns': {kind: percentiles(samples) for kind, samples in walls.items()},
+        'phases': {name: percentiles(samples) for name, samples in phases.items()},
+        'hot_sessions': [dict(stats, session=session_id, wall_ms=round(stats['wall_ms'], 2)) for session_id, stats in hot]
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarise an AdviseeMatrix rerun metrics log")
+    parser.add_argument('log', help="JSON lines written with ADVISEE_METRICS_LOG (or captured from stderr)")
+    parser.add_argument('--top', type=int, default=10, help="busiest sessions to list")
+    args = parser.parse_args(argv)
+    print(json.dumps(summarize(read_log(args.log), args.top), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# AdviseeMatrix compiled requirement plans
+#
+# A major's requirement definition is a nested structure of sections and
+# course dicts whose placeholder slots are only recognisable by string
+# checks. compile_plan() flattens it once into parallel per-slot arrays with
+# everything the app needs precomputed, so rendering and auditing never have
+# to re-inspect the raw definitions. Plans are cached per catalog version by
+# Catalog.plan().
+
+from array import array
+
+from advisee_core import is_placeholder_code, placeholder_pattern, split_course_code
+from advisee_grading import NO_GRADE
+
+CUSTOM_COURSE_NAME = 'Custom Course'
+
+# Distinct course codes a slot index remembers the candidate slots of
+CANDIDATE_CACHE_SIZE = 50000
+
+
+class SectionPlan:
+    """One requirement section: a contiguous run of slots in the plan"""
+
+    __slots__ = ('index', 'name', 'required_credits', 'start', 'stop', 'title')
+
+    def __init__(self, index, name, required_credits, start, stop):
+        self.index = index
+        self.name = name
+        self.required_credits = required_credits
+        self.start = start
+        self.stop = stop
+        self.title = f"{name} (Required: {required_credits} credits)"
+
+    def slots(self):
+        """Slot numbers belonging to this section"""
+        return range(self.start, self.stop)
+
+
+class RequirementPlan:
+    """Compiled, read-only requirement slots of one major"""
+
+    __slots__ = (
+        'major_key', 'name', 'total_credits', 'sections',
+        'codes', 'row_ids', 'names', 'default_codes',
+        'placeholder', 'required', 'default_credits', 'section_index', 'row_index', 'slot_index'
+    )
+
+    def __init__(self, major_key, major_data, course_data):
+        self.major_key = major_key
+        self.name = major_data['name']
+        self.total_credits = major_data['total_credits']
+
+        sections = []
+        codes, row_ids, names, default_codes = [], [], [], []
+        placeholder = array('b')
+        required = array('b')
+        default_credits = array('H')
+        section_index = array('H')
+
+        for s, req_section in enumerate(major_data['requirements']):
+            start = len(codes)
+            for i, course in enumerate(req_section['courses']):
+                code = course['code']
+                is_placeholder = is_placeholder_code(code)
+                codes.append(code)
+                row_ids.append(f"{req_section['section']}_{i}")
+                default_codes.append('' if is_placeholder else code)
+                # Placeholder rows show the name of whatever code gets typed in,
+                # which starts out empty
+                names.append(CUSTOM_COURSE_NAME if is_placeholder
+                             else course_data.get(code, {}).get('name', CUSTOM_COURSE_NAME))
+                placeholder.append(is_placeholder)
+                required.append(bool(course.get('required')))
+                default_credits.append(course['credits'])
+                section_index.append(s)
+            sections.append(SectionPlan(s, req_section['section'], req_section['required_credits'], start, len(codes)))
+
+        self.sections = tuple(sections)
+        self.codes = tuple(codes)
+        self.row_ids = tuple(row_ids)
+        self.names = tuple(names)
+        self.default_codes = tuple(default_codes)
+        self.placeholder = placeholder
+        self.required = required
+        self.default_credits = default_credits
+        self.section_index = section_index
+        self.row_index = {row_id: slot for slot, row_id in enumerate(row_ids)}
+        self.slot_index = SlotIndex(self)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def default_entry(self, slot):
+        """Fresh course entry for a slot nothing has been entered for"""
+        return {
+            'code': self.default_codes[slot],
+            'credits': self.default_credits[slot],
+            'grade': NO_GRADE,
+            'status': 'Not Taken'
+        }
+
+
+class SlotIndex:
+    """Index of a plan's requirement slots by the course codes they accept"""
+
+    __slots__ = ('fixed', 'wildcards', '_candidates')
+
+    def __init__(self, plan):
+        self.fixed = {}
+        self.wildcards = {}
+        self._candidates = {}
+        for slot, code in enumerate(plan.codes):
+            if plan.placeholder[slot]:
+                self.wildcards.setdefault(placeholder_pattern(code), []).append(slot)
+            else:
+                self.fixed.setdefault(code, []).append(slot)
+
+    def candidate_slots(self, code):
+        """Slots a course could fill, most specific first"""
+        candidates = self._candidates.get(code)
+        if candidates is not None:
+            return candidates
+        subject, number = split_course_code(code)
+        candidates = list(self.fixed.get(code, ()))
+        for pattern_subject in (subject, ''):
+            for length in range(len(number), -1, -1):
+                candidates.extend(self.wildcards.get((pattern_subject, number[:length]), ()))
+        # Audits look up the same catalog codes over and over
+        if len(self._candidates) >= CANDIDATE_CACHE_SIZE:
+            self._candidates.clear()
+        candidates = self._candidates[code] = tuple(candidates)
+        return candidates
+
+
+def compile_plan(major_key, major_requirements, course_data):
+    """Compile one major's requirements into a RequirementPlan"""
+    return RequirementPlan(major_key, major_requirements[major_key], course_data)
@@ -0,0 +1,639 @@
+# AdviseeMatrix graduation planner
+#
+# Checks whether the requirement slots a student still has to fill can be
+# finished by the expected graduation term, and lays out a term-by-term
+# schedule when they can. Courses name their prerequisites and the seasons
+# they are offered in course_data:
+#
+#   "BIOL2373": {"name": "Skills for Biologists", "credits": 3, "level": 2,
+#                "prerequisites": ["BIOL1020", "BIOL1025"], "offered": ["Fall"]}
+#
+# A course without "offered" runs every season. Every prerequisite must be
+# passed, or in progress now, before the term a course is taken in.
+#
+# The courses to schedule are those of the unfilled fixed slots, every
+# prerequisite of theirs not yet taken, and one catalog course per unfilled
+# wildcard slot: a prerequisite the plan already needs if one fits the slot,
+# otherwise one of the fitting courses, the fewest outstanding prerequisites
+# first. A wildcard no catalog course fits is scheduled as an open elective
+# offered every season.
+#
+# The plan is first checked with an open elective in every wildcard slot:
+# without a schedule there, no choice of wildcard courses has one. Otherwise
+# the choices are tried in turn until one has a schedule. Fitting courses
+# alike in credits, seasons and outstanding prerequisites are one choice,
+# and a course is not tried while one with no more credits, no fewer seasons
+# and a subset of its prerequisites is free. The planner gives up undecided
+# after MAX_SELECTIONS choices.
+#
+# The schedule is found by a depth-first search over the terms, memoized on
+# (term, courses done). Each term takes a maximal set of the courses whose
+# prerequisites are done - taking a course earlier never hurts, so only
+# maximal sets need trying - most urgent first by latest term, which a
+# reverse topological pass gives: before each course that depends on it,
+# and early enough for all that follow it to fit in the terms of their
+# seasons. A state is pruned when a course's earliest term is past its
+# latest, or when the courses that can only be taken within some run of
+# terms carry more credits than those terms hold, each holding at most the
+# credit cap and no more than the courses that could run in it. Courses
+# nothing depends on that are alike in credits and seasons are taken in a
+# fixed order. An exhausted search proves that no schedule of the chosen
+# courses exists; the searches of all choices give up undecided after
+# MAX_STATES states between them.
+#
+# Usage:
+#   python advisee_planner.py STUDENT_ID [--graduation "Spring 2028"] [--seasons Fall Spring] [--credit-cap 18]
+
+import argparse
+import json
+import re
+import sys
+import time
+
+from advisee_core import SEMESTER_OPTIONS, is_placeholder_code, placeholder_pattern
+from advisee_matching import FREE, entry_courses, match_courses
+from advisee_progress import entry_contribution
+
+# Seasons in calendar order; term numbers are year * 4 + season
+CALENDAR_SEASONS = ('Winter', 'Spring', 'Summer', 'Fall')
+DEFAULT_SEASONS = ('Fall', 'Spring')
+DEFAULT_CREDIT_CAP = 18
+MAX_STATES = 20_000
+# Choices of wildcard courses tried before the planner gives up undecided
+MAX_SELECTIONS = 50
+# Credits assumed for a prerequisite missing from the catalog
+UNKNOWN_CREDITS = 3
+
+SEASON_RE = re.compile(r'\b(winter|spring|summer|fall)\b', re.IGNORECASE)
+YEAR_RE = re.compile(r'\b(\d{4})\b')
+
+
+def term_number(season, year):
+    return year * len(CALENDAR_SEASONS) + CALENDAR_SEASONS.index(season)
+
+
+def term_label(term):
+    return f"{CALENDAR_SEASONS[term % len(CALENDAR_SEASONS)]} {term // len(CALENDAR_SEASONS)}"
+
+
+def parse_term(text):
+    """Term number of a term written like 'Spring 2028'"""
+    season, year = SEASON_RE.search(text or ''), YEAR_RE.search(text or '')
+    if not (season and year):
+        raise ValueError(f"{text!r} is not a term like 'Spring 2028'")
+    return term_number(season.group(1).title(), int(year.group(1)))
+
+
+def current_term(semester, academic_year):
+    """Term number of the sidebar's semester in an academic year such as '2026' or '2026/2027'"""
+    years = YEAR_RE.findall(academic_year or '')
+    if not years:
+        raise ValueError(f"{academic_year!r} is not an academic year like '2026'")
+    # In a two-year academic year only the fall term falls in the first year
+    year = years[1] if len(years) > 1 and semester != 'Fall' else years[0]
+    return term_number(semester, int(year))
+
+
+def planning_terms(start, graduation, seasons):
+    """Terms after start up to and including graduation, in the seasons a student takes classes"""
+    return [term for term in range(start + 1, graduation + 1) if CALENDAR_SEASONS[term % len(CALENDAR_SEASONS)] in seasons]
+
+
+def placeholder_level(code):
+    """Course level a wildcard asks for, e.g. ELEC3XXX -> 3, 0 for any level"""
+    _, number = placeholder_pattern(code)
+    return int(number[0]) if number[:1].isdigit() else 0
+
+
+def is_done(course, scale):
+    """Whether a course counts as taken: in progress, or completed and not failed"""
+    if course['status'] == 'In Progress':
+        return True
+    if course['status'] != 'Completed':
+        return False
+    return not course['grade'] or entry_contribution(course, scale)[0] > 0
+
+
+class PlannedCourse:
+    """A course the planner schedules and the slot it fills, if any"""
+
+    __slots__ = ('code', 'name', 'credits', 'level', 'offered', 'prerequisites', 'slot', 'open_elective')
+
+    def __init__(self, code, record, slot=None, open_elective=False):
+        record = record or {}
+        self.code = code
+        self.name = record.get('name') or ("Open elective" if open_elective else "Not in the catalog")
+        self.credits = int(record.get('credits') or UNKNOWN_CREDITS)
+        self.level = record.get('level') or (open_elective and placeholder_level(code))
+        self.offered = tuple(record.get('offered') or SEMESTER_OPTIONS)
+        self.prerequisites = tuple(code.strip().upper() for code in record.get('prerequisites') or ())
+        self.slot = slot
+        self.open_elective = open_elective
+
+    def __repr__(self):
+        return f"PlannedCourse({self.code!r}, slot={self.slot})"
+
+
+def select_courses(catalog, plan, slots, done, seasons, relaxed=False):
+    """Choices of courses that fill the given slots, plus their outstanding prerequisites
+
+    Yields one course list per choice of wildcard courses, the likeliest to
+    fit first. relaxed yields a single list with an open elective for every
+    wildcard no needed prerequisite fills: when it has no schedule, no
+    choice has one.
+    """
+    records, prerequisite_codes = {}, {}
+
+    def record(code):
+        if code not in records:
+            records[code] = catalog.course_data.get(code)
+        return records[code]
+
+    def prerequisites(code):
+        if code not in prerequisite_codes:
+            prerequisite_codes[code] = tuple(p.strip().upper() for p in (record(code) or {}).get('prerequisites') or ())
+        return prerequisite_codes[code]
+
+    def add(planned, code, slot=None):
+        """Plan a course and, depth first, its prerequisites not planned yet"""
+        planned[code] = slot
+        stack = [code]
+        while stack:
+            for p in prerequisites(stack.pop()):
+                if p not in done and p not in planned:
+                    planned[p] = None
+                    stack.append(p)
+
+    # Planned course codes, in the order they were added, and the slot each fills
+    planned, wildcards = {}, []
+    for slot in slots:
+        code = plan.codes[slot]
+        if is_placeholder_code(code):
+            wildcards.append(slot)
+        elif code in planned:
+            planned[code] = slot
+        else:
+            add(planned, code, slot)
+
+    def dominates(a, b):
+        """Whether a course of kind a fits every schedule a course of kind b does"""
+        return a != b and a[0] <= b[0] and a[1] >= b[1] and a[2] <= b[2]
+
+    index = catalog.course_index()
+    kinds, fits = {}, {}
+
+    def candidate_kinds(slot_code, slot_credits):
+        """The courses that can fill a wildcard, grouped into kinds alike in
+        credits, seasons and outstanding prerequisites, in catalog order"""
+        key = (slot_code, slot_credits)
+        if key not in kinds:
+            slot_kinds = kinds[key] = {}
+            for code in index.resolve(slot_code):
+                if code in done:
+                    continue
+                data = record(code)
+                credits = int(data.get('credits') or UNKNOWN_CREDITS)
+                offered = frozenset(data.get('offered') or SEMESTER_OPTIONS) & frozenset(seasons)
+                if credits < slot_credits or not offered:
+                    continue
+                outstanding = frozenset(p for p in prerequisites(code) if p not in done)
+                slot_kinds.setdefault((credits, offered, outstanding), []).append(code)
+        return kinds[key]
+
+    def fits_slot(code, slot_code, slot_credits):
+        if (code, slot_code) not in fits:
+            fits[code, slot_code] = index.satisfies(code, slot_code)
+        return fits[code, slot_code] and int((record(code) or {}).get('credits') or UNKNOWN_CREDITS) >= slot_credits
+
+    def choose(k, planned, electives):
+        if k == len(wildcards):
+            courses = [PlannedCourse(code, record(code), slot) for code, slot in planned.items()]
+            courses.extend(PlannedCourse(plan.codes[slot], {'credits': plan.default_credits[slot]}, slot,
+                                         open_elective=True) for slot in electives)
+            yield courses
+            return
+        slot = wildcards[k]
+        slot_code, slot_credits = plan.codes[slot], plan.default_credits[slot]
+        # A prerequisite the plan needs anyway fills the slot at no cost
+        needed = [code for code, filled in planned.items() if filled is None and fits_slot(code, slot_code, slot_credits)]
+        if needed:
+            branch = dict(planned)
+            branch[min(needed, key=lambda code: ((record(code) or {}).get('level') or 0, code))] = slot
+            yield from choose(k + 1, branch, electives)
+            return
+        if relaxed:
+            yield from choose(k + 1, planned, electives + [slot])
+            return
+        available = {kind: next((code for code in codes if code not in planned), None)
+                     for kind, codes in candidate_kinds(slot_code, slot_credits).items()}
+        # Kinds no available kind dominates; a kind's dominators sort before it
+        frontier = []
+        for position, kind in sorted(((position, kind) for position, (kind, code) in enumerate(available.items())
+                                      if code is not None), key=lambda item: (item[1][0], -len(item[1][1]), len(item[1][2]))):
+            if not any(dominates(other, kind) for _, other in frontier):
+                frontier.append((position, kind))
+        options = [(len(kind[2].difference(planned)), len(kind[2]), position, available[kind])
+                   for position, kind in frontier]
+        if not options:
+            yield from choose(k + 1, planned, electives + [slot])
+            return
+        for *_, code in sorted(options):
+            branch = dict(planned)
+            add(branch, code, slot)
+            yield from choose(k + 1, branch, electives)
+
+    # Narrow wildcards choose first, so ELEC slots do not take their courses
+    wildcards.sort(key=lambda slot: len(index.resolve(plan.codes[slot])))
+    return choose(0, planned, [])
+
+
+def topological_order(courses):
+    """Course positions with every prerequisite before the courses requiring it"""
+    position = {course.code: i for i, course in enumerate(courses) if not course.open_elective}
+    dependents = [[] for _ in courses]
+    waiting = [0] * len(courses)
+    for i, course in enumerate(courses):
+        for code in course.prerequisites:
+            if code in position:
+                dependents[position[code]].append(i)
+                waiting[i] += 1
+    order = [i for i in range(len(courses)) if not waiting[i]]
+    for i in order:
+        for d in dependents[i]:
+            waiting[d] -= 1
+            if not waiting[d]:
+                order.append(d)
+    if len(order) < len(courses):
+        cycle = sorted(courses[i].code for i in range(len(courses)) if waiting[i])
+        raise ValueError(f"prerequisite cycle among {', '.join(cycle)}")
+    return order, dependents
+
+
+def bit_positions(mask):
+    """Positions of the set bits of an int"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class SearchLimit(Exception):
+    """The schedule search explored its state budget without a decision"""
+
+
+class ScheduleSearch:
+    """Memoized depth-first search for a term-by-term schedule of a set of courses"""
+
+    def __init__(self, courses, terms, credit_cap, max_states=MAX_STATES):
+        self.courses = courses
+        self.terms = terms
+        self.credit_cap = credit_cap
+        self.max_states = max_states
+        self.states = 0
+        self.failed = set()
+
+        n, horizon = len(courses), len(terms)
+        self.order, self.dependents = topological_order(courses)
+        position = {course.code: i for i, course in enumerate(courses) if not course.open_elective}
+        self.prerequisites = [[position[code] for code in course.prerequisites if code in position] for course in courses]
+        self.prerequisite_mask = [sum(1 << p for p in prerequisites) for prerequisites in self.prerequisites]
+        self.credits = [course.credits for course in courses]
+        self.full = (1 << n) - 1
+
+        # next_offered[i][t]: first term from t the course runs in (horizon if none)
+        self.offered = offered = [[CALENDAR_SEASONS[term % len(CALENDAR_SEASONS)] in course.offered for term in terms]
+                                  for course in courses]
+        self.next_offered = []
+        for runs in offered:
+            table, following = [horizon] * (horizon + 1), horizon
+            for t in range(horizon - 1, -1, -1):
+                if runs[t]:
+                    following = t
+                table[t] = following
+            self.next_offered.append(table)
+
+        # Seasons as bits: each term has one, each course those it runs in.
+        # Courses running in some seasons only fit in the terms of those
+        # seasons; supersets lists the season sets containing a course's
+        seasons = sorted({term % len(CALENDAR_SEASONS) for term in terms})
+        self.term_bits = [1 << seasons.index(term % len(CALENDAR_SEASONS)) for term in terms]
+        self.season_names = {1 << k: CALENDAR_SEASONS[season] for k, season in enumerate(seasons)}
+        self.course_bits = [sum({bit for bit, runs in zip(self.term_bits, offered[i]) if runs}) for i in range(n)]
+        self.all_seasons = (1 << len(seasons)) - 1
+        self.season_sets = list(range(1, self.all_seasons + 1))
+        self.supersets = {bits: [subset for subset in self.season_sets if subset & bits == bits]
+                          for bits in set(self.course_bits)}
+
+        # terms_from[s][u]: terms from u on in season set s
+        self.terms_from = [[0] * (horizon + 1) for _ in range(self.all_seasons + 1)]
+        for subset in self.season_sets:
+            for u in range(horizon - 1, -1, -1):
+                self.terms_from[subset][u] = self.terms_from[subset][u + 1] + (1 if self.term_bits[u] & subset else 0)
+
+        # Latest term each course can be taken in and still leave room for
+        # what depends on it: each dependent after it, and all the courses
+        # that follow it in the terms of their seasons
+        self.latest = [horizon - 1] * n
+        self.limited_by = [None] * n
+        self.descendants = [0] * n
+        for i in reversed(self.order):
+            limit = horizon - 1
+            for d in self.dependents[i]:
+                self.descendants[i] |= self.descendants[d] | 1 << d
+                if self.latest[d] - 1 < limit:
+                    limit, self.limited_by[i] = self.latest[d] - 1, d
+            load = [0] * (self.all_seasons + 1)
+            for d in bit_positions(self.descendants[i]):
+                for subset in self.supersets[self.course_bits[d]]:
+                    load[subset] += self.credits[d]
+            while limit >= 0 and (not offered[i][limit] or any(
+                    load[subset] > credit_cap * self.terms_from[subset][limit + 1] for subset in self.season_sets)):
+                limit -= 1
+            self.latest[i] = limit
+
+        # Taken in this order within a term: most urgent, then most depended on
+        self.priority = sorted(range(n), key=lambda i: (self.latest[i], -len(self.dependents[i]), courses[i].level, courses[i].code))
+
+    def chain(self, i):
+        codes = [self.courses[i].code]
+        while self.limited_by[i] is not None:
+            i = self.limited_by[i]
+            codes.append(self.courses[i].code)
+        return ' → '.join(codes)
+
+    def infeasible(self, t, done, explain=False):
+        """Why no schedule can finish from term t with the done courses, or None if the bounds allow one"""
+        horizon, cap, credits = len(self.terms), self.credit_cap, self.credits
+        earliest = {}
+        # window[s][e][l]: credits of the courses running only in season set s
+        # that must go between terms e and l; room[u]: credits of the courses
+        # that could go in term u
+        window = [[[0] * horizon for _ in range(horizon)] if subset else None for subset in range(self.all_seasons + 1)]
+        room = [0] * horizon
+        for i in self.order:
+            if done >> i & 1:
+                continue
+            start = t
+            for p in self.prerequisites[i]:
+                if not done >> p & 1:
+                    start = max(start, earliest[p] + 1)
+            earliest[i] = self.next_offered[i][min(start, horizon)]
+            if earliest[i] > self.latest[i]:
+                if not explain:
+                    return True
+                course, last = self.courses[i], term_label(self.terms[-1])
+                if self.latest[i] < 0:
+                    if self.limited_by[i] is None or self.latest[self.limited_by[i]] > 0:
+                        following = sum(1 for _ in bit_positions(self.descendants[i]))
+                        return (f"{course.code} and the {following} courses that follow it cannot all be taken "
+                                f"by {last} at {cap} credits per term")
+                    return f"{self.chain(i)} cannot all be taken in order by {last} ({course.code} runs in {', '.join(course.offered)})"
+                if earliest[i] == horizon:
+                    return f"{course.code} cannot be taken by {last}: its prerequisites leave no term it runs in ({', '.join(course.offered)})"
+                return (f"{course.code} can be taken in {term_label(self.terms[earliest[i]])} at the earliest, "
+                        f"too late for {self.chain(i)} by {last}")
+            for subset in self.supersets[self.course_bits[i]]:
+                window[subset][earliest[i]][self.latest[i]] += credits[i]
+            runs = self.offered[i]
+            for u in range(earliest[i], self.latest[i] + 1):
+                if runs[u]:
+                    room[u] += credits[i]
+
+        # Every run of terms a..b must hold the courses that can only go in it,
+        # and in the terms of their seasons. A term holds at most the cap, and
+        # no more than could run in it.
+        for subset in self.season_sets:
+            capacity = [0] * (horizon + 1)
+            for u in range(t, horizon):
+                capacity[u + 1] = capacity[u] + (min(cap, room[u]) if self.term_bits[u] & subset else 0)
+            inside = [0] * horizon
+            for a in range(horizon - 1, t - 1, -1):
+                load, row = 0, window[subset][a]
+                for b in range(a, horizon):
+                    inside[b] += row[b]
+                    load += inside[b]
+                    if load > capacity[b + 1] - capacity[a]:
+                        if not explain:
+                            return True
+                        terms = term_label(self.terms[a]) if a == b else f"{term_label(self.terms[a])} to {term_label(self.terms[b])}"
+                        if subset == self.all_seasons:
+                            return (f"{load} credits can only be taken in {terms}, "
+                                    f"but those terms hold at most {capacity[b + 1] - capacity[a]} credits")
+                        return (f"{load} credits of courses running only in {self.seasons(subset)} can only be taken "
+                                f"in {terms}, but its {self.seasons(subset)} terms hold at most {capacity[b + 1] - capacity[a]} credits")
+        return None
+
+    def seasons(self, subset):
+        return ' or '.join(name for bit, name in self.season_names.items() if bit & subset)
+
+    def term_sets(self, available, room):
+        """Maximal sets of the available courses that fit in room credits, most urgent first"""
+        credits = self.credits
+        # Available courses nothing depends on are interchangeable with those
+        # of the same credits and seasons; they are taken in priority order,
+        # so the search does not try their permutations
+        twin, last = {}, {}
+        for i in available:
+            if not self.dependents[i]:
+                kind = (credits[i], self.courses[i].offered)
+                twin[i] = last.get(kind)
+                last[kind] = i
+        chosen, skipped = [], set()
+
+        def extend(k, room):
+            if k == len(available):
+                if all(credits[i] > room for i in skipped):
+                    yield list(chosen)
+                return
+            i = available[k]
+            if credits[i] <= room and twin.get(i) not in skipped:
+                chosen.append(i)
+                yield from extend(k + 1, room - credits[i])
+                chosen.pop()
+            skipped.add(i)
+            yield from extend(k + 1, room)
+            skipped.discard(i)
+
+        return extend(0, room)
+
+    def search(self, t, done):
+        """Course sets for terms t onwards that finish every course, or None"""
+        if done == self.full:
+            return []
+        if t == len(self.terms) or (t, done) in self.failed:
+            return None
+        self.states += 1
+        if self.states > self.max_states:
+            raise SearchLimit
+        if self.infeasible(t, done):
+            self.failed.add((t, done))
+            return None
+        available = [
+            i for i in self.priority
+            if not done >> i & 1 and not self.prerequisite_mask[i] & ~done and self.next_offered[i][t] == t
+        ]
+        if sum(self.credits[i] for i in available) <= self.credit_cap:
+            options = [available]
+        else:
+            options = self.term_sets(available, self.credit_cap)
+        for taken in options:
+            rest = self.search(t + 1, done | sum(1 << i for i in taken))
+            if rest is not None:
+                return [taken] + rest
+        self.failed.add((t, done))
+        return None
+
+    def run(self):
+        """(course sets per term, None) or (None, why not); (None, None) if undecided"""
+        if not self.courses:
+            return [], None
+        if not self.terms:
+            return None, "there are no terms left before the graduation term"
+        for course in self.courses:
+            if course.credits > self.credit_cap:
+                return None, f"{course.code} carries {course.credits} credits, more than the {self.credit_cap} credit cap per term"
+        reason = self.infeasible(0, 0, explain=True)
+        if reason:
+            return None, reason
+        try:
+            schedule = self.search(0, 0)
+        except SearchLimit:
+            return None, None
+        if schedule is None:
+            return None, (f"no order of the {len(self.courses)} remaining courses ({sum(self.credits)} credits) "
+                          f"fits {len(self.terms)} terms at {self.credit_cap} credits each")
+        return schedule, None
+
+
+class GraduationPlan:
+    """A term-by-term schedule to the graduation term, or why there is none"""
+
+    __slots__ = ('plan', 'graduation_term', 'feasible', 'terms', 'courses', 'reason', 'states', 'elapsed')
+
+    def __init__(self, plan, graduation_term, feasible, terms, courses, reason, states, elapsed):
+        self.plan = plan
+        self.graduation_term = graduation_term
+        # True, False, or None when the search gave up
+        self.feasible = feasible
+        self.terms = terms
+        self.courses = courses
+        self.reason = reason
+        self.states = states
+        self.elapsed = elapsed
+
+    @property
+    def last_term(self):
+        used = [term for term, courses in self.terms if courses]
+        return used[-1] if used else None
+
+    def requirement(self, course):
+        if course.slot is None:
+            return "Prerequisite"
+        return f"{self.plan.sections[self.plan.section_index[course.slot]].name}: {self.plan.codes[course.slot]}"
+
+    def rows(self):
+        """One row per scheduled course, for tables and exports"""
+        return [
+            {'term': term_label(term), 'code': course.code, 'name': course.name,
+             'credits': course.credits, 'requirement': self.requirement(course)}
+            for term, courses in self.terms for course in courses
+        ]
+
+    def summary(self):
+        return {
+            'major': self.plan.major_key,
+            'graduation_term': term_label(self.graduation_term),
+            'feasible': self.feasible,
+            'finishes': term_label(self.last_term) if self.last_term is not None else None,
+            'reason': self.reason,
+            'remaining_credits': sum(course.credits for course in self.courses),
+            'states': self.states,
+            'elapsed_ms': round(self.elapsed * 1000, 3),
+            'schedule': self.rows()
+        }
+
+
+def plan_graduation(catalog, major_key, course_entries, start_term, graduation_term,
+                    seasons=DEFAULT_SEASONS, credit_cap=DEFAULT_CREDIT_CAP, max_states=MAX_STATES):
+    """Schedule a major's unfilled slots over the terms after start_term up to graduation_term
+
+    course_entries are session entries (integer grade codes). Courses in
+    progress are done by the end of start_term, the current term. Raises
+    ValueError for prerequisites that form a cycle.
+    """
+    started = time.perf_counter()
+    plan = catalog.plan(major_key)
+    taken = [course for course in entry_courses(plan, course_entries) if is_done(course, catalog.grading_scale)]
+    done = {course['code'] for course in taken}
+    slots = [slot for slot, course in enumerate(match_courses(plan, taken).slot_course) if course == FREE]
+    terms = planning_terms(start_term, graduation_term, seasons)
+
+    # Choices of electives are only worth trying when there is a schedule
+    # with electives free of prerequisites and offered every term
+    [relaxed] = select_courses(catalog, plan, slots, done, seasons, relaxed=True)
+    search = ScheduleSearch(relaxed, terms, credit_cap, max_states)
+    schedule, reason = search.run()
+    states, courses = search.states, relaxed
+    if reason:
+        feasible = False
+    else:
+        feasible, schedule = None, None
+        for tried, selected in enumerate(select_courses(catalog, plan, slots, done, seasons)):
+            if tried == MAX_SELECTIONS or states >= max_states:
+                feasible, reason = None, None
+                break
+            search = ScheduleSearch(selected, terms, credit_cap, max_states - states)
+            schedule, why = search.run()
+            states += search.states
+            if tried == 0:
+                courses, reason = selected, why
+            if schedule is not None:
+                feasible, courses, reason = True, selected, None
+                break
+            if why is None:
+                feasible, reason = None, None
+                break
+        else:
+            feasible = False
+            if tried:
+                reason += f"; no other choice of electives fits either ({tried + 1} tried)"
+    term_courses = [(term, sorted((courses[i] for i in term_set), key=lambda course: course.code))
+                    for term, term_set in zip(terms, schedule or ())]
+    return GraduationPlan(plan, graduation_term, feasible, term_courses, courses, reason,
+                          states, time.perf_counter() - started)
+
+
+def main(argv=None):
+    from advisee_catalog import get_catalog
+    from advisee_store import decode_entries, get_store
+
+    parser = argparse.ArgumentParser(description="Plan a saved student's remaining courses term by term")
+    parser.add_argument('student_id')
+    parser.add_argument('--graduation', help="target term, e.g. 'Spring 2028' (default: the saved expected graduation)")
+    parser.add_argument('--seasons', nargs='+', choices=CALENDAR_SEASONS, default=list(DEFAULT_SEASONS),
+                        help="seasons the student takes classes in")
+    parser.add_argument('--credit-cap', type=int, default=DEFAULT_CREDIT_CAP, help="most credits per term")
+    parser.add_argument('--db', help="matrix database (default: $ADVISEE_DB_PATH)")
+    args = parser.parse_args(argv)
+
+    record = get_store(args.db).load(args.student_id)
+    if record is None:
+        parser.error(f"no saved matrix for student {args.student_id}")
+    if not record['current_major']:
+        parser.error(f"student {args.student_id} has no major selected")
+    catalog = get_catalog()
+    info = record['student_info']
+    try:
+        start = current_term(info.get('semester', 'Fall'), info.get('academic_year'))
+        graduation = parse_term(args.graduation or info.get('graduation_term'))
+        result = plan_graduation(catalog, record['current_major'],
+                                 decode_entries(record['course_entries'], catalog.grading_scale),
+                                 start, graduation, args.seasons, args.credit_cap)
+    except ValueError as e:
+        parser.error(str(e))
+    print(json.dumps(result.summary(), indent=2))
+    return 0 if result.feasible else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
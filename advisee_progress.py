@@ -0,0 +1,255 @@
+# AdviseeMatrix incremental progress totals
+#
+# The Progress Summary used to rescan every course entry of the current major
+# on each rerun. ProgressAccumulator instead keeps running per-section and
+# overall credit/quality point totals and applies the delta of a single row
+# whenever that row changes, so the summary costs O(1) per edit regardless of
+# how long a major's requirement list is.
+#
+# summary() and audit_record() give the Progress Summary's figures without
+# Streamlit, for the audit service and other headless callers.
+# audit_record() sums each section's completed, graded courses straight from
+# the stored letter grades, through the audit result cache, after
+# validate_record() has checked that the record has the stored layout.
+
+from advisee_core import MAX_CREDITS, STATUS_OPTIONS, parse_credits
+from advisee_grading import DEFAULT_SCALE, NO_GRADE
+
+NO_CONTRIBUTION = (0, 0, 0.0)
+
+# Overall progress at which the summary calls a student almost done
+ALMOST_DONE = 75
+
+
+def progress_standing(progress):
+    """How the Progress Summary describes overall progress: complete, almost or in_progress"""
+    if progress >= 100:
+        return 'complete'
+    if progress >= ALMOST_DONE:
+        return 'almost'
+    return 'in_progress'
+
+
+def entry_contribution(entry, scale=DEFAULT_SCALE):
+    """Earned credits, GPA credits and quality points a course entry adds to the summary"""
+    grade = entry['grade']
+    if entry['status'] != 'Completed' or not grade:
+        return NO_CONTRIBUTION
+    credits = entry['credits']
+    if scale.counts_gpa[grade]:
+        return credits * scale.counts_credits[grade], credits, scale.quality_points(grade, credits)
+    return credits * scale.counts_credits[grade], 0, 0.0
+
+
+class ProgressAccumulator:
+    """Running per-section and overall credit/QP totals for one major"""
+
+    def __init__(self, plan, scale=DEFAULT_SCALE):
+        self.plan = plan
+        self.scale = scale
+        self.major_key = plan.major_key
+        self.reset()
+
+    def reset(self):
+        """Zero all totals"""
+        self.contributions = [NO_CONTRIBUTION] * len(self.plan)
+        self.section_credits = [0] * len(self.plan.sections)
+        self.section_gpa_credits = [0] * len(self.plan.sections)
+        self.section_qp = [0.0] * len(self.plan.sections)
+        self.overall_credits = 0
+        self.overall_gpa_credits = 0
+
+    def rebuild(self, course_entries):
+        """Recompute all totals from scratch, e.g. after switching major"""
+        self.reset()
+        for slot, row_id in enumerate(self.plan.row_ids):
+            entry = course_entries.get(row_id)
+            if entry is not None:
+                self.update(slot, entry)
+
+    def update(self, slot, entry):
+        """Apply the change of one slot's course entry to the running totals"""
+        new = entry_contribution(entry, self.scale)
+        old = self.contributions[slot]
+        if new == old:
+            return
+        self.contributions[slot] = new
+
+        s = self.plan.section_index[slot]
+        credits_delta = new[0] - old[0]
+        gpa_credits_delta = new[1] - old[1]
+        qp_delta = new[2] - old[2]
+        self.section_credits[s] += credits_delta
+        self.section_gpa_credits[s] += gpa_credits_delta
+        self.section_qp[s] += qp_delta
+        self.overall_credits += credits_delta
+        self.overall_gpa_credits += gpa_credits_delta
+
+        # Quality points only come with GPA credits; dropping the floating
+        # point residue keeps an emptied section from showing a GPA of -0.00
+        if self.section_gpa_credits[s] == 0:
+            self.section_qp[s] = 0.0
+
+    def section_gpa(self, s):
+        """GPA over the completed courses of one section"""
+        credits = self.section_gpa_credits[s]
+        return self.section_qp[s] / credits if credits > 0 else 0.0
+
+    @property
+    def overall_qp(self):
+        """Quality points over all sections"""
+        # Summed section by section, in the same order the summary always
+        # used, so the overall GPA rounds exactly as it did before
+        overall_qp = 0
+        for section_qp in self.section_qp:
+            overall_qp += section_qp
+        return overall_qp
+
+    def overall_gpa(self):
+        """GPA over all completed courses of the major"""
+        return self.overall_qp / self.overall_gpa_credits if self.overall_gpa_credits > 0 else 0.0
+
+    def summary(self):
+        """Section and overall figures in the shape the batch audit reports them"""
+        return audit_summary(self.plan, zip(self.section_credits, self.section_gpa_credits, self.section_qp))
+
+
+def audit_summary(plan, section_figures):
+    """Section and overall figures from each section's (credits, GPA credits, quality points)"""
+    sections = []
+    overall_credits = overall_gpa_credits = 0
+    overall_qp = 0
+    for section, (credits, gpa_credits, qp) in zip(plan.sections, section_figures):
+        sections.append({
+            'section': section.name,
+            'required_credits': section.required_credits,
+            'credits': credits,
+            'qp': qp,
+            'gpa': qp / gpa_credits if gpa_credits > 0 else 0.0,
+            'progress': credits / section.required_credits * 100
+        })
+        overall_credits += credits
+        overall_gpa_credits += gpa_credits
+        overall_qp += qp
+    overall_progress = overall_credits / plan.total_credits * 100
+    return {
+        'major': plan.major_key,
+        'sections': sections,
+        'overall_credits': overall_credits,
+        'overall_qp': overall_qp,
+        'overall_gpa': overall_qp / overall_gpa_credits if overall_gpa_credits > 0 else 0.0,
+        'overall_progress': overall_progress,
+        'total_credits': plan.total_credits,
+        'remaining_credits': plan.total_credits - overall_credits,
+        'standing': progress_standing(overall_progress)
+    }
+
+
+def validate_record(record, scale=DEFAULT_SCALE):
+    """Raise ValueError unless a matrix record has the stored layout, with known grades and credits in range"""
+    if not isinstance(record, dict):
+        raise ValueError("matrix record must be an object")
+    for field, kind, name in (('current_major', str, 'a string'), ('student_info', dict, 'an object'),
+                              ('course_entries', dict, 'an object')):
+        if record.get(field) is not None and not isinstance(record[field], kind):
+            raise ValueError(f"{field} must be {name}")
+    letters, n_grades = scale.codes, len(scale)
+    for row_id, entry in (record.get('course_entries') or {}).items():
+        # Entries as the store writes them pass the first test; anything
+        # else is looked at field by field, to say what is wrong with it
+        if entry.__class__ is dict:
+            credits, grade, code = entry.get('credits'), entry.get('grade'), entry.get('code')
+            if (credits.__class__ is int and 0 <= credits <= MAX_CREDITS and entry.get('status') in STATUS_OPTIONS
+                    and (code is None or code.__class__ is str) and 'grade' in entry
+                    and (grade in letters if grade.__class__ is str else
+                         grade is None or grade.__class__ is int and 0 <= grade < n_grades)):
+                continue
+        if not isinstance(entry, dict):
+            raise ValueError(f"course entry {row_id}: must be an object")
+        missing = [field for field in ('credits', 'grade', 'status') if field not in entry]
+        if missing:
+            raise ValueError(f"course entry {row_id}: missing {', '.join(missing)}")
+        if not isinstance(entry.get('code') or '', str):
+            raise ValueError(f"course entry {row_id}: code must be a string")
+        credits = entry['credits']
+        if isinstance(credits, bool) or not isinstance(credits, int):
+            raise ValueError(f"course entry {row_id}: credits {credits!r} is not a whole number")
+        try:
+            parse_credits(credits)
+        except ValueError as e:
+            raise ValueError(f"course entry {row_id}: {e}") from None
+        grade = entry['grade']
+        # Letters as stored, or grade codes as in a session
+        if isinstance(grade, str):
+            known = grade in scale.codes
+        else:
+            known = grade is None or (isinstance(grade, int) and not isinstance(grade, bool) and 0 <= grade < len(scale))
+        if not known:
+            raise ValueError(f"course entry {row_id}: grade {grade!r} is not on the grading scale")
+        if entry['status'] not in STATUS_OPTIONS:
+            raise ValueError(f"course entry {row_id}: status {entry['status']!r} is not one of {', '.join(STATUS_OPTIONS)}")
+
+
+def counted_courses(plan, course_entries, scale):
+    """Per section of a plan, the (slot, code, credits, grade) of each entry that adds to the figures
+
+    Grades may be codes (session entries) or letters (stored entries); an
+    unknown letter counts as no grade, a code off the scale is a ValueError.
+    """
+    sections = [[] for _ in plan.sections]
+    row_index, section_index, letters = plan.row_index, plan.section_index, scale.codes
+    n_grades = len(scale.counts_credits)
+    for row_id, entry in course_entries.items():
+        slot = row_index.get(row_id)
+        if slot is None or entry['status'] != 'Completed':
+            continue
+        grade = entry['grade']
+        if grade.__class__ is str:
+            grade = letters.get(grade, NO_GRADE)
+        elif grade is None:
+            continue
+        elif not 0 <= grade < n_grades:
+            raise ValueError(f"course entry {row_id}: grade {grade!r} is not on the grading scale")
+        if grade:
+            sections[section_index[slot]].append((slot, entry.get('code') or '', entry['credits'], grade))
+    for courses in sections:
+        courses.sort()
+    return sections
+
+
+def section_figures(courses, scale):
+    """Earned credits, GPA credits and quality points of a section's counted courses"""
+    credits = gpa_credits = 0
+    qp = 0.0
+    n_grades = len(scale.counts_credits)
+    # Summed slot by slot, as ProgressAccumulator does, so the figures match
+    # the Progress Summary exactly
+    for slot, code, course_credits, grade in courses:
+        if not 0 <= grade < n_grades:
+            raise ValueError(f"{code or 'slot ' + str(slot)}: grade {grade!r} is not on the grading scale")
+        if scale.counts_credits[grade]:
+            credits += course_credits
+        if scale.counts_gpa[grade]:
+            gpa_credits += course_credits
+            qp += scale.quality_points(grade, course_credits)
+    return credits, gpa_credits, qp if gpa_credits else 0.0
+
+
+def audit_record(catalog, record, major_key=None):
+    """Progress Summary figures for a stored matrix record, against its own major or major_key
+
+    Raises ValueError for a record validate_record() rejects. Figures come
+    from the process's audit cache (advisee_audit_cache.py).
+    """
+    # advisee_audit_cache builds on this module
+    from advisee_audit_cache import get_audit_cache
+
+    validate_record(record, catalog.grading_scale)
+    major_key = major_key or record.get('current_major')
+    if not major_key:
+        raise ValueError("no major selected")
+    if major_key not in catalog.major_requirements:
+        raise ValueError(f"unknown major {major_key!r}")
+    student_id = record.get('student_id') or (record.get('student_info') or {}).get('student_id')
+    summary = get_audit_cache().audit(catalog, major_key, record.get('course_entries') or {}, student_id)
+    return dict(summary, student_id=student_id, catalog_version=catalog.version)
@@ -0,0 +1,316 @@
+# AdviseeMatrix audit service
+#
+# A JSON-over-HTTP front end to the degree audit, for the student
+# information system and other callers that should not go through the
+# Streamlit page. It reads the same catalog and matrix store as the app:
+#
+#   GET  /health
+#   GET  /students/{student_id}/audit[?major=KEY]          audit of a saved matrix
+#   GET  /students/{student_id}/declaration[?format=pdf]   declaration form, html or pdf
+#   POST /audit[?major=KEY]                                audit of the matrix record in the body
+#   POST /audit/batch      {"student_ids": [...], "records": [...], "major": KEY}
+#
+# Records have the stored matrix layout (current_major, student_info and
+# course_entries with letter grades). Audits report the Progress Summary's
+# figures (advisee_progress.audit_record). A record that is not in that
+# layout, or has grades off the scale or credits out of range, is answered
+# 422 (in a batch, listed under errors) with what is wrong with it.
+#
+# Audits and forms are computed in a pool of worker processes, each of which
+# loads the catalog and opens the matrix store once and keeps its own audit
+# cache (advisee_audit_cache.py); batches are split into chunks of
+# BATCH_CHUNK students. At most --concurrency jobs are handed to the pool
+# at a time and at most --max-pending requests wait for one; beyond that
+# the service answers 503 with Retry-After, so a burst cannot queue up
+# unbounded work. --workers 0 runs the jobs on a single thread
+# instead, e.g. for local testing.
+#
+# Usage:
+#   python advisee_service.py serve [--host 127.0.0.1] [--port 8502] [--workers N] [--concurrency 8]
+#   python advisee_service.py load http://127.0.0.1:8502 [--requests 2000] [--concurrency 32] [--batch-size 0]
+#
+# load is a load generator: it audits the saved matrices of the store through
+# a running service and prints throughput and latency percentiles as JSON.
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from aiohttp import ClientSession, TCPConnector, web
+
+from advisee_catalog import catalog_path, get_catalog
+from advisee_forms import RENDERERS, declaration_context
+from advisee_progress import audit_record
+from advisee_store import db_path, get_store
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8502
+BATCH_CHUNK = 64
+MAX_BATCH = 5000
+CONTENT_TYPES = {'html': 'text/html', 'pdf': 'application/pdf'}
+
+# Job outcomes and the HTTP status they are answered with
+STATUS_CODES = {'ok': 200, 'not_found': 404, 'invalid': 422}
+
+
+# Pool worker state, set up once per process by init_worker()
+_worker_paths = None
+
+
+def init_worker(catalog_file, db_file):
+    """Load the catalog in a pool worker and remember which store it serves"""
+    global _worker_paths
+    _worker_paths = (catalog_file, db_file)
+    get_catalog(catalog_file)
+
+
+def audit_chunk(items, major_key=None):
+    """Audit a chunk of student IDs and matrix records; returns one (outcome, result) pair each"""
+    catalog_file, db_file = _worker_paths
+    catalog = get_catalog(catalog_file)
+    results = []
+    for item in items:
+        record = item
+        if isinstance(item, str):
+            record = get_store(db_file).load(item)
+            if record is None:
+                results.append(('not_found', f"no saved matrix for student {item}"))
+                continue
+        try:
+            results.append(('ok', audit_record(catalog, record, major_key)))
+        except ValueError as e:
+            results.append(('invalid', str(e)))
+        except (KeyError, TypeError, AttributeError, IndexError, OverflowError) as e:
+            # validate_record() should have caught these
+            results.append(('invalid', f"malformed matrix record ({type(e).__name__}: {e})"))
+    return results
+
+
+def declaration_job(student_id, fmt):
+    """Render a saved matrix's declaration form; returns (outcome, bytes or error)"""
+    catalog_file, db_file = _worker_paths
+    record = get_store(db_file).load(student_id)
+    if record is None:
+        return 'not_found', f"no saved matrix for student {student_id}"
+    try:
+        context = declaration_context(get_catalog(catalog_file), dict(record['student_info'], student_id=student_id),
+                                      record['current_major'])
+    except ValueError as e:
+        return 'invalid', str(e)
+    return 'ok', RENDERERS[fmt](context)
+
+
+class AuditService:
+    """The service's worker pool, admission control and request handlers"""
+
+    def __init__(self, workers=None, concurrency=8, max_pending=256, catalog_file=None, db_file=None):
+        self.catalog_file = os.path.abspath(catalog_file or catalog_path())
+        self.db_file = os.path.abspath(db_file or db_path())
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        initargs = (self.catalog_file, self.db_file)
+        if self.workers:
+            self.pool = ProcessPoolExecutor(self.workers, initializer=init_worker, initargs=initargs)
+        else:
+            self.pool = ThreadPoolExecutor(1, initializer=init_worker, initargs=initargs)
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.slots = asyncio.Semaphore(concurrency)
+        self.pending = 0
+        self.served = 0
+        self.rejected = 0
+
+    async def run(self, job, *args):
+        """Run a job in the worker pool as soon as one of the concurrency slots is free"""
+        async with self.slots:
+            return await asyncio.get_running_loop().run_in_executor(self.pool, job, *args)
+
+    @web.middleware
+    async def admission(self, request, handler):
+        """Turn requests away once max_pending are already waiting or running"""
+        if request.path == '/health':
+            return await handler(request)
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise web.HTTPServiceUnavailable(text="audit service is at capacity", headers={'Retry-After': '1'})
+        self.pending += 1
+        try:
+            return await handler(request)
+        finally:
+            self.pending -= 1
+            self.served += 1
+
+    @staticmethod
+    async def json_body(request):
+        try:
+            body = await request.json()
+        except ValueError:
+            raise web.HTTPBadRequest(text="request body is not JSON")
+        if not isinstance(body, dict):
+            raise web.HTTPBadRequest(text="request body must be a JSON object")
+        return body
+
+    @staticmethod
+    def job_response(outcome, result):
+        if outcome == 'ok':
+            return web.json_response(result)
+        return web.json_response({'error': result}, status=STATUS_CODES[outcome])
+
+    async def health(self, request):
+        return web.json_response({
+            'status': 'ok',
+            'catalog_version': get_catalog(self.catalog_file).version,
+            'workers': self.workers,
+            'concurrency': self.concurrency,
+            'pending': self.pending,
+            'served': self.served,
+            'rejected': self.rejected
+        })
+
+    async def student_audit(self, request):
+        [(outcome, result)] = await self.run(audit_chunk, [request.match_info['student_id']], request.query.get('major'))
+        return self.job_response(outcome, result)
+
+    async def record_audit(self, request):
+        record = await self.json_body(request)
+        [(outcome, result)] = await self.run(audit_chunk, [record], request.query.get('major'))
+        return self.job_response(outcome, result)
+
+    async def batch_audit(self, request):
+        body = await self.json_body(request)
+        student_ids, records = body.get('student_ids') or [], body.get('records') or []
+        if not (isinstance(student_ids, list) and all(isinstance(student_id, str) for student_id in student_ids)):
+            raise web.HTTPBadRequest(text="student_ids must be a list of strings")
+        if not (isinstance(records, list) and all(isinstance(record, dict) for record in records)):
+            raise web.HTTPBadRequest(text="records must be a list of objects")
+        if not isinstance(body.get('major') or '', str):
+            raise web.HTTPBadRequest(text="major must be a string")
+        items = student_ids + records
+        if len(items) > MAX_BATCH:
+            raise web.HTTPRequestEntityTooLarge(MAX_BATCH, len(items), text=f"at most {MAX_BATCH} students per batch")
+
+        chunks = [items[start:start + BATCH_CHUNK] for start in range(0, len(items), BATCH_CHUNK)]
+        outcomes = await asyncio.gather(*(self.run(audit_chunk, chunk, body.get('major')) for chunk in chunks))
+        results, errors = [], []
+        for item, (outcome, result) in zip(items, itertools.chain.from_iterable(outcomes)):
+            if outcome == 'ok':
+                results.append(result)
+            else:
+                student_id = item if isinstance(item, str) else item.get('student_id')
+                errors.append({'student_id': student_id, 'status': STATUS_CODES[outcome], 'error': result})
+        return web.json_response({'results': results, 'errors': errors})
+
+    async def declaration(self, request):
+        fmt = request.query.get('format', 'html')
+        if fmt not in RENDERERS:
+            raise web.HTTPBadRequest(text=f"format must be one of {', '.join(RENDERERS)}")
+        outcome, result = await self.run(declaration_job, request.match_info['student_id'], fmt)
+        if outcome != 'ok':
+            return self.job_response(outcome, result)
+        return web.Response(body=result, content_type=CONTENT_TYPES[fmt], charset='utf-8' if fmt == 'html' else None)
+
+    async def close(self, app=None):
+        self.pool.shutdown(cancel_futures=True)
+
+    def make_app(self):
+        app = web.Application(middlewares=[self.admission])
+        app.add_routes([
+            web.get('/health', self.health),
+            web.get('/students/{student_id}/audit', self.student_audit),
+            web.get('/students/{student_id}/declaration', self.declaration),
+            web.post('/audit', self.record_audit),
+            web.post('/audit/batch', self.batch_audit)
+        ])
+        app.on_cleanup.append(self.close)
+        return app
+
+
+# -----------------------------------------------------------------------------
+# Load generator
+# -----------------------------------------------------------------------------
+
+async def generate_load(url, student_ids, requests=2000, concurrency=32, batch_size=0):
+    """Audit student_ids through a running service from concurrent clients; throughput and latency figures
+
+    Each request audits one student (GET /students/{id}/audit), or batch_size
+    students (POST /audit/batch) when batch_size is given.
+    """
+    url = url.rstrip('/')
+    counter = itertools.count()
+    latencies, failures = [], 0
+
+    async def client(session):
+        nonlocal failures
+        while (i := next(counter)) < requests:
+            started = time.perf_counter()
+            if batch_size:
+                batch = [student_ids[(i * batch_size + k) % len(student_ids)] for k in range(batch_size)]
+                response = session.post(f'{url}/audit/batch', json={'student_ids': batch})
+            else:
+                response = session.get(f'{url}/students/{student_ids[i % len(student_ids)]}/audit')
+            async with response as r:
+                await r.read()
+                if r.status != 200:
+                    failures += 1
+            latencies.append(time.perf_counter() - started)
+
+    async with ClientSession(connector=TCPConnector(limit=concurrency)) as session:
+        started = time.perf_counter()
+        await asyncio.gather(*(client(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    percentile = lambda q: round(latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000, 3)
+    return {
+        'requests': requests,
+        'failed': failures,
+        'concurrency': concurrency,
+        'batch_size': batch_size,
+        'elapsed_s': round(elapsed, 3),
+        'requests_per_s': round(requests / elapsed, 1),
+        'audits_per_s': round(requests * (batch_size or 1) / elapsed, 1),
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'max_ms': round(latencies[-1] * 1000, 3)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AdviseeMatrix degree audit service")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('serve', help="run the service")
+    command.add_argument('--host', default=DEFAULT_HOST)
+    command.add_argument('--port', type=int, default=DEFAULT_PORT)
+    command.add_argument('--workers', type=int, help="worker processes (default: one per CPU; 0 for a single thread)")
+    command.add_argument('--concurrency', type=int, default=8, help="jobs handed to the workers at a time")
+    command.add_argument('--max-pending', type=int, default=256, help="requests admitted before answering 503")
+
+    command = commands.add_parser('load', help="run a load test against a running service")
+    command.add_argument('url', help="service URL, e.g. http://127.0.0.1:8502")
+    command.add_argument('--requests', type=int, default=2000)
+    command.add_argument('--concurrency', type=int, default=32, help="concurrent clients")
+    command.add_argument('--batch-size', type=int, default=0, help="students per batch request (default: single audits)")
+    command.add_argument('--db', help="matrix database to take student IDs from (default: $ADVISEE_DB_PATH)")
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        service = AuditService(args.workers, args.concurrency, args.max_pending)
+        web.run_app(service.make_app(), host=args.host, port=args.port)
+        return 0
+
+    student_ids = [record['student_id'] for record in get_store(args.db).iter_records()]
+    if not student_ids:
+        parser.error("the matrix store has no saved matrices to audit")
+    results = asyncio.run(generate_load(args.url, student_ids, args.requests, args.concurrency, args.batch_size))
+    print(json.dumps(results, indent=2))
+    return 1 if results['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,360 @@
+# AdviseeMatrix compact session state
+#
+# A session's course entries used to be a dict of dicts, one small dict per
+# requirement row with its own key strings and boxed values. CourseEntries
+# keeps the same mapping interface (row_id -> entry) but stores every row in
+# fixed-width arrays indexed by the row's position in a RowLayout: the
+# course code as CODE_WIDTH bytes, credits, grade code and status code. The
+# layout (every row_id of every major in the catalog) is built once per
+# catalog version and shared by all sessions, so a session pays a few bytes
+# per row. Rows are read and written through EntryView objects, which look
+# like the old entry dicts.
+#
+# SessionRegistry spills sessions that have been idle for longer than
+# $ADVISEE_SESSION_TTL seconds (default 1800, 0 to keep every session in
+# memory) to a file in $ADVISEE_SPILL_DIR and drops the spilled keys from
+# their session state. Session state may only be changed by the session's
+# own script thread, so the sweeper thread only marks idle sessions due and
+# asks for a rerun of each; that rerun does the spill and shows a paused
+# page. A spilled session is restored from its file when it next reruns.
+
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from array import array
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+
+from advisee_core import STATUS_OPTIONS, parse_credits
+
+# Course codes are at most 9 characters (BIOL3105, ABCDE1234); longer typed
+# codes are kept aside in CourseEntries.long_codes
+CODE_WIDTH = 10
+ENTRY_FIELDS = ('code', 'credits', 'grade', 'status')
+STATUS_CODES = {status: code for code, status in enumerate(STATUS_OPTIONS)}
+
+SESSION_TTL_ENV = 'ADVISEE_SESSION_TTL'
+SPILL_DIR_ENV = 'ADVISEE_SPILL_DIR'
+DEFAULT_SESSION_TTL = 1800
+DEFAULT_SPILL_DIR = os.path.join(tempfile.gettempdir(), 'advisee_spill')
+# Seconds a spilled session's file is kept for it to come back
+SPILL_RETENTION = 7 * 24 * 3600
+
+
+class RowLayout:
+    """Positions of every requirement row_id of every major in a catalog"""
+
+    __slots__ = ('row_ids', 'index')
+
+    def __init__(self, major_requirements):
+        row_ids = {}
+        for major in major_requirements.values():
+            for section in major['requirements']:
+                for i in range(len(section['courses'])):
+                    row_ids.setdefault(f"{section['section']}_{i}", None)
+        self.row_ids = tuple(row_ids)
+        self.index = {row_id: position for position, row_id in enumerate(self.row_ids)}
+
+    def __len__(self):
+        return len(self.row_ids)
+
+
+class EntryView(MutableMapping):
+    """One row of a CourseEntries, read and written like an entry dict"""
+
+    __slots__ = ('entries', 'position')
+
+    def __init__(self, entries, position):
+        self.entries = entries
+        self.position = position
+
+    def __getitem__(self, field):
+        entries, i = self.entries, self.position
+        if field == 'code':
+            code = entries.long_codes.get(i)
+            if code is None:
+                code = bytes(entries.codes[i * CODE_WIDTH:(i + 1) * CODE_WIDTH]).rstrip(b'\0').decode('ascii')
+            return code
+        if field == 'credits':
+            return entries.credits[i]
+        if field == 'grade':
+            return entries.grades[i]
+        if field == 'status':
+            return STATUS_OPTIONS[entries.status[i]]
+        raise KeyError(field)
+
+    def __setitem__(self, field, value):
+        entries, i = self.entries, self.position
+        if field == 'code':
+            value = value or ''
+            encoded = value.encode('ascii', errors='replace')
+            if len(encoded) <= CODE_WIDTH and value.isascii():
+                entries.codes[i * CODE_WIDTH:(i + 1) * CODE_WIDTH] = encoded.ljust(CODE_WIDTH, b'\0')
+                entries.long_codes.pop(i, None)
+            else:
+                entries.long_codes[i] = value
+        elif field == 'credits':
+            # Also keeps the value within the unsigned 16-bit array
+            entries.credits[i] = parse_credits(value or 0)
+        elif field == 'grade':
+            entries.grades[i] = value
+        elif field == 'status':
+            entries.status[i] = STATUS_CODES[value]
+        else:
+            raise KeyError(field)
+
+    def __delitem__(self, field):
+        raise TypeError("course entry fields cannot be removed")
+
+    def __iter__(self):
+        return iter(ENTRY_FIELDS)
+
+    def __len__(self):
+        return len(ENTRY_FIELDS)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class CourseEntries(MutableMapping):
+    """A session's course entries (row_id -> entry) in fixed-width arrays"""
+
+    __slots__ = ('layout', 'present', 'codes', 'credits', 'grades', 'status', 'long_codes', 'other_rows')
+
+    def __init__(self, layout, entries=None):
+        n = len(layout)
+        self.layout = layout
+        self.present = bytearray(n)
+        self.codes = bytearray(n * CODE_WIDTH)
+        self.credits = array('H', bytes(2 * n))
+        self.grades = bytearray(n)
+        self.status = bytearray(n)
+        self.long_codes = {}
+        # Rows the layout does not know, e.g. from a matrix saved against an
+        # older catalog, are kept as plain dicts
+        self.other_rows = {}
+        if entries:
+            self.update(entries)
+
+    def __getitem__(self, row_id):
+        position = self.layout.index.get(row_id)
+        if position is not None and self.present[position]:
+            return EntryView(self, position)
+        return self.other_rows[row_id]
+
+    def __setitem__(self, row_id, entry):
+        position = self.layout.index.get(row_id)
+        if position is None:
+            self.other_rows[row_id] = dict(entry)
+            return
+        view = EntryView(self, position)
+        for field in ENTRY_FIELDS:
+            view[field] = entry[field]
+        self.present[position] = 1
+
+    def __delitem__(self, row_id):
+        position = self.layout.index.get(row_id)
+        if position is not None and self.present[position]:
+            self.present[position] = 0
+            self.long_codes.pop(position, None)
+        else:
+            del self.other_rows[row_id]
+
+    def __contains__(self, row_id):
+        position = self.layout.index.get(row_id)
+        return (position is not None and self.present[position] == 1) or row_id in self.other_rows
+
+    def __iter__(self):
+        row_ids = self.layout.row_ids
+        for position, present in enumerate(self.present):
+            if present:
+                yield row_ids[position]
+        yield from self.other_rows
+
+    def __len__(self):
+        return self.present.count(1) + len(self.other_rows)
+
+    def __repr__(self):
+        return f"CourseEntries({dict((row_id, dict(entry)) for row_id, entry in self.items())!r})"
+
+
+def compact_entries(course_entries, layout):
+    """course_entries as a CourseEntries over layout, converting only if needed"""
+    if isinstance(course_entries, CourseEntries) and course_entries.layout is layout:
+        return course_entries
+    return CourseEntries(layout, course_entries)
+
+
+class SessionSlot:
+    """What the registry knows about one session"""
+
+    __slots__ = ('last_seen', 'running', 'due', 'spill_path')
+
+    def __init__(self):
+        self.last_seen = time.monotonic()
+        self.running = 0
+        # Idle past the TTL; spilled by its next full script run
+        self.due = False
+        self.spill_path = None
+
+
+class SessionRun:
+    """What active() hands a script run: the matrix to restore, or that the run spilled the session"""
+
+    __slots__ = ('restored', 'spilled')
+
+    def __init__(self, restored=None, spilled=False):
+        self.restored = restored
+        self.spilled = spilled
+
+
+class SessionRegistry:
+    """Tracks session activity and spills idle sessions to disk
+
+    spill(state) is called, in the session's script thread, with an idle
+    session's state and returns the record to save and the state keys to
+    drop, or None to leave the session alone. The record is handed back by
+    active() when the session reruns. rerun(session_id) is called from the
+    sweeper thread to have an idle session rerun, and returns False if the
+    session has gone. Spill files of sessions that never come back are
+    deleted after retention seconds.
+    """
+
+    def __init__(self, spill, ttl=DEFAULT_SESSION_TTL, spill_dir=DEFAULT_SPILL_DIR, retention=SPILL_RETENTION,
+                 rerun=None):
+        self.spill = spill
+        self.rerun = rerun
+        self.ttl = ttl
+        self.spill_dir = spill_dir
+        self.retention = retention
+        self.sessions = {}
+        self.spilled = 0
+        self.restored = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sweeper = None
+        if ttl:
+            self._sweeper = threading.Thread(target=self._sweep_loop, name='advisee-session-sweeper', daemon=True)
+            self._sweeper.start()
+
+    @contextmanager
+    def active(self, ctx):
+        """Mark the session of a script run context as running; yields a SessionRun
+
+        A full run of a session that is due spills it; the run should then
+        only show that the session is paused.
+        """
+        if ctx is None:
+            yield SessionRun()
+            return
+        # The SafeSessionState in the context wraps the session's state for
+        # one script run only; the state itself lives as long as the session
+        session_id, state = ctx.session_id, getattr(ctx.session_state, '_state', ctx.session_state)
+        with self._lock:
+            slot = self.sessions.get(session_id)
+            if slot is None:
+                slot = self.sessions[session_id] = SessionSlot()
+            slot.running += 1
+            spill_path, slot.spill_path = slot.spill_path, None
+            due, slot.due = slot.due, False
+        try:
+            run = SessionRun()
+            if spill_path:
+                with open(spill_path, encoding='utf-8') as f:
+                    run.restored = json.load(f)
+                os.remove(spill_path)
+                self.restored += 1
+            elif due and not getattr(ctx, 'fragment_ids_this_run', None) and slot.running == 1:
+                run.spilled = self.spill_state(slot, state)
+            yield run
+        finally:
+            with self._lock:
+                slot.running -= 1
+                slot.last_seen = time.monotonic()
+
+    def spill_state(self, slot, state):
+        """Write a session's state to a spill file and drop the spilled keys; False if there was nothing to spill"""
+        spilled_state = self.spill(state)
+        if spilled_state is None:
+            return False
+        record, keys = spilled_state
+        os.makedirs(self.spill_dir, exist_ok=True)
+        path = os.path.join(self.spill_dir, f'{uuid.uuid4().hex}.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(record, f)
+        for key in keys:
+            del state[key]
+        with self._lock:
+            slot.spill_path = path
+            self.spilled += 1
+        return True
+
+    def sweep(self, now=None):
+        """Mark every session idle for longer than the TTL due and ask for its rerun; returns how many were marked"""
+        now = time.monotonic() if now is None else now
+        due = []
+        with self._lock:
+            for session_id, slot in list(self.sessions.items()):
+                if slot.running:
+                    continue
+                idle = now - slot.last_seen
+                if slot.spill_path or slot.due:
+                    # Spilled, or asked to rerun and never did
+                    if idle >= self.retention:
+                        self.discard(slot)
+                        del self.sessions[session_id]
+                    continue
+                if idle >= self.ttl:
+                    slot.due = True
+                    due.append(session_id)
+        if self.rerun is not None:
+            for session_id in due:
+                if not self.rerun(session_id):
+                    with self._lock:
+                        self.sessions.pop(session_id, None)
+        return len(due)
+
+    @staticmethod
+    def discard(slot):
+        if slot.spill_path:
+            try:
+                os.remove(slot.spill_path)
+            except FileNotFoundError:
+                pass
+
+    def _sweep_loop(self):
+        while not self._stop.wait(max(1.0, self.ttl / 4)):
+            self.sweep()
+
+    def close(self):
+        """Stop sweeping and delete the spill files"""
+        self._stop.set()
+        with self._lock:
+            for slot in self.sessions.values():
+                self.discard(slot)
+            self.sessions.clear()
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def session_ttl():
+    """Idle seconds after which sessions are spilled, 0 for never"""
+    return float(os.environ.get(SESSION_TTL_ENV, DEFAULT_SESSION_TTL))
+
+
+def get_sessions(spill, rerun=None):
+    """Return the process-wide session registry"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = SessionRegistry(spill, session_ttl(), os.environ.get(SPILL_DIR_ENV) or DEFAULT_SPILL_DIR,
+                                            rerun=rerun)
+                atexit.register(_registry.close)
+    return _registry
@@ -0,0 +1,271 @@
+# AdviseeMatrix binary catalog snapshot
+#
+# Loading catalog.json parses and freezes every course and sorts the course
+# index, which a new replica pays before its first page. A snapshot is the
+# same catalog compiled once into a flat binary file that is memory-mapped
+# instead of parsed:
+#
+#   MAGIC | header length (u32) | header (JSON) | sections
+#
+# The header carries the catalog version (the hash of the source JSON, so a
+# snapshot and its source are the same catalog version), the major
+# requirements, the grading scale and the offset of each section:
+#
+# - codes: every course code, sorted, NUL padded to the longest code;
+# - record_offsets / records: each course's data as compact JSON, decoded
+#   on lookup;
+# - index_positions / number_positions: the course index's code order and
+#   number order, as positions into codes.
+#
+# Nothing is copied out of the file at load time; the pages are read on
+# demand and, being a read-only file mapping, shared through the page cache
+# by every worker process that maps the same snapshot. Slicing the code
+# sequences (as CourseIndex.resolve does) returns views, so only the codes a
+# caller actually reads are decoded.
+#
+# Usage:
+#   python advisee_snapshot.py [catalog.json] [-o catalog.snapshot]
+#
+# Point $ADVISEE_CATALOG_PATH at the snapshot to use it; load_catalog()
+# recognizes snapshots by their magic bytes. Rebuild the snapshot whenever
+# the JSON catalog changes: the new file replaces the old one atomically, so
+# running workers reload it like an edited catalog.json.
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping, Sequence
+
+from advisee_catalog import DEFAULT_CATALOG_PATH, Catalog, freeze
+from advisee_core import is_placeholder_code, split_course_code
+from advisee_course_index import CourseIndex
+from advisee_grading import GradingScale
+
+MAGIC = b'ADVSNAP1'
+HEADER_LENGTH = struct.Struct('<I')
+SECTIONS = ('codes', 'record_offsets', 'records', 'index_positions', 'number_positions')
+# Sections start on 8-byte boundaries
+ALIGNMENT = 8
+
+
+class FixedWidthCodes(Sequence):
+    """Course codes stored back to back in a fixed width, NUL padded"""
+
+    __slots__ = ('buffer', 'width')
+
+    def __init__(self, buffer, width):
+        self.buffer = buffer
+        self.width = width
+
+    def __len__(self):
+        return len(self.buffer) // self.width
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            if step != 1:
+                return tuple(self[j] for j in range(start, stop, step))
+            return FixedWidthCodes(self.buffer[start * self.width:max(start, stop) * self.width], self.width)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return bytes(self.buffer[i * self.width:(i + 1) * self.width]).rstrip(b'\0').decode('utf-8')
+
+    def __iter__(self):
+        width = self.width
+        data = bytes(self.buffer)
+        for start in range(0, len(data), width):
+            yield data[start:start + width].rstrip(b'\0').decode('utf-8')
+
+
+class SelectedCodes(Sequence):
+    """The codes at a list of positions, in that order"""
+
+    __slots__ = ('codes', 'positions')
+
+    def __init__(self, codes, positions):
+        self.codes = codes
+        self.positions = positions
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return SelectedCodes(self.codes, self.positions[i])
+        return self.codes[self.positions[i]]
+
+    def __iter__(self):
+        codes = self.codes
+        for position in self.positions:
+            yield codes[position]
+
+
+class NumberKeys(Sequence):
+    """CourseIndex number-order keys ("3105 BIOL") of a sequence of codes"""
+
+    __slots__ = ('codes',)
+
+    def __init__(self, codes):
+        self.codes = codes
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return NumberKeys(self.codes[i])
+        return self.key(self.codes[i])
+
+    @staticmethod
+    def key(code):
+        subject, number = split_course_code(code)
+        return number + ' ' + subject
+
+
+class SnapshotCourseData(Mapping):
+    """course_data read from a snapshot: code -> read-only course record"""
+
+    __slots__ = ('codes', 'offsets', 'records')
+
+    def __init__(self, codes, offsets, records):
+        self.codes = codes
+        self.offsets = offsets
+        self.records = records
+
+    def position(self, code):
+        if not isinstance(code, str):
+            return None
+        i = bisect_left(self.codes, code)
+        return i if i < len(self.codes) and self.codes[i] == code else None
+
+    def __getitem__(self, code):
+        i = self.position(code)
+        if i is None:
+            raise KeyError(code)
+        return freeze(json.loads(bytes(self.records[self.offsets[i]:self.offsets[i + 1]])))
+
+    def __contains__(self, code):
+        return self.position(code) is not None
+
+    def __iter__(self):
+        return iter(self.codes)
+
+    def __len__(self):
+        return len(self.codes)
+
+
+def build_snapshot(source, target):
+    """Compile a JSON catalog file into a snapshot file; returns its header"""
+    with open(source, 'rb') as f:
+        raw = f.read()
+    data = json.loads(raw)
+    course_data = data['course_data']
+
+    codes = sorted(course_data)
+    width = max((len(code.encode('utf-8')) for code in codes), default=1)
+    records = [json.dumps(course_data[code], separators=(',', ':')).encode('utf-8') for code in codes]
+    record_offsets = array('I', [0])
+    for record in records:
+        record_offsets.append(record_offsets[-1] + len(record))
+    index_positions = array('I', (i for i, code in enumerate(codes) if not is_placeholder_code(code)))
+    number_positions = array('I', sorted(index_positions, key=lambda i: NumberKeys.key(codes[i])))
+    sections = {
+        'codes': b''.join(code.encode('utf-8').ljust(width, b'\0') for code in codes),
+        'record_offsets': record_offsets.tobytes(),
+        'records': b''.join(records),
+        'index_positions': index_positions.tobytes(),
+        'number_positions': number_positions.tobytes()
+    }
+
+    header = {
+        'version': hashlib.sha1(raw).hexdigest()[:12],
+        'source': os.path.basename(source),
+        'byteorder': sys.byteorder,
+        'code_width': width,
+        'major_requirements': data['major_requirements'],
+        'grading_scale': data.get('grading_scale'),
+        'sections': {}
+    }
+    # The header holds the section offsets, which depend on the header's own
+    # length; section offsets are relative to the end of the header
+    offset = 0
+    for name in SECTIONS:
+        header['sections'][name] = [offset, len(sections[name])]
+        offset += -(-len(sections[name]) // ALIGNMENT) * ALIGNMENT
+    encoded = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    encoded += b' ' * (-(len(MAGIC) + HEADER_LENGTH.size + len(encoded)) % ALIGNMENT)
+
+    # Written beside the target and renamed over it, never rewritten in place:
+    # workers may have the old snapshot mapped
+    directory = os.path.dirname(os.path.abspath(target))
+    fd, tmp_path = tempfile.mkstemp(prefix='.snapshot-', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC + HEADER_LENGTH.pack(len(encoded)) + encoded)
+            for name in SECTIONS:
+                f.write(sections[name])
+                f.write(b'\0' * (-len(sections[name]) % ALIGNMENT))
+        os.replace(tmp_path, target)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return header
+
+
+def load_snapshot(path):
+    """Map a snapshot file and return its Catalog"""
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    buffer = memoryview(mapped)
+    if bytes(buffer[:len(MAGIC)]) != MAGIC:
+        raise ValueError(f"{path} is not a catalog snapshot")
+    (header_length,) = HEADER_LENGTH.unpack_from(buffer, len(MAGIC))
+    start = len(MAGIC) + HEADER_LENGTH.size
+    header = json.loads(bytes(buffer[start:start + header_length]))
+    if header['byteorder'] != sys.byteorder:
+        raise ValueError(f"{path} was built on a {header['byteorder']}-endian machine; rebuild it here")
+
+    base = start + header_length
+    section = {name: buffer[base + offset:base + offset + length]
+               for name, (offset, length) in header['sections'].items()}
+    codes = FixedWidthCodes(section['codes'], header['code_width'])
+    index_codes = SelectedCodes(codes, section['index_positions'].cast('I'))
+    number_codes = SelectedCodes(codes, section['number_positions'].cast('I'))
+    course_index = CourseIndex.from_sorted(index_codes, NumberKeys(number_codes), number_codes)
+    return Catalog(
+        SnapshotCourseData(codes, section['record_offsets'].cast('I'), section['records']),
+        header['major_requirements'],
+        version=header['version'],
+        path=path,
+        grading_scale=GradingScale(header['grading_scale']) if header.get('grading_scale') else None,
+        course_index=course_index
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile a JSON course catalog into a memory-mappable snapshot")
+    parser.add_argument('catalog', nargs='?', default=DEFAULT_CATALOG_PATH, help="JSON catalog file")
+    parser.add_argument('-o', '--output', help="snapshot file (default: the catalog path with a .snapshot suffix)")
+    args = parser.parse_args(argv)
+
+    target = args.output or os.path.splitext(args.catalog)[0] + '.snapshot'
+    started = time.perf_counter()
+    header = build_snapshot(args.catalog, target)
+    elapsed = time.perf_counter() - started
+    print(f"Wrote {target} (catalog version {header['version']}, {os.path.getsize(target)} bytes) "
+          f"in {elapsed:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
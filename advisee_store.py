@@ -0,0 +1,257 @@
+# AdviseeMatrix durable matrix storage
+#
+# Saves each student's matrix (student_info, current major and course
+# entries) to a local SQLite database keyed by student_id, so an advisor's
+# work survives browser refreshes and server restarts. The database file is
+# $ADVISEE_DB_PATH, or advisee_matrix.db next to this module.
+#
+# Saves are write-behind: save() only records the latest matrix for a
+# student in memory, and a background thread writes everything pending in a
+# single transaction every flush_interval seconds. Rapid widget edits are
+# therefore coalesced into one row write and one fsync per batch. Reads go
+# through a small pool of shared connections and see pending saves first.
+# A batch that fails to write, e.g. while another process holds the
+# database locked, goes back to pending and is retried with the next one.
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+DB_PATH_ENV = 'ADVISEE_DB_PATH'
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'advisee_matrix.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matrices (
+    student_id TEXT PRIMARY KEY,
+    major TEXT,
+    student_info TEXT NOT NULL,
+    course_entries TEXT NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+# Lets readers such as the cohort analytics find recently saved matrices
+# without scanning the table
+INDEX = "CREATE INDEX IF NOT EXISTS matrices_updated_at ON matrices (updated_at)"
+
+UPSERT = """
+INSERT INTO matrices (student_id, major, student_info, course_entries, updated_at)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(student_id) DO UPDATE SET
+    major = excluded.major,
+    student_info = excluded.student_info,
+    course_entries = excluded.course_entries,
+    updated_at = excluded.updated_at
+"""
+
+logger = logging.getLogger('advisee.store')
+
+
+class ConnectionPool:
+    """Fixed-size pool of SQLite connections shared between threads"""
+
+    def __init__(self, path, size=4):
+        self.path = path
+        self._connections = queue.LifoQueue()
+        for _ in range(size):
+            self._connections.put(self._connect())
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a with block"""
+        connection = self._connections.get()
+        try:
+            yield connection
+        finally:
+            self._connections.put(connection)
+
+    def close(self):
+        """Close every pooled connection"""
+        while not self._connections.empty():
+            self._connections.get_nowait().close()
+
+
+class MatrixStore:
+    """SQLite-backed store of advisee matrices with write-behind batching"""
+
+    def __init__(self, path, pool_size=4, flush_interval=0.5):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.pool = ConnectionPool(path, pool_size)
+        with self.pool.connection() as connection:
+            connection.execute(SCHEMA)
+            connection.execute(INDEX)
+
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self.batches_written = 0
+        self.rows_written = 0
+
+        self._flusher = None
+        if flush_interval:
+            self._flusher = threading.Thread(target=self._flush_loop, name='advisee-store-flush', daemon=True)
+            self._flusher.start()
+
+    def save(self, student_id, record):
+        """Queue a student's matrix to be written with the next batch"""
+        row = (
+            student_id,
+            record.get('current_major'),
+            json.dumps(record.get('student_info', {})),
+            json.dumps(record.get('course_entries', {})),
+            time.time()
+        )
+        if self._flusher is None:
+            self._write([row])
+            return
+        with self._lock:
+            self._pending[student_id] = row
+        self._wakeup.set()
+
+    def load(self, student_id):
+        """Return a student's saved matrix, or None"""
+        with self._lock:
+            row = self._pending.get(student_id)
+        if row is None:
+            with self.pool.connection() as connection:
+                row = connection.execute(
+                    'SELECT student_id, major, student_info, course_entries, updated_at'
+                    ' FROM matrices WHERE student_id = ?',
+                    (student_id,)
+                ).fetchone()
+        if row is None:
+            return None
+        return decode_row(row)
+
+    def iter_records(self, batch_size=500, since=None):
+        """Yield every saved matrix, or those saved after the time since, streaming from the database in batches"""
+        self.flush()
+        with self.pool.connection() as connection:
+            if since is None:
+                cursor = connection.execute(
+                    'SELECT student_id, major, student_info, course_entries, updated_at'
+                    ' FROM matrices ORDER BY student_id'
+                )
+            else:
+                cursor = connection.execute(
+                    'SELECT student_id, major, student_info, course_entries, updated_at'
+                    ' FROM matrices WHERE updated_at > ? ORDER BY student_id',
+                    (since,)
+                )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield decode_row(row)
+
+    def flush(self):
+        """Write all pending saves now
+
+        If the write fails, the saves are pending again, behind any newer
+        save for the same students, and the error is raised.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            self._write(list(pending.values()))
+        except Exception:
+            with self._lock:
+                for student_id, row in pending.items():
+                    self._pending.setdefault(student_id, row)
+            self._wakeup.set()
+            raise
+
+    def _write(self, rows):
+        with self.pool.connection() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                connection.executemany(UPSERT, rows)
+            except Exception:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+        self.batches_written += 1
+        self.rows_written += len(rows)
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wakeup.wait()
+            # Debounce: let further edits arrive and coalesce into this batch
+            time.sleep(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                # The batch is pending again and retried after the next interval
+                logger.exception("Writing %s pending matrices to %s failed", len(self._pending), self.path)
+
+    def close(self):
+        """Flush pending saves and release the connections"""
+        self._closed = True
+        self._wakeup.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=5)
+        self.flush()
+        self.pool.close()
+
+
+def encode_entries(course_entries, scale):
+    """Course entries with grade letters instead of codes, for storage"""
+    # Letters keep saved matrices valid if the grading scale is reordered
+    return {row_id: dict(entry, grade=scale.decode(entry['grade'])) for row_id, entry in course_entries.items()}
+
+
+def decode_entries(course_entries, scale):
+    """Stored course entries with grade letters turned back into codes"""
+    return {row_id: dict(entry, grade=scale.encode(entry['grade'])) for row_id, entry in course_entries.items()}
+
+
+def decode_row(row):
+    """Turn a matrices row into a matrix record"""
+    student_id, major, student_info, course_entries, updated_at = row
+    return {
+        'student_id': student_id,
+        'current_major': major,
+        'student_info': json.loads(student_info),
+        'course_entries': json.loads(course_entries),
+        'updated_at': updated_at
+    }
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def db_path():
+    """Path of the matrix database this process uses"""
+    return os.environ.get(DB_PATH_ENV) or DEFAULT_DB_PATH
+
+
+def get_store(path=None):
+    """Return the process-wide matrix store"""
+    path = os.path.abspath(path or db_path())
+    store = _stores.get(path)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(path)
+            if store is None:
+                store = _stores[path] = MatrixStore(path)
+                atexit.register(store.close)
+    return store
@@ -0,0 +1,234 @@
+# AdviseeMatrix what-if audit against every major
+#
+# Answers "how far along would this student be in each major?" for all
+# majors at once. Built once per catalog version from the course index:
+#
+# - every requirement slot of every major, concatenated into flat arrays
+#   (major, section, credits, required), each major's slots ordered most
+#   specific first (fixed codes, then subject wildcards, then ELEC);
+# - slot classes (the distinct slot codes of a major) and, per catalog
+#   course, the classes it fits (a sparse course x class eligibility table),
+#   from which the major x course eligibility matrix follows.
+#
+# Evaluating a transcript gathers the eligibility of the student's courses
+# for every slot of every major in one array operation, then places the
+# courses greedily on all majors simultaneously: one vectorized step per
+# course takes, in every major at once, the most specific free slot it fits.
+#
+# The greedy result is a maximum matching whenever a major's slot patterns
+# are nested or disjoint (BIOL3105 inside BIOL3XXX inside ELEC3XXX) and its
+# slots all carry the same credits, which is how requirements are normally
+# written; then taking the most specific free slot never blocks a later
+# course. When additionally every required slot some course fits is
+# filled, no matching can do better. Only majors failing those checks are
+# re-matched with the Hopcroft-Karp engine (advisee_matching.py). Either way
+# the matching is maximum; when the courses themselves carry different
+# credits, another maximum matching may satisfy a few more section credits.
+#
+# Credits satisfied count each section up to its required credits; courses
+# count when they have earned credits in the Progress Summary's sense.
+
+import threading
+
+import numpy as np
+
+from advisee_core import is_placeholder_code, placeholder_pattern
+from advisee_matching import FREE, match_courses
+from advisee_progress import entry_contribution
+
+
+def patterns_nest(a, b):
+    """Whether the courses two slot codes accept are nested or disjoint"""
+    if not (is_placeholder_code(a) and is_placeholder_code(b)):
+        return True
+    (subject_a, number_a), (subject_b, number_b) = placeholder_pattern(a), placeholder_pattern(b)
+    if subject_a and subject_b and subject_a != subject_b:
+        return True
+    if not (number_a.startswith(number_b) or number_b.startswith(number_a)):
+        return True
+    # They overlap; one must then contain the other
+    outer_a = len(number_a) <= len(number_b) and subject_a in ('', subject_b)
+    outer_b = len(number_b) <= len(number_a) and subject_b in ('', subject_a)
+    return outer_a or outer_b
+
+
+def greedy_is_exact(plan):
+    """Whether most-specific-slot-first placement is optimal for a plan"""
+    if len(set(plan.default_credits)) > 1:
+        return False
+    codes = sorted(set(plan.codes))
+    return all(patterns_nest(a, b) for i, a in enumerate(codes) for b in codes[i + 1:])
+
+
+def slot_specificity(code):
+    """Sort key putting the slots that accept the fewest courses first"""
+    if not is_placeholder_code(code):
+        return (0, 0)
+    subject, number = placeholder_pattern(code)
+    return (1 if subject else 2, -len(number))
+
+
+class EligibilityMatrix:
+    """Which catalog courses can count towards which requirement slots of every major"""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.majors = tuple(catalog.major_requirements)
+        self.plans = tuple(catalog.plan(major_key) for major_key in self.majors)
+        index = catalog.course_index()
+        self.columns = {code: c for c, code in enumerate(index.codes)}
+
+        slot_major, slot_ref, slot_class, section_required = [], [], [], []
+        self.major_starts = []
+        self.section_starts = []
+        classes = {}
+        class_major = []
+        for m, plan in enumerate(self.plans):
+            self.major_starts.append(len(slot_ref))
+            self.section_starts.append(len(section_required))
+            section_required.extend(section.required_credits for section in plan.sections)
+            order = sorted(range(len(plan)), key=lambda slot: (slot_specificity(plan.codes[slot]),
+                                                               not plan.required[slot], slot))
+            for slot in order:
+                key = (m, plan.codes[slot])
+                if key not in classes:
+                    classes[key] = len(class_major)
+                    class_major.append(m)
+                slot_major.append(m)
+                slot_ref.append(slot)
+                slot_class.append(classes[key])
+
+        self.slot_major = np.array(slot_major, dtype=np.int32)
+        self.slot_ref = np.array(slot_ref, dtype=np.int32)
+        self.slot_class = np.array(slot_class, dtype=np.int32)
+        self.slot_credits = np.array([self.plans[m].default_credits[s] for m, s in zip(slot_major, slot_ref)], dtype=np.int64)
+        self.slot_required = np.array([self.plans[m].required[s] for m, s in zip(slot_major, slot_ref)], dtype=bool)
+        self.slot_section = np.array([self.section_starts[m] + self.plans[m].section_index[s]
+                                      for m, s in zip(slot_major, slot_ref)], dtype=np.int32)
+        self.section_required = np.array(section_required, dtype=np.int64)
+        self.max_slot_credits = int(self.slot_credits.max()) if len(slot_ref) else 0
+        self.n_classes = len(class_major)
+
+        # Course -> fitting classes, as a CSR table indexed by catalog column
+        pairs = sorted((self.columns[code], cl) for (m, slot_code), cl in classes.items()
+                       for code in index.resolve(slot_code))
+        course_columns = np.array([c for c, _ in pairs], dtype=np.int64)
+        self.class_indices = np.array([cl for _, cl in pairs], dtype=np.int32)
+        self.class_indptr = np.searchsorted(course_columns, np.arange(len(index.codes) + 1))
+
+        self.eligible = np.zeros((len(self.majors), len(index.codes)), dtype=bool)
+        self.eligible[np.array(class_major, dtype=np.int32)[self.class_indices], course_columns] = True
+        self.total_credits = np.array([plan.total_credits for plan in self.plans], dtype=np.int64)
+        self.greedy_exact = np.array([greedy_is_exact(plan) for plan in self.plans], dtype=bool)
+        self.required_slots = np.bincount(self.slot_major[self.slot_required], minlength=len(self.majors))
+
+    def course_classes(self, codes):
+        """Courses x slot classes eligibility for a list of course codes"""
+        fits = np.zeros((len(codes), self.n_classes), dtype=bool)
+        for i, code in enumerate(codes):
+            c = self.columns.get(code)
+            if c is not None:
+                fits[i, self.class_indices[self.class_indptr[c]:self.class_indptr[c + 1]]] = True
+                continue
+            # Typed-in courses the catalog does not list can still fit a wildcard
+            for m, plan in enumerate(self.plans):
+                start = self.major_starts[m]
+                positions = np.flatnonzero(np.isin(self.slot_ref[start:start + len(plan)],
+                                                   plan.slot_index.candidate_slots(code)))
+                fits[i, self.slot_class[start + positions]] = True
+        return fits
+
+    def evaluate(self, courses):
+        """Ranked what-if rows for a list of earned courses, closest to graduating first"""
+        n_majors = len(self.majors)
+        credits = np.array([course['credits'] for course in courses], dtype=np.int64)
+        # Courses x slots of every major
+        class_fits = self.course_classes([course['code'] for course in courses])
+        fits = class_fits[:, self.slot_class]
+        if len(courses) and credits.min() < self.max_slot_credits:
+            fits &= credits[:, None] >= self.slot_credits[None, :]
+            fitted_slots = fits.any(axis=0)
+        else:
+            fitted_slots = class_fits.any(axis=0)[self.slot_class]
+
+        # Greedy placement in every major at once
+        assigned = np.full(len(self.slot_ref), FREE, dtype=np.int64)
+        free = np.ones(len(self.slot_ref), dtype=bool)
+        for i in range(len(courses)):
+            open_slots = np.flatnonzero(fits[i] & free)
+            if len(open_slots):
+                # Slots are grouped by major, so the first open slot of each major
+                # is where the major number changes
+                majors = self.slot_major[open_slots]
+                first = np.ones(len(open_slots), dtype=bool)
+                first[1:] = majors[1:] != majors[:-1]
+                first = open_slots[first]
+                assigned[first] = i
+                free[first] = False
+
+        placed = ~free
+        eligible = np.logical_or.reduceat(fits, self.major_starts, axis=1)
+        used = np.bincount(self.slot_major[placed], minlength=n_majors)
+        missed_required = np.bincount(self.slot_major[self.slot_required & free & fitted_slots],
+                                      minlength=n_majors)
+        section_credits = np.bincount(self.slot_section[placed], weights=credits[assigned[placed]],
+                                      minlength=len(self.section_required)).astype(np.int64)
+        satisfied = np.add.reduceat(np.minimum(section_credits, self.section_required), self.section_starts)
+        filled = np.bincount(self.slot_major[placed & self.slot_required], minlength=n_majors)
+
+        unplaced = used < eligible.sum(axis=0)
+        for m in np.flatnonzero((unplaced & ~self.greedy_exact) | (missed_required > 0)):
+            satisfied[m], filled[m], used[m] = self.exact(self.plans[m], [courses[i] for i in np.flatnonzero(eligible[:, m])])
+
+        rows = []
+        for m, plan in enumerate(self.plans):
+            rows.append({
+                'major': plan.major_key,
+                'name': plan.name,
+                'credits_satisfied': int(satisfied[m]),
+                'total_credits': plan.total_credits,
+                'remaining_credits': plan.total_credits - int(satisfied[m]),
+                'progress': round(int(satisfied[m]) / plan.total_credits * 100, 1) if plan.total_credits else 0.0,
+                'required_filled': int(filled[m]),
+                'required_slots': int(self.required_slots[m]),
+                'courses_used': int(used[m])
+            })
+        rows.sort(key=lambda row: (row['remaining_credits'], -row['required_filled'], row['major']))
+        return rows
+
+    @staticmethod
+    def exact(plan, courses):
+        """Credits satisfied, required slots filled and courses used by an optimal matching"""
+        match = match_courses(plan, courses)
+        section_credits = [0] * len(plan.sections)
+        for slot, course in enumerate(match.slot_course):
+            if course != FREE:
+                section_credits[plan.section_index[slot]] += courses[course]['credits']
+        satisfied = sum(min(credits, section.required_credits) for credits, section in zip(section_credits, plan.sections))
+        return satisfied, match.required_filled(), match.matched
+
+
+def earned_courses(course_entries, scale):
+    """Distinct courses with earned credits in a session's course entries"""
+    courses = {}
+    for entry in course_entries.values():
+        code = (entry.get('code') or '').strip().upper()
+        if code and code not in courses and entry_contribution(entry, scale)[0] > 0:
+            courses[code] = {'code': code, 'credits': entry['credits'], 'grade': entry['grade'], 'status': entry['status']}
+    return list(courses.values())
+
+
+_matrices = {}
+_matrices_lock = threading.Lock()
+
+
+def get_eligibility_matrix(catalog):
+    """The eligibility matrix for a catalog, built once per catalog version"""
+    matrix = _matrices.get(catalog.version)
+    if matrix is None or matrix.catalog is not catalog:
+        with _matrices_lock:
+            matrix = _matrices.get(catalog.version)
+            if matrix is None or matrix.catalog is not catalog:
+                _matrices.clear()
+                matrix = _matrices[catalog.version] = EligibilityMatrix(catalog)
+    return matrix
@@ -0,0 +1,70 @@
+# Shared fixtures of the AdviseeMatrix tests
+#
+# Every test runs against temporary matrix, analytics and spill locations,
+# never the advisee_matrix.db of a working checkout.
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from advisee_catalog import DEFAULT_CATALOG_PATH, Catalog, load_catalog  # noqa: E402
+from advisee_grading import GradingScale  # noqa: E402
+from advisee_store import MatrixStore  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def isolated_paths(tmp_path, monkeypatch):
+    """Point the process-wide stores at a test's temporary directory"""
+    monkeypatch.setenv('ADVISEE_CATALOG_PATH', DEFAULT_CATALOG_PATH)
+    monkeypatch.setenv('ADVISEE_DB_PATH', str(tmp_path / 'advisee_matrix.db'))
+    monkeypatch.setenv('ADVISEE_ANALYTICS_DIR', str(tmp_path / 'analytics'))
+    monkeypatch.setenv('ADVISEE_SPILL_DIR', str(tmp_path / 'spill'))
+    monkeypatch.setenv('ADVISEE_SESSION_TTL', '0')
+
+
+@pytest.fixture(scope='session')
+def catalog():
+    """The catalog shipped in catalog.json"""
+    return load_catalog(DEFAULT_CATALOG_PATH)
+
+
+@pytest.fixture
+def store(tmp_path):
+    """A matrix store that writes every save straight away"""
+    store = MatrixStore(str(tmp_path / 'matrices.db'), flush_interval=0)
+    yield store
+    store.close()
+
+
+def make_major(requirements, total_credits=None, name='Test Major'):
+    """A major_requirements record from {section: [(code, credits, required), ...]}"""
+    sections = [
+        {
+            'section': section,
+            'required_credits': sum(credits for _, credits, _ in courses),
+            'courses': [{'code': code, 'credits': credits, 'required': required} for code, credits, required in courses]
+        }
+        for section, courses in requirements.items()
+    ]
+    return {
+        'name': name,
+        'total_credits': total_credits or sum(section['required_credits'] for section in sections),
+        'requirements': sections
+    }
+
+
+def make_catalog(course_data, requirements, total_credits=None, grades=None):
+    """A one-major catalog, major TEST, from course_data and {section: [(code, credits, required), ...]}"""
+    return Catalog(course_data, {'TEST': make_major(requirements, total_credits)}, version='test',
+                   grading_scale=GradingScale(grades) if grades else None)
+
+
+def course(name, credits=3, level=1, prerequisites=(), offered=None):
+    """A course_data record"""
+    record = {'name': name, 'credits': credits, 'level': level, 'prerequisites': list(prerequisites)}
+    if offered:
+        record['offered'] = list(offered)
+    return record
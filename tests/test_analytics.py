@@ -0,0 +1,147 @@
+import threading
+import time
+
+import pytest
+
+from advisee_analytics import CohortAnalytics, format_age
+
+from test_app import app
+
+
+def matrix(code, grade, status='Completed', slot='Level 2 Major Courses_0'):
+    return {
+        'current_major': 'BIOL',
+        'student_info': {},
+        'course_entries': {slot: {'code': code, 'credits': 3, 'grade': grade, 'status': status}}
+    }
+
+
+@pytest.fixture
+def analytics(tmp_path, store):
+    return CohortAnalytics(str(tmp_path / 'dataset'), store=store)
+
+
+def test_a_refresh_builds_the_dataset_from_the_store(analytics, store):
+    assert analytics.overview() is None
+    assert analytics.pass_rates() == []
+    store.save('S1', matrix('BIOL2373', 'A'))
+    store.save('S2', matrix('BIOL2373', 'F'))
+    store.save('S3', matrix('BIOL2373', '', status='In Progress'))
+
+    done = analytics.refresh()
+    assert done['full'] and done['students_read'] == 3
+    assert analytics.overview()['students'] == 3
+    [row] = [row for row in analytics.pass_rates('BIOL') if row['code'] == 'BIOL2373']
+    assert (row['attempts'], row['passed'], row['pass_rate'], row['in_progress']) == (2, 1, 50.0, 1)
+    blocked = analytics.blocked('biol2373')
+    assert (blocked['students'], blocked['passed'], blocked['in_progress'], blocked['blocked']) == (3, 1, 1, 2)
+    assert sum(row['students'] for row in analytics.gpa_distribution('BIOL')) == 2
+
+
+def test_a_refresh_only_reads_the_matrices_saved_since_the_last_one(analytics, store, monkeypatch):
+    monkeypatch.setattr('advisee_analytics.REFRESH_OVERLAP', 0)
+    store.save('S1', matrix('BIOL2373', 'F'))
+    store.save('S2', matrix('BIOL2373', 'A'))
+    analytics.refresh()
+    time.sleep(0.01)
+    store.save('S1', matrix('BIOL2373', 'B'))
+
+    done = analytics.refresh()
+    assert not done['full'] and done['students_read'] == 1
+    assert analytics.blocked('BIOL2373')['blocked'] == 0
+
+
+def test_a_refresh_with_nothing_new_marks_the_dataset_current(analytics, store, monkeypatch):
+    monkeypatch.setattr('advisee_analytics.REFRESH_OVERLAP', 0)
+    store.save('S1', matrix('BIOL2373', 'A'))
+    analytics.refresh()
+    before = analytics.overview()
+
+    time.sleep(0.01)
+    analytics.refresh()
+    after = analytics.overview()
+    assert after['generation'] == before['generation']
+    assert after['refreshed_at'] > before['refreshed_at']
+
+
+def test_a_current_dataset_is_not_refreshed_in_the_background(analytics, store):
+    store.save('S1', matrix('BIOL2373', 'A'))
+    analytics.refresh()
+    assert analytics.refresh_in_background() is False
+    assert not analytics.refreshing()
+
+
+def test_a_stale_dataset_is_refreshed_on_one_background_thread(analytics, store, monkeypatch):
+    store.save('S1', matrix('BIOL2373', 'A'))
+    release = threading.Event()
+    refresh = analytics.refresh
+    monkeypatch.setattr(analytics, 'refresh', lambda: release.wait(10) and refresh())
+
+    assert analytics.refresh_in_background() is True
+    # Another page view while it runs does not start a second one
+    thread = analytics._refresher
+    assert analytics.refresh_in_background() is True
+    assert analytics._refresher is thread
+    assert analytics.overview() is None
+
+    release.set()
+    thread.join(10)
+    assert analytics.overview()['students'] == 1
+    assert analytics.refresh_in_background(interval=60) is False
+
+
+def test_a_failed_background_refresh_is_reported(analytics, monkeypatch):
+    def fail():
+        raise OSError("disk full")
+
+    monkeypatch.setattr(analytics, 'refresh', fail)
+    analytics.refresh_in_background()
+    analytics._refresher.join(10)
+    assert analytics.refresh_error == "OSError: disk full"
+    assert analytics.overview() is None
+
+
+def test_the_page_reads_the_last_dataset_while_it_is_refreshed(monkeypatch):
+    from advisee_analytics import get_analytics
+    from advisee_store import get_store
+
+    get_store().save('S1', matrix('BIOL2373', 'A'))
+    analytics = get_analytics()
+    analytics.refresh()
+    analytics.write_manifest(dict(analytics.manifest(), refreshed_at=time.time() - 2 * 3600))
+    release = threading.Event()
+    monkeypatch.setattr(analytics, 'refresh', lambda: release.wait(30))
+
+    try:
+        at = app(analytics_mode=True)
+        assert not at.exception
+        assert analytics.refreshing()
+        [caption] = [caption.value for caption in at.caption if 'saved matrices' in caption.value]
+        assert caption.startswith('1 saved matrices') and caption.endswith('(2 hours ago), updating now.')
+        assert [metric.value for metric in at.metric][-1] == '0'
+    finally:
+        release.set()
+        analytics._refresher.join(10)
+
+
+def test_the_page_waits_for_the_first_dataset_without_blocking(monkeypatch):
+    from advisee_analytics import get_analytics
+
+    analytics = get_analytics()
+    release = threading.Event()
+    monkeypatch.setattr(analytics, 'refresh', lambda: release.wait(30))
+    try:
+        at = app(analytics_mode=True)
+        assert not at.exception
+        assert [info.value for info in at.info] == ["The cohort dataset is being built; check back in a few minutes."]
+    finally:
+        release.set()
+        analytics._refresher.join(10)
+
+
+def test_format_age():
+    assert format_age(30) == "just now"
+    assert format_age(60) == "1 minute ago"
+    assert format_age(45 * 60) == "45 minutes ago"
+    assert format_age(3 * 3600) == "3 hours ago"
+    assert format_age(5 * 86400) == "5 days ago"
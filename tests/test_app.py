@@ -0,0 +1,103 @@
+import os
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'advisee_matrix_streamlit.py')
+BIOL = 'BIOL - BSc Biology Major'
+
+
+def app(**state):
+    at = AppTest.from_file(APP_PATH, default_timeout=60)
+    for key, value in state.items():
+        at.session_state[key] = value
+    return at.run()
+
+
+def metrics(at):
+    return [metric.value for metric in at.metric]
+
+
+def test_grid_mode_edits_each_section_in_one_editor():
+    at = app(grid_mode=True)
+    at.selectbox(key='major_select').set_value(BIOL).run()
+    assert not at.exception
+    # One data editor per requirement section instead of five widgets per row
+    assert len(at.dataframe) == 3
+    assert not [selectbox for selectbox in at.selectbox if (selectbox.key or '').startswith(('grade_', 'status_'))]
+
+    at.session_state['course_entries']['Level 1 Courses_0'].update(status='Completed', grade=2)
+    at.run()
+    assert metrics(at)[-2:] == ['3/90', '4.00']
+
+
+def student_id_input(at):
+    return [text_input for text_input in at.sidebar.text_input if text_input.label == 'Student ID'][0]
+
+
+def saved(student_id):
+    from advisee_store import get_store
+    return get_store().load(student_id)
+
+
+def test_a_matrix_is_saved_and_restored_by_student_id():
+    at = app()
+    student_id_input(at).set_value('S1').run()
+    at.selectbox(key='major_select').set_value(BIOL).run()
+    at.selectbox(key='status_Level 1 Courses_0').set_value('Completed').run()
+    at.selectbox(key='grade_Level 1 Courses_0').set_value(2).run()
+    assert saved('S1')['course_entries']['Level 1 Courses_0']['grade'] == 'A'
+
+    again = app()
+    student_id_input(again).set_value('S1').run()
+    assert not again.exception
+    assert again.selectbox(key='major_select').value == BIOL
+    assert metrics(again)[-2:] == ['3/90', '4.00']
+
+
+def test_a_new_student_id_starts_a_blank_matrix():
+    at = app()
+    student_id_input(at).set_value('S1').run()
+    at.selectbox(key='major_select').set_value(BIOL).run()
+    at.selectbox(key='status_Level 1 Courses_0').set_value('Completed').run()
+    at.selectbox(key='grade_Level 1 Courses_0').set_value(2).run()
+
+    student_id_input(at).set_value('S2').run()
+    assert not at.exception
+    # The matrix on screen was S1's: nothing is saved for S2 until it is edited
+    assert saved('S2') is None
+    assert at.selectbox(key='major_select').value == 'Select a Major'
+    assert saved('S1')['course_entries']['Level 1 Courses_0']['status'] == 'Completed'
+
+    at.selectbox(key='major_select').set_value(BIOL).run()
+    assert saved('S2')['course_entries']['Level 1 Courses_0']['status'] == 'Not Taken'
+
+
+def test_the_save_fingerprint_is_stable_across_processes():
+    import subprocess
+    import sys
+
+    script = ("import sys; sys.path.insert(0, sys.argv[1]); from advisee_matrix_streamlit import matrix_fingerprint;"
+              " print(matrix_fingerprint({'student_info': {'student_id': 'S1'}, 'course_entries': {}}))")
+    root = os.path.dirname(APP_PATH)
+    digests = {subprocess.run([sys.executable, '-c', script, root], capture_output=True, text=True, check=True).stdout
+               for _ in range(2)}
+    assert len(digests) == 1
+
+
+def test_auto_place_keeps_planned_courses():
+    at = app()
+    at.selectbox(key='major_select').set_value(BIOL).run()
+    at.selectbox(key='code_Level 1 Courses_4').set_value('BIOL1020').run()
+    at.selectbox(key='status_Level 1 Courses_4').set_value('Completed').run()
+    at.selectbox(key='grade_Level 1 Courses_4').set_value(2).run()
+    # A planned 4-credit section of a required course, typed into an elective row
+    at.selectbox(key='code_Level 2 Major Courses_5').set_value('BIOC2365').run()
+    at.number_input(key='credits_Level 2 Major Courses_5').set_value(4).run()
+    [button for button in at.button if 'Auto-place' in button.label][0].click().run()
+    assert not at.exception
+
+    entries = at.session_state['course_entries']
+    assert entries['Level 1 Courses_0'] == {'code': 'BIOL1020', 'credits': 3, 'grade': 2, 'status': 'Completed'}
+    assert entries['Level 2 Major Courses_1'] == {'code': 'BIOC2365', 'credits': 4, 'grade': 0, 'status': 'Not Taken'}
+    assert not entries['Level 2 Major Courses_5']['code']
@@ -0,0 +1,75 @@
+import csv
+
+import pandas as pd
+import pytest
+
+from advisee_audit import BatchAuditEngine, main
+from advisee_progress import ProgressAccumulator, audit_record
+
+
+def entries(catalog, grades):
+    """Session course entries of BIOL with the first slots completed with grades"""
+    plan, scale = catalog.plan('BIOL'), catalog.grading_scale
+    course_entries = {}
+    for slot, grade in enumerate(grades):
+        entry = plan.default_entry(slot)
+        entry.update(code=plan.codes[slot], grade=scale.encode(grade), status='Completed')
+        course_entries[plan.row_ids[slot]] = entry
+    return course_entries
+
+
+def test_batch_figures_match_the_progress_summary(catalog):
+    plan = catalog.plan('BIOL')
+    students = {'S1': entries(catalog, ['A', 'B+', 'C', 'F']), 'S2': entries(catalog, ['A-'] * 12), 'S3': {}}
+    engine = BatchAuditEngine(plan, catalog.grading_scale)
+    result = engine.audit(engine.from_course_entries(students))
+
+    for index, course_entries in enumerate(students.values()):
+        totals = ProgressAccumulator(plan, catalog.grading_scale)
+        totals.rebuild(course_entries)
+        expected = totals.summary()
+        summary = result.summary(index)
+        assert summary['sections'] == expected['sections']
+        for key in ('overall_credits', 'overall_qp', 'overall_gpa', 'overall_progress', 'remaining_credits',
+                    'standing'):
+            assert summary[key] == expected[key]
+        assert set(summary) == set(expected) | {'student_id'}
+
+
+def test_batch_standing_uses_the_progress_summary_thresholds(catalog):
+    plan = catalog.plan('BIOL')
+    # 0, 66, 69 and 90 of 90 credits
+    students = {'S1': {}, 'S2': entries(catalog, ['B'] * 22), 'S3': entries(catalog, ['B'] * 23),
+                'S4': entries(catalog, ['A'] * len(plan))}
+    engine = BatchAuditEngine(plan, catalog.grading_scale)
+    result = engine.audit(engine.from_course_entries(students))
+    assert [result.summary(index)['standing'] for index in range(4)] == [
+        'in_progress', 'in_progress', 'almost', 'complete']
+
+    record = {'current_major': 'BIOL', 'course_entries': {}}
+    assert set(result.summary(0)) == set(audit_record(catalog, record)) - {'catalog_version'}
+
+
+def test_from_frame_rejects_slots_the_major_does_not_have(catalog):
+    engine = BatchAuditEngine(catalog.plan('BIOL'), catalog.grading_scale)
+    frame = pd.DataFrame([{'student_id': 'S1', 'section': 'Level 1 Courses', 'slot': 99,
+                           'code': 'BIOL1020', 'credits': 3, 'grade': 'A', 'status': 'Completed'}])
+    with pytest.raises(ValueError, match='no requirement slot'):
+        engine.from_frame(frame)
+
+
+def test_cli_audits_a_transcript_csv(tmp_path):
+    transcripts = tmp_path / 'transcripts.csv'
+    transcripts.write_text(
+        "student_id,major,section,slot,code,credits,grade,status\n"
+        "S1,BIOL,Level 1 Courses,0,BIOL1020,3,A,Completed\n"
+        "S1,BIOL,Level 1 Courses,1,BIOL1025,3,B,Completed\n"
+        "S2,BIOL,Level 1 Courses,0,BIOL1020,3,,In Progress\n"
+    )
+    output = tmp_path / 'audit.csv'
+    main([str(transcripts), '-o', str(output)])
+
+    rows = {row['student_id']: row for row in csv.DictReader(output.open())}
+    assert rows['S1']['overall_credits'] == '6'
+    assert rows['S1']['overall_gpa'] == '3.50'
+    assert rows['S2']['overall_credits'] == '0'
@@ -0,0 +1,135 @@
+import random
+
+import pytest
+
+import advisee_audit_cache
+from advisee_audit_cache import AuditCache
+from advisee_progress import ProgressAccumulator, audit_record
+from advisee_store import decode_entries
+
+
+def cohort(catalog, students, seed=0):
+    """Stored BIOL records of a cohort that all passed the same Level 1 core"""
+    plan, rng = catalog.plan('BIOL'), random.Random(seed)
+    records = []
+    for n in range(students):
+        entries = {}
+        for slot, row_id in enumerate(plan.row_ids):
+            entry = plan.default_entry(slot)
+            core = row_id.startswith('Level 1')
+            entries[row_id] = {
+                'code': entry['code'], 'credits': entry['credits'],
+                'grade': 'A' if core else rng.choice(['A', 'B', 'C', '']),
+                'status': 'Completed' if core else rng.choice(['Completed', 'In Progress', 'Not Taken'])
+            }
+        records.append({'student_id': f'S{n}', 'current_major': 'BIOL', 'course_entries': entries})
+    return records
+
+
+def accumulated(catalog, record):
+    scale = catalog.grading_scale
+    totals = ProgressAccumulator(catalog.plan(record['current_major']), scale)
+    totals.rebuild(decode_entries(record['course_entries'], scale))
+    return totals.summary()
+
+
+@pytest.fixture
+def computed(monkeypatch):
+    """Section figures the cache computes rather than looks up"""
+    calls = []
+    section_figures = advisee_audit_cache.section_figures
+    monkeypatch.setattr(advisee_audit_cache, 'section_figures',
+                        lambda courses, scale: calls.append(courses) or section_figures(courses, scale))
+    return calls
+
+
+def audit_all(cache, catalog, records):
+    return [cache.audit(catalog, 'BIOL', record['course_entries'], record['student_id']) for record in records]
+
+
+def test_a_repeated_cohort_is_answered_from_the_cache(catalog, computed):
+    records = cohort(catalog, 50)
+    cache = AuditCache()
+    expected = [accumulated(catalog, record) for record in records]
+
+    assert audit_all(cache, catalog, records) == expected
+    sections = len(catalog.plan('BIOL').sections)
+    # The shared Level 1 core is summed once for the whole cohort
+    assert cache.section_hits >= 49 and len(computed) == 50 * sections - cache.section_hits
+
+    computed.clear()
+    assert audit_all(cache, catalog, records) == expected
+    assert computed == []
+    stats = cache.stats()
+    assert (stats['transcript_hits'], stats['transcript_misses']) == (50, 50)
+
+
+def test_a_grade_change_drops_the_students_old_summary(catalog, computed):
+    [record] = cohort(catalog, 1)
+    cache = AuditCache()
+    audit_all(cache, catalog, [record])
+    entries_before = cache.stats()['entries']
+
+    record['course_entries']['Level 1 Courses_0']['grade'] = 'C'
+    computed.clear()
+    [summary] = audit_all(cache, catalog, [record])
+    assert summary == accumulated(catalog, record)
+    # Only the changed course's section is summed again
+    assert len(computed) == 1
+    assert cache.invalidations == 1
+    # The new section, summary and transcript are added, the old transcript is gone
+    assert cache.stats()['entries'] == entries_before + 3 - 1
+
+    # Auditing the same transcript again invalidates nothing
+    audit_all(cache, catalog, [record])
+    assert cache.invalidations == 1
+
+
+def test_entries_are_evicted_least_recently_used_first(catalog):
+    first, second = cohort(catalog, 2)
+    cache = AuditCache(max_entries=4)
+    audit_all(cache, catalog, [first, second])
+    assert len(cache.entries) == 4 and cache.evictions > 0
+    # The last audit's transcript survives, the first's does not
+    assert cache.audit(catalog, 'BIOL', second['course_entries']) == accumulated(catalog, second)
+    assert cache.audit(catalog, 'BIOL', first['course_entries']) == accumulated(catalog, first)
+    stats = cache.stats()
+    assert (stats['transcript_hits'], stats['entries']) == (1, 4)
+
+
+def test_a_new_catalog_empties_the_cache(catalog):
+    from advisee_catalog import DEFAULT_CATALOG_PATH, load_catalog
+
+    [record] = cohort(catalog, 1)
+    cache = AuditCache()
+    audit_all(cache, catalog, [record])
+    audit_all(cache, load_catalog(DEFAULT_CATALOG_PATH), [record])
+    assert cache.stats()['catalog_changes'] == 1
+    assert cache.stats()['transcript_hits'] == 0
+
+
+def test_a_grade_off_the_scale_is_never_cached(catalog):
+    [record] = cohort(catalog, 1)
+    entries = decode_entries(record['course_entries'], catalog.grading_scale)
+    entries['Level 1 Courses_0']['grade'] = 99
+    cache = AuditCache()
+    for _ in range(2):
+        with pytest.raises(ValueError, match='not on the grading scale'):
+            cache.audit(catalog, 'BIOL', entries)
+    assert cache.stats()['entries'] == 0
+
+
+def test_a_zero_size_cache_keeps_nothing(catalog):
+    [record] = cohort(catalog, 1)
+    cache = AuditCache(0)
+    assert audit_all(cache, catalog, [record]) == [accumulated(catalog, record)]
+    assert cache.stats()['entries'] == 0 and cache.stats()['misses'] == 0
+
+
+def test_audit_record_goes_through_the_process_cache(catalog):
+    [record] = cohort(catalog, 1, seed=7)
+    before = advisee_audit_cache.get_audit_cache().stats()
+    audit_record(catalog, record)
+    audit_record(catalog, record)
+    after = advisee_audit_cache.get_audit_cache().stats()
+    assert after['transcript_hits'] - before['transcript_hits'] == 1
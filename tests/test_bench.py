@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+import advisee_bench
+from advisee_bench_common import synthetic_catalog, synthetic_records
+from advisee_catalog import Catalog, load_catalog
+
+
+def test_synthetic_catalogs_are_reproducible_and_loadable():
+    data = synthetic_catalog(courses=300, majors=3, slots=12, seed=1)
+    assert data == synthetic_catalog(courses=300, majors=3, slots=12, seed=1)
+    assert len(data['course_data']) == 300
+    catalog = Catalog(data['course_data'], data['major_requirements'], version='bench')
+    records = synthetic_records(catalog, 6, seed=1)
+    assert [record['current_major'] for record in records] == ['M000', 'M001', 'M002'] * 2
+    for record in records:
+        assert set(record['course_entries']) == set(catalog.plan(record['current_major']).row_ids)
+
+
+def test_prerequisites_only_point_at_earlier_courses():
+    course_data = synthetic_catalog(courses=300, majors=1, slots=12)['course_data']
+    seen = set()
+    for code, course in course_data.items():
+        assert set(course['prerequisites']) <= seen
+        seen.add(code)
+
+
+def test_generate_writes_the_catalog_and_transcripts(tmp_path):
+    advisee_bench.main(['generate', str(tmp_path), '--courses', '200', '--majors', '2', '--students', '4'])
+    assert len(load_catalog(str(tmp_path / 'catalog.json')).major_requirements) == 2
+    assert (tmp_path / 'transcripts.csv').read_text().startswith('student_id,major,section,slot')
+    assert (tmp_path / 'registrar.csv').read_text().startswith('student_id,first_name,surname,course_code')
+
+
+def test_compare_flags_regressions_by_direction(tmp_path, capsys):
+    base = {'meta': {'cpus': 1}, 'audit': {'warm_ms': 10.0, 'rows_per_s': 100.0, 'students': 5}}
+    head = {'meta': {'cpus': 8}, 'audit': {'warm_ms': 12.0, 'rows_per_s': 120.0, 'students': 50}}
+    rows = advisee_bench.compare_results(base, head, 0.1)
+    assert [(path, regressed) for path, _, _, _, regressed in rows] == [
+        ('audit.rows_per_s', False), ('audit.warm_ms', True)]
+
+    paths = []
+    for name, results in (('base', base), ('head', head)):
+        paths.append(tmp_path / f'{name}.json')
+        paths[-1].write_text(json.dumps(results))
+    with pytest.raises(SystemExit) as exit_info:
+        advisee_bench.main(['compare', *map(str, paths)])
+    assert exit_info.value.code == 1
+    assert 'REGRESSION' in capsys.readouterr().out
@@ -0,0 +1,70 @@
+import json
+import os
+
+import pytest
+
+from advisee_catalog import DEFAULT_CATALOG_PATH, get_catalog, load_catalog
+
+
+def test_catalog_is_read_only(catalog):
+    with pytest.raises(TypeError):
+        catalog.course_data['BIOL1020'] = {}
+    with pytest.raises(TypeError):
+        catalog.major_requirements['BIOL']['requirements'][0]['courses'][0]['credits'] = 6
+
+
+def test_catalog_is_shared_within_the_process():
+    assert get_catalog() is get_catalog(DEFAULT_CATALOG_PATH)
+
+
+def test_catalog_reloads_when_its_file_changes(tmp_path):
+    data = json.load(open(DEFAULT_CATALOG_PATH))
+    path = tmp_path / 'catalog.json'
+    path.write_text(json.dumps(data))
+    first = get_catalog(str(path))
+    assert get_catalog(str(path)) is first
+
+    data['course_data']['BIOL1020']['name'] = 'Renamed'
+    path.write_text(json.dumps(data))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    second = get_catalog(str(path))
+    assert second is not first
+    assert second.version != first.version
+    assert second.course_data['BIOL1020']['name'] == 'Renamed'
+
+
+def test_plans_are_compiled_once_per_catalog():
+    catalog = load_catalog(DEFAULT_CATALOG_PATH)
+    assert catalog.plan('BIOL') is catalog.plan('BIOL')
+
+
+def touch(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_a_catalog_that_does_not_load_keeps_the_last_one(tmp_path, caplog):
+    path = tmp_path / 'catalog.json'
+    text = open(DEFAULT_CATALOG_PATH).read()
+    path.write_text(text)
+    first = get_catalog(str(path))
+
+    # Half written, then not a catalog at all
+    for broken in (text[:len(text) // 2], '[]'):
+        path.write_text(broken)
+        touch(path)
+        assert get_catalog(str(path)) is first
+        assert get_catalog(str(path)) is first
+    assert len([record for record in caplog.records if 'did not load' in record.message]) == 2
+
+    path.write_text(text.replace('Diversity of Life I', 'Renamed'))
+    touch(path)
+    assert get_catalog(str(path)).course_data['BIOL1020']['name'] == 'Renamed'
+
+
+def test_a_first_catalog_that_does_not_load_is_an_error(tmp_path):
+    path = tmp_path / 'catalog.json'
+    path.write_text('{')
+    with pytest.raises(ValueError):
+        get_catalog(str(path))
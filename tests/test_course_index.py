@@ -0,0 +1,54 @@
+from advisee_course_index import CourseIndex
+
+COURSES = ('BIOL1020', 'BIOL3105', 'BIOL3210', 'BIOLA3000', 'CHEM3110', 'ECOL2010', 'ELEC3XXX')
+
+
+def index():
+    return CourseIndex(dict.fromkeys(COURSES, {}))
+
+
+def test_placeholder_codes_are_not_indexed():
+    courses = index()
+    assert len(courses) == 6
+    assert 'BIOL3105' in courses
+    assert 'ELEC3XXX' not in courses
+
+
+def test_resolve_subject_wildcards():
+    courses = index()
+    assert courses.resolve('BIOL3XXX') == ('BIOL3105', 'BIOL3210')
+    assert courses.resolve('PHYS1XXX') == ()
+
+
+def test_resolve_any_subject_wildcards_in_number_order():
+    assert index().resolve('ELEC3XXX') == ('BIOLA3000', 'BIOL3105', 'CHEM3110', 'BIOL3210')
+
+
+def test_resolve_fixed_codes():
+    courses = index()
+    assert courses.resolve('BIOL1020') == ('BIOL1020',)
+    assert courses.resolve('BIOL9999') == ()
+
+
+def test_satisfies():
+    courses = index()
+    assert courses.satisfies('BIOL3105', 'BIOL3XXX')
+    assert courses.satisfies('CHEM3110', 'ELEC3XXX')
+    assert not courses.satisfies('ECOL2010', 'ELEC3XXX')
+    assert not courses.satisfies('CHEM3110', 'BIOL3XXX')
+    assert not courses.satisfies('BIOL3210', 'BIOL3105')
+
+
+def test_check_code():
+    courses = index()
+    assert courses.check_code(' biol3105 ', 'BIOL3XXX') is None
+    assert courses.check_code('BIOL31') == "BIOL31 is not a course code (e.g. BIOL3105)"
+    assert courses.check_code('BIOL3999') == "BIOL3999 is not in the course catalog"
+    assert courses.check_code('ECOL2010', 'ELEC3XXX') == "ECOL2010 does not satisfy ELEC3XXX"
+
+
+def test_from_sorted_matches_a_built_index():
+    built = index()
+    restored = CourseIndex.from_sorted(built.codes, built.number_keys, built.number_codes)
+    for slot_code in ('BIOL3XXX', 'ELEC3XXX', 'ELEC2XXX', 'CHEM3110'):
+        assert restored.resolve(slot_code) == built.resolve(slot_code)
@@ -0,0 +1,112 @@
+import csv
+import io
+
+import pytest
+
+import advisee_export
+from advisee_export import EXPORT_COLUMNS, export_bytes, export_filename, export_matrices, matrix_rows
+
+RECORD = {
+    'student_id': 'S1',
+    'current_major': 'BIOL',
+    'student_info': {},
+    'course_entries': {
+        'Level 1 Courses_0': {'code': 'BIOL1020', 'credits': 3, 'grade': 'A', 'status': 'Completed'},
+        'Level 1 Courses_4': {'code': 'BIOC2365', 'credits': 4, 'grade': 'B', 'status': 'Completed'},
+        'Level 1 Courses_5': {'code': 'ZOOL1999', 'credits': 3, 'grade': '', 'status': 'In Progress'}
+    }
+}
+
+
+def by_slot(rows):
+    return {(row[2], row[3]): row for row in rows}
+
+
+def test_one_row_per_requirement_slot(catalog):
+    rows = list(matrix_rows(catalog, [RECORD]))
+    assert len(rows) == len(catalog.plan('BIOL'))
+    assert rows[0] == ('S1', 'BIOL', 'Level 1 Courses', 'BIOL1020', 'Diversity of Life I', 3, 'A', 'Completed', 12.0)
+    rows = by_slot(rows)
+    # Courses typed into elective slots are named from the catalog, if it has them
+    assert rows['Level 1 Courses', 'BIOC2365'][4] == catalog.course_data['BIOC2365']['name']
+    assert rows['Level 1 Courses', 'BIOC2365'][5:] == (4, 'B', 'Completed', 12.0)
+    assert rows['Level 1 Courses', 'ZOOL1999'][4:] == ('Custom Course', 3, '', 'In Progress', 0)
+    # Slots nothing was entered for carry the requirement itself
+    assert rows['Level 2 Major Courses', 'BIOL2373'][5:] == (3, '', 'Not Taken', 0)
+
+
+def test_matrices_without_a_known_major_are_skipped(catalog):
+    counts = advisee_export.ExportCounts()
+    records = [dict(RECORD, current_major=None), dict(RECORD, current_major='ZOOL'), RECORD]
+    rows = list(matrix_rows(catalog, records, counts))
+    assert (counts.matrices, counts.skipped, counts.rows) == (1, 2, len(rows))
+
+
+def test_csv_round_trip(catalog):
+    rows = list(csv.reader(io.StringIO(export_bytes(catalog, [RECORD, dict(RECORD, student_id='S2')], 'csv').decode())))
+    assert rows[0] == list(EXPORT_COLUMNS)
+    assert len(rows) == 1 + 2 * len(catalog.plan('BIOL'))
+    assert rows[1] == ['S1', 'BIOL', 'Level 1 Courses', 'BIOL1020', 'Diversity of Life I', '3', 'A', 'Completed', '12.0']
+
+
+def test_xlsx_round_trip(catalog):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(io.BytesIO(export_bytes(catalog, [RECORD], 'xlsx')), read_only=True)
+    rows = list(workbook['Matrices'].values)
+    assert rows[0] == EXPORT_COLUMNS
+    # Empty cells read back as None
+    assert [tuple('' if value is None else value for value in row) for row in rows[1:]] == list(
+        matrix_rows(catalog, [RECORD]))
+
+
+def test_xlsx_continues_on_further_sheets(catalog, monkeypatch):
+    from openpyxl import load_workbook
+
+    monkeypatch.setattr(advisee_export, 'XLSX_MAX_ROWS', 21)
+    workbook = load_workbook(io.BytesIO(export_bytes(catalog, [RECORD], 'xlsx')), read_only=True)
+    assert workbook.sheetnames == ['Matrices', 'Matrices 2']
+    assert [len(list(workbook[name].values)) for name in workbook.sheetnames] == [21, 11]
+
+
+def test_parquet_round_trip_in_row_groups(catalog):
+    import pyarrow.parquet as pq
+
+    records = [dict(RECORD, student_id=f'S{i:03}') for i in range(400)]
+    table = pq.ParquetFile(io.BytesIO(export_bytes(catalog, records, 'parquet')))
+    # One row group per CHUNK_ROWS rows
+    assert table.metadata.num_row_groups == 2
+    rows = table.read()
+    assert rows.column_names == list(EXPORT_COLUMNS)
+    assert rows.num_rows == 400 * len(catalog.plan('BIOL'))
+    assert [tuple(row.values()) for row in rows.slice(0, len(catalog.plan('BIOL'))).to_pylist()] == list(
+        matrix_rows(catalog, records[:1]))
+
+
+@pytest.mark.parametrize('fmt', advisee_export.FORMATS)
+def test_an_empty_export_still_has_its_columns(catalog, fmt):
+    buffer = io.BytesIO()
+    counts = export_matrices(catalog, [], buffer, fmt)
+    assert counts.rows == 0 and buffer.getvalue()
+
+
+def test_export_filename():
+    assert export_filename('S 1/2', 'csv') == 'matrix_S_1_2.csv'
+
+
+def test_cli_exports_the_store(tmp_path, capsys):
+    from advisee_store import get_store
+
+    store = get_store()
+    store.save('S1', RECORD)
+    store.save('S2', dict(RECORD, current_major='ZOOL'))
+    output = tmp_path / 'out.csv'
+    assert advisee_export.main([str(output)]) == 0
+    assert len(output.read_text().splitlines()) == 31
+    assert '1 without a known major skipped' in capsys.readouterr().err
+
+    with pytest.raises(SystemExit):
+        advisee_export.main([str(tmp_path / 'out.txt')])
+    with pytest.raises(SystemExit):
+        advisee_export.main([str(tmp_path / 'one.csv'), '--student', 'S9'])
+    assert sorted(path.name for path in tmp_path.iterdir() if path.name.startswith(('out', 'one', '.export'))) == ['out.csv']
@@ -0,0 +1,38 @@
+import zipfile
+
+import pytest
+
+from advisee_catalog import DEFAULT_CATALOG_PATH
+from advisee_forms import declaration_context, render_form_html, render_form_pdf, write_forms_zip
+
+INFO = {'student_id': 'S1', 'first_name': 'Ada', 'middle_initial': 'B', 'surname': '<Lovelace>',
+        'academic_year': '2026', 'semester': 'Fall', 'graduation_term': 'Spring 2029'}
+
+
+def test_html_form_escapes_student_fields(catalog):
+    html = render_form_html(declaration_context(catalog, INFO, 'BIOL'))
+    assert 'BSc Biology Major' in html
+    assert '&lt;Lovelace&gt;' in html
+    assert '<Lovelace>' not in html
+
+
+def test_pdf_form_is_a_single_page_document(catalog):
+    pdf = render_form_pdf(declaration_context(catalog, dict(INFO, surname='O(Brien)'), 'BIOL', '2026-10-18 12:00:00'))
+    assert pdf.startswith(b'%PDF-1.4') and pdf.rstrip().endswith(b'%%EOF')
+    assert b'/Count 1' in pdf
+    assert b'O\\(Brien\\)' in pdf
+
+
+def test_unknown_majors_are_rejected(catalog):
+    with pytest.raises(ValueError, match='unknown major'):
+        declaration_context(catalog, INFO, 'NOPE')
+
+
+def test_roster_forms_are_written_to_one_archive(tmp_path):
+    records = [{'student_id': f'S{i}', 'student_info': INFO, 'current_major': 'BIOL'} for i in range(5)]
+    records.append({'student_id': 'S9', 'student_info': INFO, 'current_major': None})
+    out = tmp_path / 'forms.zip'
+    written, skipped = write_forms_zip(records, str(out), workers=2, chunk_size=2, path=DEFAULT_CATALOG_PATH)
+    assert (written, skipped) == (5, ['S9'])
+    names = zipfile.ZipFile(out).namelist()
+    assert sorted(names) == sorted(f'declaration_S{i}.{fmt}' for i in range(5) for fmt in ('html', 'pdf'))
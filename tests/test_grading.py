@@ -0,0 +1,40 @@
+from conftest import course, make_catalog
+
+from advisee_grading import DEFAULT_GRADES, DEFAULT_SCALE, NO_GRADE, GradingScale
+from advisee_progress import ProgressAccumulator
+
+
+def test_grades_round_trip_through_their_codes():
+    for code, letter in enumerate(DEFAULT_SCALE.letters):
+        assert DEFAULT_SCALE.encode(letter) == code
+        assert DEFAULT_SCALE.decode(code) == letter
+    assert DEFAULT_SCALE.encode('') == NO_GRADE
+    assert DEFAULT_SCALE.encode('Z') == NO_GRADE
+    assert len(DEFAULT_SCALE) == len(DEFAULT_GRADES) + 1
+
+
+def test_quality_points_come_from_the_table():
+    assert DEFAULT_SCALE.quality_points(DEFAULT_SCALE.encode('A+'), 3) == 4.3 * 3
+    assert DEFAULT_SCALE.quality_points(NO_GRADE, 3) == 0.0
+    points, counts_gpa, counts_credits = DEFAULT_SCALE.numpy_tables()
+    assert list(points) == list(DEFAULT_SCALE.points)
+    assert not counts_gpa[NO_GRADE] and not counts_credits[NO_GRADE]
+
+
+def test_a_custom_scale_decides_what_counts():
+    grades = [{'grade': 'H', 'points': 4.0}, {'grade': 'S', 'points': 0.0, 'counts_gpa': False},
+              {'grade': 'U', 'points': 0.0, 'counts_gpa': False, 'counts_credits': False}]
+    scale = GradingScale(grades)
+    assert scale.version != DEFAULT_SCALE.version
+    assert scale.version == GradingScale(grades).version
+
+    catalog = make_catalog({'BIOL1020': course('Diversity of Life I')},
+                           {'Core': [('BIOL1020', 3, True), ('BIOL1025', 3, True), ('BIOL1030', 3, True)]},
+                           grades=grades)
+    plan = catalog.plan('TEST')
+    totals = ProgressAccumulator(plan, catalog.grading_scale)
+    for slot, grade in enumerate('HSU'):
+        totals.update(slot, dict(plan.default_entry(slot), grade=scale.encode(grade), status='Completed'))
+    assert totals.overall_credits == 6
+    assert totals.overall_gpa_credits == 3
+    assert totals.overall_gpa() == 4.0
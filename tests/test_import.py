@@ -0,0 +1,106 @@
+import io
+
+import pytest
+
+from advisee_core import parse_credits
+from advisee_import import TranscriptImporter, iter_rows, main
+
+EXPORT = """Student ID,First Name,Course Code,Credits,Grade,Status
+S1,Ada,BIOL1020,3,A,Completed
+S1,Ada,BIOL1025,3,B+,Completed
+S2,Bo,BIOL1020,three,A,Completed
+S2,Bo,BIOL1025,3,,In Progress
+S3,Cy,BIOL1020,3,B,Completed
+"""
+
+
+def export(text=EXPORT):
+    return io.BytesIO(text.encode())
+
+
+def test_rows_are_read_with_normalized_columns():
+    rows = list(iter_rows(export(), 'export.csv'))
+    assert rows[0]['student_id'] == 'S1'
+    assert rows[0]['course_code'] == 'BIOL1020'
+    assert rows[0]['first_name'] == 'Ada'
+
+
+def test_parse_credits_rejects_what_a_slot_cannot_hold():
+    assert parse_credits('3') == 3
+    assert parse_credits('4.0') == 4
+    for bad in ('three', '3.5', '-1', '70000', 'nan', 'inf', None):
+        with pytest.raises(ValueError):
+            parse_credits(bad)
+
+
+def test_a_bad_row_is_rejected_and_the_rest_imported(catalog, store):
+    report = TranscriptImporter(catalog, 'BIOL').import_into(store, export(), 'export.csv')
+    assert report.students == 3
+    assert report.rejected == [{'row': 3, 'student_id': 'S2', 'error': "credits 'three' is not a number"}]
+    assert report.as_dict()['rejected'] == 1
+    # S2's readable row still made it
+    assert store.load('S2')['course_entries']['Level 1 Courses_1']['status'] == 'In Progress'
+    assert store.load('S3') is not None
+
+
+def test_an_unknown_major_rejects_that_students_rows_only(catalog, store):
+    text = "student_id,major,course_code,grade\nS1,NOPE,BIOL1020,A\nS2,BIOL,BIOL1020,A\n"
+    report = TranscriptImporter(catalog).import_into(store, export(text), 'export.csv')
+    assert [(rejected['row'], rejected['student_id']) for rejected in report.rejected] == [(1, 'S1')]
+    assert store.load('S1') is None
+    assert store.load('S2') is not None
+
+
+def saved_matrix(store):
+    store.save('S1', {
+        'student_info': {'student_id': 'S1', 'first_name': 'Saved'},
+        'current_major': 'BIOL',
+        'course_entries': {'Level 1 Courses_0': {'code': 'BIOL1020', 'credits': 3, 'grade': 'C', 'status': 'Completed'}}
+    })
+
+
+def test_existing_matrices_are_skipped_by_default(catalog, store):
+    saved_matrix(store)
+    report = TranscriptImporter(catalog, 'BIOL').import_into(store, export(), 'export.csv')
+    assert report.skipped == 1
+    record = store.load('S1')
+    assert record['student_info']['first_name'] == 'Saved'
+    assert 'Level 1 Courses_1' not in record['course_entries']
+
+
+def test_existing_matrices_can_be_merged_or_replaced(catalog, store):
+    saved_matrix(store)
+    report = TranscriptImporter(catalog, 'BIOL').import_into(store, export(), 'export.csv', on_existing='merge')
+    assert report.merged == 1
+    entries = store.load('S1')['course_entries']
+    # The saved grade stays; BIOL1020 from the export has no free slot left
+    assert entries['Level 1 Courses_0']['grade'] == 'C'
+    assert entries['Level 1 Courses_1']['grade'] == 'B+'
+
+    TranscriptImporter(catalog, 'BIOL').import_into(store, export(), 'export.csv', on_existing='replace')
+    assert store.load('S1')['course_entries']['Level 1 Courses_0']['grade'] == 'A'
+
+
+@pytest.mark.parametrize('on_existing', ['merge', 'replace'])
+def test_a_student_whose_rows_were_rejected_is_not_imported_from_later_rows(catalog, store, on_existing):
+    saved_matrix(store)
+    text = ("student_id,major,course_code,grade\n"
+            "S1,NOPE,BIOL1020,A\n"
+            "S2,BIOL,BIOL1020,A\n"
+            "S1,BIOL,BIOL1025,B\n")
+    report = TranscriptImporter(catalog).import_into(store, export(text), 'export.csv', on_existing=on_existing)
+    assert [(rejected['row'], rejected['student_id']) for rejected in report.rejected] == [(1, 'S1'), (3, 'S1')]
+    assert report.merged == 0
+    # The matrix saved before the import is left as it was
+    record = store.load('S1')
+    assert record['student_info']['first_name'] == 'Saved'
+    assert list(record['course_entries']) == ['Level 1 Courses_0']
+
+
+def test_cli_reports_rejected_rows(tmp_path, capsys):
+    path = tmp_path / 'export.csv'
+    path.write_text(EXPORT)
+    assert main([str(path), '--major', 'BIOL', '--db', str(tmp_path / 'cli.db')]) == 1
+    err = capsys.readouterr().err
+    assert 'rejected=1' in err
+    assert "rejected row 3 (student S2): credits 'three'" in err
@@ -0,0 +1,66 @@
+from conftest import course, make_catalog
+
+from advisee_matching import FREE, entry_courses, match_courses
+
+
+def plan():
+    catalog = make_catalog(
+        {code: course(code, level=int(code[4])) for code in ('BIOL1020', 'BIOL1025', 'BIOL2100', 'CHEM2100')},
+        {'Core': [('BIOL1020', 3, True), ('BIOL2XXX', 3, True)],
+         'Electives': [('ELEC2XXX', 3, False), ('ELEC1XXX', 3, False)]}
+    )
+    return catalog.plan('TEST')
+
+
+def taken(code, status='Completed', grade='A', credits=3):
+    return {'code': code, 'credits': credits, 'grade': grade, 'status': status}
+
+
+def test_matching_fills_required_slots_first():
+    p = plan()
+    # CHEM2100 only fits the elective; BIOL2100 must go to BIOL2XXX even
+    # though ELEC2XXX would take it too
+    result = match_courses(p, [taken('CHEM2100'), taken('BIOL2100'), taken('BIOL1020')])
+    assert [result.courses[c]['code'] if c != FREE else None for c in result.slot_course] == \
+        ['BIOL1020', 'BIOL2100', 'CHEM2100', None]
+    assert result.required_filled() == 2
+    assert result.unmatched == []
+
+
+def test_courses_without_enough_credits_or_a_fitting_slot_are_unmatched():
+    p = plan()
+    result = match_courses(p, [taken('BIOL2100', credits=2), taken('PHYS3100')])
+    assert [course['code'] for course in result.unmatched] == ['BIOL2100', 'PHYS3100']
+
+
+def test_taken_slots_are_left_alone():
+    p = plan()
+    result = match_courses(p, [taken('BIOL1025')], taken=[3])
+    assert result.slot_course[3] == FREE
+    assert result.unmatched
+
+
+def test_a_planned_course_never_displaces_a_taken_one():
+    p = plan()
+    result = match_courses(p, [taken('BIOL2100', 'Not Taken', ''), taken('CHEM2100'), taken('BIOL1025')])
+    entries = result.course_entries()
+    # Only ELEC2XXX and BIOL2XXX take level-2 courses: the planned BIOL2100
+    # gets the required one, the completed CHEM2100 the elective
+    assert entries['Core_1'] == taken('BIOL2100', 'Not Taken', '')
+    assert entries['Electives_0'] == taken('CHEM2100')
+
+    result = match_courses(p, [taken('CHEM2100', 'Not Taken', ''), taken('BIOL2100'), taken('CHEM2100')])
+    assert result.unmatched == [taken('CHEM2100', 'Not Taken', '')]
+
+
+def test_entry_courses_keep_planned_courses_but_not_blank_rows():
+    p = plan()
+    entries = {
+        'Core_0': p.default_entry(0),
+        'Core_1': taken('BIOL2100', 'In Progress', ''),
+        'Electives_0': taken('chem2100', 'Not Taken', ''),
+        'Electives_1': p.default_entry(3)
+    }
+    assert [(course['row_id'], course['code'], course['status']) for course in entry_courses(p, entries)] == [
+        ('Core_1', 'BIOL2100', 'In Progress'), ('Electives_0', 'CHEM2100', 'Not Taken')
+    ]
@@ -0,0 +1,99 @@
+import json
+import sys
+
+import pytest
+
+import advisee_metrics
+from advisee_metrics import (Histogram, NullMetrics, RerunMetrics, RerunTrace, deep_sizeof, get_metrics, read_log,
+                             summarize)
+
+
+@pytest.fixture
+def fresh_metrics(monkeypatch):
+    """get_metrics() configured anew from the test's environment"""
+    monkeypatch.setattr(advisee_metrics, '_metrics', None)
+    for name in ('ADVISEE_METRICS', 'ADVISEE_METRICS_LOG', 'ADVISEE_METRICS_FILE', 'ADVISEE_METRICS_PORT'):
+        monkeypatch.delenv(name, raising=False)
+    yield
+    handlers = list(advisee_metrics.logger.handlers)
+    for handler in handlers:
+        advisee_metrics.logger.removeHandler(handler)
+        handler.close()
+
+
+def test_metrics_are_off_unless_asked_for(fresh_metrics):
+    metrics = get_metrics()
+    assert isinstance(metrics, NullMetrics)
+    with metrics.rerun(), metrics.phase('sidebar'):
+        pass
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((1, 10))
+    for value in (0.5, 5, 5, 50):
+        histogram.observe('full', value)
+    assert histogram.exposition('runs', 'kind') == [
+        'runs_bucket{kind="full",le="1"} 1',
+        'runs_bucket{kind="full",le="10"} 3',
+        'runs_bucket{kind="full",le="+Inf"} 4',
+        'runs_sum{kind="full"} 60.500000',
+        'runs_count{kind="full"} 4'
+    ]
+
+
+def test_deep_sizeof_counts_shared_objects_once_and_skips_types():
+    shared = list(range(100))
+    pair = [shared, shared]
+    assert deep_sizeof(pair) == sys.getsizeof(pair) + deep_sizeof(shared)
+    assert deep_sizeof({'a': shared}, skip=(list,)) == sys.getsizeof({'a': shared}) + sys.getsizeof('a')
+
+
+def test_recorded_reruns_reach_the_exposition_and_the_file(tmp_path):
+    path = tmp_path / 'metrics.prom'
+    metrics = RerunMetrics(str(path))
+    trace = RerunTrace('session-1', 'full')
+    with trace.phase('sidebar'):
+        pass
+    metrics.record(trace, 'ok', widgets=12, state_bytes=20_000)
+    metrics.record(RerunTrace('session-1', 'fragment'), 'rerun', widgets=3, state_bytes=20_000)
+
+    text = path.read_text()
+    assert 'advisee_reruns_total{kind="full",outcome="ok"} 1' in text
+    exposition = metrics.exposition()
+    assert 'advisee_reruns_total{kind="fragment",outcome="rerun"} 1' in exposition
+    assert 'advisee_phase_seconds_count{phase="sidebar"} 1' in exposition
+    assert 'advisee_active_sessions 1' in exposition
+    assert 'advisee_session_reruns{session="session-1"} 2' in exposition
+
+
+def test_the_app_logs_one_record_per_rerun(fresh_metrics, monkeypatch, tmp_path):
+    from streamlit.testing.v1 import AppTest
+
+    from test_app import APP_PATH
+
+    log = tmp_path / 'metrics.jsonl'
+    monkeypatch.setenv('ADVISEE_METRICS_LOG', str(log))
+    at = AppTest.from_file(APP_PATH, default_timeout=60).run()
+    at.run()
+    assert not at.exception
+
+    records = list(read_log(str(log)))
+    assert len(records) == 2
+    assert {'init', 'sidebar'} <= set(records[0]['phases_ms'])
+    assert records[-1]['session_reruns'] == 2
+    assert records[-1]['widgets'] > 0
+
+
+def test_summarize_a_log(tmp_path):
+    log = tmp_path / 'metrics.jsonl'
+    lines = ['not json', json.dumps({'other': 1})]
+    for session, wall in (('a', 10.0), ('a', 30.0), ('b', 5.0)):
+        lines.append(json.dumps({'session': session, 'kind': 'full', 'wall_ms': wall, 'phases_ms': {'sidebar': wall / 2},
+                                 'session_state_bytes': 100}))
+    log.write_text('\n'.join(lines) + '\n')
+
+    summary = summarize(read_log(str(log)), top=1)
+    assert summary['reruns']['full']['runs'] == 3
+    assert summary['reruns']['full']['median_ms'] == 10.0
+    assert summary['phases']['sidebar']['max_ms'] == 15.0
+    assert summary['hot_sessions'] == [{'session': 'a', 'reruns': 2, 'wall_ms': 40.0, 'session_state_bytes': 100}]
@@ -0,0 +1,36 @@
+from conftest import course, make_catalog
+
+from advisee_plan import CUSTOM_COURSE_NAME
+
+
+def small_plan():
+    catalog = make_catalog(
+        {'BIOL1020': course('Diversity of Life I'), 'BIOL3105': course('Ecology', level=3)},
+        {'Core': [('BIOL1020', 3, True), ('BIOL3XXX', 3, True)], 'Electives': [('ELEC3XXX', 4, False)]}
+    )
+    return catalog.plan('TEST')
+
+
+def test_plan_flattens_sections_into_slots():
+    plan = small_plan()
+    assert len(plan) == 3
+    assert plan.row_ids == ('Core_0', 'Core_1', 'Electives_0')
+    assert plan.row_index == {'Core_0': 0, 'Core_1': 1, 'Electives_0': 2}
+    assert list(plan.section_index) == [0, 0, 1]
+    assert [section.slots() for section in plan.sections] == [range(0, 2), range(2, 3)]
+    assert plan.sections[0].title == 'Core (Required: 6 credits)'
+    assert list(plan.placeholder) == [0, 1, 1]
+    assert list(plan.required) == [1, 1, 0]
+    assert list(plan.default_credits) == [3, 3, 4]
+    assert plan.names == ('Diversity of Life I', CUSTOM_COURSE_NAME, CUSTOM_COURSE_NAME)
+    # Placeholder slots start out empty
+    assert plan.default_codes == ('BIOL1020', '', '')
+    assert plan.default_entry(2) == {'code': '', 'credits': 4, 'grade': 0, 'status': 'Not Taken'}
+
+
+def test_slot_index_lists_the_most_specific_slots_first():
+    plan = small_plan()
+    assert plan.slot_index.candidate_slots('BIOL1020') == (0,)
+    assert plan.slot_index.candidate_slots('BIOL3105') == (1, 2)
+    assert plan.slot_index.candidate_slots('CHEM3100') == (2,)
+    assert plan.slot_index.candidate_slots('CHEM2100') == ()
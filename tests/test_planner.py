@@ -0,0 +1,115 @@
+import pytest
+
+from conftest import course, make_catalog
+
+import advisee_planner
+from advisee_grading import DEFAULT_SCALE
+from advisee_planner import current_term, parse_term, plan_graduation, select_courses, term_label
+
+START = current_term('Fall', '2026')
+
+
+def plan(catalog, graduation='Spring 2027', course_entries=None, **options):
+    return plan_graduation(catalog, 'TEST', course_entries or {}, START, parse_term(graduation), **options)
+
+
+def elective_catalog(**courses):
+    return make_catalog(courses, {'Electives': [('ELEC2XXX', 3, True)]})
+
+
+def test_terms():
+    assert term_label(parse_term('spring 2028')) == 'Spring 2028'
+    assert current_term('Spring', '2026/2027') == parse_term('Spring 2027')
+    with pytest.raises(ValueError):
+        parse_term('2028')
+
+
+def test_a_wildcard_takes_the_candidate_that_fits_the_terms():
+    # The heuristic's choice, AAAA2000, only runs in the fall
+    catalog = elective_catalog(AAAA2000=course('A', level=2, offered=['Fall']),
+                               BBBB2000=course('B', level=2, offered=['Spring']))
+    assert [c.code for c in next(select_courses(catalog, catalog.plan('TEST'), [0], set(), ('Fall', 'Spring')))] == ['AAAA2000']
+
+    result = plan(catalog)
+    assert result.feasible is True
+    assert [(row['term'], row['code'], row['requirement']) for row in result.rows()] == [
+        ('Spring 2027', 'BBBB2000', 'Electives: ELEC2XXX')]
+
+
+def test_no_schedule_for_any_choice_is_infeasible():
+    catalog = elective_catalog(AAAA2000=course('A', level=2, offered=['Fall']),
+                               BBBB2000=course('B', level=2, offered=['Spring'], prerequisites=['CCCC1000']),
+                               CCCC1000=course('C', offered=['Spring']))
+    result = plan(catalog)
+    assert result.feasible is False
+    assert result.reason.endswith("no other choice of electives fits either (2 tried)")
+
+
+def test_too_many_choices_are_undecided(monkeypatch):
+    monkeypatch.setattr(advisee_planner, 'MAX_SELECTIONS', 1)
+    catalog = elective_catalog(AAAA2000=course('A', level=2, offered=['Fall']),
+                               BBBB2000=course('B', level=2, offered=['Spring']))
+    result = plan(catalog)
+    assert result.feasible is None and result.reason is None
+
+
+def test_a_plan_infeasible_whatever_the_electives_is_proved_so_once():
+    catalog = make_catalog({
+        'BIOL1020': course('Intro', offered=['Fall']),
+        'AAAA2000': course('A', level=2, offered=['Spring']),
+        'BBBB2000': course('B', level=2, offered=['Spring'])
+    }, {'Core': [('BIOL1020', 3, True)], 'Electives': [('ELEC2XXX', 3, True), ('ELEC2XXX', 3, True)]})
+    result = plan(catalog)
+    assert result.feasible is False
+    assert 'BIOL1020' in result.reason and 'choice of electives' not in result.reason
+
+
+def test_courses_alike_are_one_choice():
+    catalog = elective_catalog(**{f'AAAA20{i:02}': course('A', level=2, offered=['Fall']) for i in range(10)},
+                               BBBB2000=course('B', level=2, offered=['Fall'], credits=4),
+                               CCCC2000=course('C', level=2, offered=['Fall', 'Spring']))
+    choices = select_courses(catalog, catalog.plan('TEST'), [0], set(), ('Fall', 'Spring'))
+    # AAAA20xx and BBBB2000 only run in the fall, so CCCC2000 fits wherever they do
+    assert [[c.code for c in courses] for courses in choices] == [['CCCC2000']]
+
+
+def test_a_needed_prerequisite_fills_a_wildcard():
+    catalog = make_catalog({
+        'BIOL3000': course('Advanced', level=3, prerequisites=['BIOL2000']),
+        'BIOL2000': course('Intermediate', level=2),
+        'AAAA2000': course('A', level=2)
+    }, {'Core': [('BIOL3000', 3, True)], 'Electives': [('ELEC2XXX', 3, True)]})
+    result = plan(catalog, 'Fall 2027')
+    assert result.feasible is True
+    assert [(row['term'], row['code'], row['requirement']) for row in result.rows()] == [
+        ('Spring 2027', 'BIOL2000', 'Electives: ELEC2XXX'), ('Fall 2027', 'BIOL3000', 'Core: BIOL3000')]
+
+
+def test_passed_courses_are_not_planned_again():
+    catalog = make_catalog({'BIOL1020': course('Intro', offered=['Fall'])}, {'Core': [('BIOL1020', 3, True)]})
+    entries = {'Core_0': {'code': 'BIOL1020', 'credits': 3, 'grade': DEFAULT_SCALE.encode('B'), 'status': 'Completed'}}
+    result = plan(catalog, course_entries=entries)
+    assert result.feasible is True and result.courses == []
+
+
+def test_the_planner_page_names_a_prerequisite_cycle(tmp_path, monkeypatch):
+    import json
+
+    from advisee_catalog import DEFAULT_CATALOG_PATH
+    from test_app import BIOL, app
+
+    with open(DEFAULT_CATALOG_PATH, encoding='utf-8') as f:
+        data = json.load(f)
+    data['course_data']['BIOL1020']['prerequisites'] = ['BIOL1025']
+    data['course_data']['BIOL1025']['prerequisites'] = ['BIOL1020']
+    path = tmp_path / 'catalog.json'
+    path.write_text(json.dumps(data))
+    monkeypatch.setenv('ADVISEE_CATALOG_PATH', str(path))
+
+    at = app(planner_mode=True)
+    at.selectbox(key='major_select').set_value(BIOL).run()
+    [graduation] = [widget for widget in at.text_input if widget.label == "Expected Graduation"]
+    graduation.set_value('Spring 2030').run()
+    assert not at.exception
+    [error] = at.error
+    assert 'prerequisite cycle among BIOL1020, BIOL1025' in error.value
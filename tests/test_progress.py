@@ -0,0 +1,100 @@
+import random
+
+import pytest
+
+from advisee_progress import (ProgressAccumulator, audit_record, audit_summary, counted_courses, entry_contribution,
+                              progress_standing, section_figures)
+from advisee_store import encode_entries
+
+
+def test_incremental_updates_match_a_rebuild(catalog):
+    plan, scale = catalog.plan('BIOL'), catalog.grading_scale
+    rng = random.Random(4)
+    totals = ProgressAccumulator(plan, scale)
+    course_entries = {}
+    for _ in range(500):
+        slot = rng.randrange(len(plan))
+        entry = dict(plan.default_entry(slot), grade=rng.randrange(len(scale)),
+                     status=rng.choice(['Completed', 'In Progress', 'Not Taken']), credits=rng.randrange(7))
+        course_entries[plan.row_ids[slot]] = entry
+        totals.update(slot, entry)
+
+    rebuilt = ProgressAccumulator(plan, scale)
+    rebuilt.rebuild(course_entries)
+    assert totals.section_credits == rebuilt.section_credits
+    assert totals.section_gpa_credits == rebuilt.section_gpa_credits
+    assert totals.overall_credits == rebuilt.overall_credits
+    for s in range(len(plan.sections)):
+        assert abs(totals.section_qp[s] - rebuilt.section_qp[s]) < 1e-9
+
+
+def test_an_emptied_section_has_no_negative_gpa(catalog):
+    plan, scale = catalog.plan('BIOL'), catalog.grading_scale
+    totals = ProgressAccumulator(plan, scale)
+    for grade in ('A-', 'B+', 'C-'):
+        totals.update(0, dict(plan.default_entry(0), grade=scale.encode(grade), status='Completed'))
+    totals.update(0, plan.default_entry(0))
+    assert totals.section_qp[0] == 0.0
+    assert f"{totals.section_gpa(0):.2f}" == '0.00'
+
+
+def test_only_graded_completed_courses_count(catalog):
+    scale = catalog.grading_scale
+    assert entry_contribution({'credits': 3, 'grade': scale.encode('A'), 'status': 'In Progress'}, scale) == (0, 0, 0.0)
+    assert entry_contribution({'credits': 3, 'grade': 0, 'status': 'Completed'}, scale) == (0, 0, 0.0)
+    assert entry_contribution({'credits': 3, 'grade': scale.encode('A'), 'status': 'Completed'}, scale) == (3, 3, 12.0)
+
+
+def test_summary_standing(catalog):
+    plan = catalog.plan('BIOL')
+    summary = audit_summary(plan, [(24, 24, 96.0), (30, 30, 90.0), (18, 18, 54.0)])
+    assert summary['overall_credits'] == 72
+    assert summary['overall_gpa'] == 240.0 / 72
+    assert summary['standing'] == 'almost'
+    assert progress_standing(50) == 'in_progress'
+    assert progress_standing(100) == 'complete'
+
+
+def random_entries(plan, scale, rng):
+    return {plan.row_ids[slot]: dict(plan.default_entry(slot), grade=rng.randrange(len(scale)),
+                                     status=rng.choice(['Completed', 'In Progress', 'Not Taken']), credits=rng.randrange(7))
+            for slot in rng.sample(range(len(plan)), len(plan) // 2)}
+
+
+def test_audit_record_matches_the_running_totals(catalog):
+    plan, scale = catalog.plan('BIOL'), catalog.grading_scale
+    rng = random.Random(7)
+    for _ in range(50):
+        course_entries = random_entries(plan, scale, rng)
+        totals = ProgressAccumulator(plan, scale)
+        totals.rebuild(course_entries)
+        expected = totals.summary()
+        # Stored letter grades and session grade codes give the same figures
+        for entries in (encode_entries(course_entries, scale), course_entries):
+            summary = audit_record(catalog, {'current_major': 'BIOL', 'course_entries': entries})
+            assert {key: summary[key] for key in expected} == expected
+
+
+def test_counted_courses_keep_completed_graded_courses_in_slot_order(catalog):
+    plan, scale = catalog.plan('BIOL'), catalog.grading_scale
+    course_entries = {
+        plan.row_ids[2]: {'code': 'BIOC1015', 'credits': 3, 'grade': 'B', 'status': 'Completed'},
+        plan.row_ids[0]: {'code': 'BIOL1020', 'credits': 3, 'grade': scale.encode('A'), 'status': 'Completed'},
+        plan.row_ids[1]: {'code': 'BIOL1025', 'credits': 3, 'grade': 'A', 'status': 'In Progress'},
+        plan.row_ids[3]: {'code': 'CHEM1010', 'credits': 3, 'grade': '', 'status': 'Completed'},
+        'Not a row': {'code': 'BIOL9999', 'credits': 3, 'grade': 'A', 'status': 'Completed'}
+    }
+    sections = counted_courses(plan, course_entries, scale)
+    assert sections[0] == [(0, 'BIOL1020', 3, scale.encode('A')), (2, 'BIOC1015', 3, scale.encode('B'))]
+    assert sections[1:] == [[]] * (len(plan.sections) - 1)
+    assert section_figures(sections[0], scale) == (6, 6, 21.0)
+
+
+@pytest.mark.parametrize('grade', [-1, 99])
+def test_grade_codes_off_the_scale_are_rejected(catalog, grade):
+    plan, scale = catalog.plan('BIOL'), catalog.grading_scale
+    entry = {'code': 'BIOL1020', 'credits': 3, 'grade': grade, 'status': 'Completed'}
+    with pytest.raises(ValueError, match='not on the grading scale'):
+        counted_courses(plan, {plan.row_ids[0]: entry}, scale)
+    with pytest.raises(ValueError, match='not on the grading scale'):
+        section_figures([(0, 'BIOL1020', 3, grade)], scale)
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from advisee_catalog import DEFAULT_CATALOG_PATH
+from advisee_progress import validate_record
+from advisee_service import AuditService
+from advisee_store import MatrixStore
+
+
+def record(grade='A', credits=3, status='Completed', student_id='S1'):
+    return {
+        'student_id': student_id,
+        'current_major': 'BIOL',
+        'student_info': {'student_id': student_id},
+        'course_entries': {'Level 1 Courses_0': {'code': 'BIOL1020', 'credits': credits, 'grade': grade, 'status': status}}
+    }
+
+
+@pytest.fixture
+def call(tmp_path):
+    """call(method, path, json=None) -> (status, body) against a single-threaded service"""
+    db_file = str(tmp_path / 'service.db')
+    store = MatrixStore(db_file, flush_interval=0)
+    store.save('S1', record())
+    store.close()
+
+    def call(method, path, json=None):
+        async def request():
+            service = AuditService(workers=0, catalog_file=DEFAULT_CATALOG_PATH, db_file=db_file)
+            async with TestClient(TestServer(service.make_app())) as client:
+                response = await client.request(method, path, json=json)
+                body = await (response.json() if response.content_type == 'application/json' else response.text())
+                return response.status, body
+        return asyncio.run(request())
+    return call
+
+
+def test_a_saved_matrix_is_audited(call):
+    status, body = call('GET', '/students/S1/audit')
+    assert status == 200
+    assert (body['student_id'], body['overall_credits'], body['overall_gpa']) == ('S1', 3, 4.0)
+    assert call('GET', '/students/S9/audit')[0] == 404
+
+
+@pytest.mark.parametrize('bad, error', [
+    (record(grade=99), "grade 99 is not on the grading scale"),
+    (record(grade=-1), "grade -1 is not on the grading scale"),
+    (record(grade='Z'), "grade 'Z' is not on the grading scale"),
+    (record(credits=70000), "credits 70000 is not a whole number from 0 to 6"),
+    (record(credits='3'), "credits '3' is not a whole number"),
+    (record(status='Done'), "status 'Done' is not one of"),
+    (dict(record(), course_entries={'Level 1 Courses_0': ['BIOL1020']}), "must be an object"),
+    (dict(record(), course_entries={'Level 1 Courses_0': {'code': 'BIOL1020'}}), "missing credits, grade, status"),
+    (dict(record(), course_entries=[]), "course_entries must be an object"),
+    (dict(record(), current_major='NOPE'), "unknown major 'NOPE'"),
+])
+def test_a_bad_record_is_answered_422(call, bad, error):
+    status, body = call('POST', '/audit', bad)
+    assert status == 422
+    assert error in body['error']
+
+
+def test_a_batch_audits_the_good_records_and_lists_the_bad(call):
+    status, body = call('POST', '/audit/batch', {
+        'student_ids': ['S1', 'S9'],
+        'records': [record(student_id='S2'), record(grade=99, student_id='S3'), record(credits=-1, student_id='S4')]
+    })
+    assert status == 200
+    assert [result['student_id'] for result in body['results']] == ['S1', 'S2']
+    assert [(error['student_id'], error['status']) for error in body['errors']] == [('S9', 404), ('S3', 422), ('S4', 422)]
+
+
+def test_malformed_batches_are_answered_400(call):
+    assert call('POST', '/audit/batch', {'records': ['S1']})[0] == 400
+    assert call('POST', '/audit/batch', {'student_ids': ['S1'], 'major': ['BIOL']})[0] == 400
+
+
+def test_validate_record_accepts_session_grade_codes():
+    validate_record(record(grade=2))
+    validate_record(record(grade=None, status='Not Taken'))
+    validate_record({'current_major': 'BIOL'})
+    with pytest.raises(ValueError):
+        validate_record(record(grade=True))
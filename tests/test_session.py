@@ -0,0 +1,174 @@
+import os
+
+import pytest
+
+import advisee_session
+from advisee_core import MAX_CREDITS
+from advisee_session import CourseEntries, RowLayout, SessionRegistry
+
+
+def layout():
+    return RowLayout({'TEST': {'requirements': [{'section': 'Core', 'courses': [{}, {}]}]}})
+
+
+def entry(code='BIOL1020', credits=3, grade=2, status='Completed'):
+    return {'code': code, 'credits': credits, 'grade': grade, 'status': status}
+
+
+def test_course_entries_read_back_like_dicts():
+    entries = CourseEntries(layout(), {'Core_0': entry(), 'Old_3': entry('CHEM1010')})
+    entries['Core_1'] = entry('INTERDISCIPLINARY4000', status='In Progress')
+    assert dict(entries['Core_0']) == entry()
+    assert entries['Core_1']['code'] == 'INTERDISCIPLINARY4000'
+    # Rows the layout does not know are kept as they are
+    assert entries['Old_3'] == entry('CHEM1010')
+    assert list(entries) == ['Core_0', 'Core_1', 'Old_3']
+
+    entries['Core_0']['grade'] = 5
+    assert entries['Core_0']['grade'] == 5
+    del entries['Core_1']
+    assert 'Core_1' not in entries
+    assert len(entries) == 2
+
+
+@pytest.mark.parametrize('credits', [70000, MAX_CREDITS + 1, -1, 'three'])
+def test_credits_out_of_range_are_rejected(credits):
+    entries = CourseEntries(layout())
+    with pytest.raises(ValueError):
+        entries['Core_0'] = entry(credits=credits)
+
+
+class Context:
+    """The parts of a script run context the registry reads"""
+
+    def __init__(self, session_id, state, fragment=False):
+        self.session_id = session_id
+        self.session_state = state
+        self.fragment_ids_this_run = ['fragment'] if fragment else []
+
+
+def spill(state):
+    if 'course_entries' not in state:
+        return None
+    return {'course_entries': state['course_entries']}, ['course_entries', 'code_Core_0']
+
+
+def registry(tmp_path, rerun=None):
+    return SessionRegistry(spill, ttl=0, spill_dir=str(tmp_path / 'spill'), rerun=rerun)
+
+
+def test_the_sweeper_only_marks_idle_sessions_and_asks_for_a_rerun(tmp_path):
+    reruns = []
+    sessions = registry(tmp_path, lambda session_id: reruns.append(session_id) or True)
+    state = {'course_entries': {'Core_0': entry()}, 'code_Core_0': 'BIOL1020', 'grid_mode': False}
+    with sessions.active(Context('s1', state)) as run:
+        assert not run.spilled and run.restored is None
+
+    assert sessions.sweep() == 1
+    assert reruns == ['s1']
+    # Session state is left to the session's own script thread
+    assert 'course_entries' in state
+    # Already asked
+    assert sessions.sweep() == 0
+
+    with sessions.active(Context('s1', state)) as run:
+        assert run.spilled
+    assert state == {'grid_mode': False}
+    assert len(os.listdir(tmp_path / 'spill')) == 1
+
+    with sessions.active(Context('s1', state)) as run:
+        assert run.restored == {'course_entries': {'Core_0': entry()}}
+    assert os.listdir(tmp_path / 'spill') == []
+    assert (sessions.spilled, sessions.restored) == (1, 1)
+
+
+def test_a_fragment_run_of_a_due_session_keeps_it(tmp_path):
+    sessions = registry(tmp_path)
+    state = {'course_entries': {'Core_0': entry()}}
+    with sessions.active(Context('s1', state)):
+        pass
+    sessions.sweep()
+    with sessions.active(Context('s1', state, fragment=True)) as run:
+        assert not run.spilled
+    with sessions.active(Context('s1', state)) as run:
+        assert not run.spilled
+    assert 'course_entries' in state
+
+
+def test_sessions_that_have_gone_are_forgotten(tmp_path):
+    sessions = registry(tmp_path, lambda session_id: False)
+    with sessions.active(Context('s1', {})):
+        pass
+    sessions.sweep()
+    assert sessions.sessions == {}
+
+
+@pytest.fixture
+def fresh_registry(monkeypatch):
+    monkeypatch.setattr(advisee_session, '_registry', None)
+    yield
+    if advisee_session._registry is not None:
+        advisee_session._registry.close()
+
+
+def test_an_idle_app_session_pauses_and_resumes(fresh_registry):
+    from test_app import BIOL, app, metrics
+
+    at = app()
+    at.selectbox(key='major_select').set_value(BIOL).run()
+    at.selectbox(key='status_Level 1 Courses_0').set_value('Completed').run()
+    at.selectbox(key='grade_Level 1 Courses_0').set_value(2).run()
+    assert metrics(at)[-2:] == ['3/90', '4.00']
+
+    advisee_session._registry.sweep()
+    at.run()
+    assert not at.exception
+    assert 'course_entries' not in at.session_state
+    assert [button.label for button in at.button] == ['Resume']
+
+    at.button[0].click().run()
+    assert not at.exception
+    assert metrics(at)[-2:] == ['3/90', '4.00']
+    assert at.selectbox(key='grade_Level 1 Courses_0').value == 2
+
+
+class Stub:
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
+
+
+def stub_runtime(monkeypatch, runtime):
+    from streamlit.runtime import Runtime
+
+    monkeypatch.setattr(Runtime, 'exists', staticmethod(lambda: True))
+    monkeypatch.setattr(Runtime, 'instance', staticmethod(lambda: runtime))
+
+
+def test_an_idle_session_is_asked_to_rerun_on_the_event_loop(monkeypatch):
+    from advisee_matrix_streamlit import rerun_session
+
+    calls = []
+    session = Stub(request_rerun=lambda request: calls.append(('rerun', request)))
+    eventloop = Stub(call_soon_threadsafe=lambda callback, *args: callback(*args))
+    infos = {'s1': Stub(session=session)}
+    stub_runtime(monkeypatch, Stub(_session_mgr=Stub(get_active_session_info=infos.get),
+                                   _get_async_objs=lambda: Stub(eventloop=eventloop)))
+    assert rerun_session('s1') is True
+    assert calls == [('rerun', None)]
+    assert rerun_session('gone') is False
+
+
+@pytest.mark.parametrize('runtime', [
+    Stub(),
+    Stub(_session_mgr=Stub(), _get_async_objs=lambda: Stub()),
+    Stub(_session_mgr=Stub(get_active_session_info=lambda session_id: Stub(session=Stub(request_rerun=print))),
+         _get_async_objs=lambda: Stub()),
+    Stub(_session_mgr=Stub(get_active_session_info=lambda session_id: Stub()),
+         _get_async_objs=lambda: Stub(eventloop=Stub())),
+], ids=['no-internals', 'no-session-info', 'no-eventloop', 'no-session'])
+def test_without_the_runtime_internals_a_session_waits_for_its_next_rerun(monkeypatch, runtime):
+    from advisee_matrix_streamlit import rerun_session
+
+    stub_runtime(monkeypatch, runtime)
+    # Kept due, to be spilled when it next runs
+    assert rerun_session('s1') is True
@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from advisee_catalog import DEFAULT_CATALOG_PATH, load_catalog
+from advisee_snapshot import build_snapshot, load_snapshot, main
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    path = tmp_path / 'catalog.snapshot'
+    build_snapshot(DEFAULT_CATALOG_PATH, str(path))
+    return str(path)
+
+
+def test_a_snapshot_is_the_same_catalog(catalog, snapshot):
+    mapped = load_catalog(snapshot)
+    assert mapped.version == catalog.version
+    assert list(mapped.course_data) == sorted(catalog.course_data)
+    for code, course in catalog.course_data.items():
+        assert mapped.course_data[code] == course
+    assert mapped.major_requirements == catalog.major_requirements
+    for major_key in catalog.major_requirements:
+        assert mapped.plan(major_key).row_ids == catalog.plan(major_key).row_ids
+        for slot_code in catalog.plan(major_key).codes:
+            assert tuple(mapped.course_index().resolve(slot_code)) == catalog.course_index().resolve(slot_code)
+
+
+def test_snapshot_course_data_is_read_only(snapshot):
+    course_data = load_snapshot(snapshot).course_data
+    code = next(iter(course_data))
+    with pytest.raises(TypeError):
+        course_data[code]['credits'] = 9
+    assert 'NOPE1000' not in course_data
+    with pytest.raises(KeyError):
+        course_data['NOPE1000']
+
+
+def test_sections_are_aligned(snapshot):
+    with open(snapshot, 'rb') as f:
+        raw = f.read()
+    header_length = int.from_bytes(raw[8:12], 'little')
+    header = json.loads(raw[12:12 + header_length])
+    assert (12 + header_length) % 8 == 0
+    assert all(offset % 8 == 0 for offset, _ in header['sections'].values())
+
+
+def test_other_files_are_not_snapshots(tmp_path):
+    path = tmp_path / 'other.bin'
+    path.write_bytes(b'NOTASNAP' + bytes(16))
+    with pytest.raises(ValueError, match='not a catalog snapshot'):
+        load_snapshot(str(path))
+
+
+def test_cli_writes_beside_the_catalog(tmp_path):
+    source = tmp_path / 'catalog.json'
+    with open(DEFAULT_CATALOG_PATH, encoding='utf-8') as f:
+        source.write_text(f.read())
+    assert main([str(source)]) == 0
+    assert load_catalog(str(tmp_path / 'catalog.snapshot')).version == load_catalog(str(source)).version
+
+
+def test_the_app_runs_on_a_snapshot(snapshot, monkeypatch):
+    from test_app import BIOL, app, metrics
+
+    monkeypatch.setenv('ADVISEE_CATALOG_PATH', snapshot)
+    at = app()
+    at.selectbox(key='major_select').set_value(BIOL).run()
+    at.selectbox(key='status_Level 1 Courses_0').set_value('Completed').run()
+    at.selectbox(key='grade_Level 1 Courses_0').set_value(2).run()
+    assert not at.exception
+    assert metrics(at)[-2:] == ['3/90', '4.00']
@@ -0,0 +1,113 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from advisee_grading import DEFAULT_SCALE
+from advisee_store import MatrixStore, decode_entries, encode_entries
+
+RECORD = {
+    'student_info': {'student_id': 'S1', 'first_name': 'Ada'},
+    'current_major': 'BIOL',
+    'course_entries': {'Level 1 Courses_0': {'code': 'BIOL1020', 'credits': 3, 'grade': 'A', 'status': 'Completed'}}
+}
+
+
+def test_saved_matrices_round_trip(store):
+    assert store.load('S1') is None
+    store.save('S1', RECORD)
+    record = store.load('S1')
+    assert record['current_major'] == 'BIOL'
+    assert record['student_info'] == RECORD['student_info']
+    assert record['course_entries'] == RECORD['course_entries']
+
+
+def test_write_behind_coalesces_saves_into_one_batch(tmp_path):
+    store = MatrixStore(str(tmp_path / 'matrices.db'), flush_interval=1)
+    try:
+        for grade in ('C', 'B', 'A'):
+            entries = {'Level 1 Courses_0': dict(RECORD['course_entries']['Level 1 Courses_0'], grade=grade)}
+            store.save('S1', dict(RECORD, course_entries=entries))
+        # Pending saves are read back before they are written
+        assert store.load('S1')['course_entries']['Level 1 Courses_0']['grade'] == 'A'
+        assert store.rows_written == 0
+        store.flush()
+        assert (store.batches_written, store.rows_written) == (1, 1)
+    finally:
+        store.close()
+
+    reopened = MatrixStore(str(tmp_path / 'matrices.db'), flush_interval=0)
+    assert reopened.load('S1')['course_entries']['Level 1 Courses_0']['grade'] == 'A'
+    reopened.close()
+
+
+def with_grade(grade):
+    return dict(RECORD, course_entries={
+        'Level 1 Courses_0': dict(RECORD['course_entries']['Level 1 Courses_0'], grade=grade)})
+
+
+def test_a_failed_flush_keeps_its_rows_pending(tmp_path, monkeypatch):
+    store = MatrixStore(str(tmp_path / 'matrices.db'), flush_interval=60)
+    write = store._write
+
+    def locked(rows):
+        # A newer save arrives while the batch is being written
+        store.save('S1', with_grade('A'))
+        raise sqlite3.OperationalError('database is locked')
+
+    try:
+        store.save('S1', with_grade('C'))
+        store.save('S2', with_grade('B'))
+        monkeypatch.setattr(store, '_write', locked)
+        with pytest.raises(sqlite3.OperationalError):
+            store.flush()
+        monkeypatch.setattr(store, '_write', write)
+        store.flush()
+        assert store.rows_written == 2
+    finally:
+        # The flush thread sleeps out its minute; close() would wait for it
+        store._closed = True
+        store.pool.close()
+
+    reopened = MatrixStore(str(tmp_path / 'matrices.db'), flush_interval=0)
+    # The failed batch reached disk without overwriting the newer save
+    assert reopened.load('S1')['course_entries']['Level 1 Courses_0']['grade'] == 'A'
+    assert reopened.load('S2')['course_entries']['Level 1 Courses_0']['grade'] == 'B'
+    reopened.close()
+
+
+def test_the_flush_thread_survives_a_failed_write(tmp_path, monkeypatch, caplog):
+    store = MatrixStore(str(tmp_path / 'matrices.db'), flush_interval=0.01)
+    write, written = store._write, threading.Event()
+
+    def locked_once(rows):
+        monkeypatch.setattr(store, '_write', lambda rows: write(rows) or written.set())
+        raise sqlite3.OperationalError('database is locked')
+
+    monkeypatch.setattr(store, '_write', locked_once)
+    try:
+        store.save('S1', RECORD)
+        assert written.wait(10)
+        assert store._flusher.is_alive()
+        assert 'database is locked' in caplog.text
+        assert store.load('S1')['student_info'] == RECORD['student_info']
+    finally:
+        store.close()
+
+
+def test_iter_records_streams_all_or_recent_matrices(store):
+    for student_id in ('S3', 'S1', 'S2'):
+        store.save(student_id, RECORD)
+    assert [record['student_id'] for record in store.iter_records(batch_size=2)] == ['S1', 'S2', 'S3']
+    since = time.time()
+    time.sleep(0.01)
+    store.save('S2', RECORD)
+    assert [record['student_id'] for record in store.iter_records(since=since)] == ['S2']
+
+
+def test_entries_are_stored_with_grade_letters():
+    entries = {'Level 1 Courses_0': {'code': 'BIOL1020', 'credits': 3, 'grade': DEFAULT_SCALE.encode('B+'), 'status': 'Completed'}}
+    stored = encode_entries(entries, DEFAULT_SCALE)
+    assert stored['Level 1 Courses_0']['grade'] == 'B+'
+    assert decode_entries(stored, DEFAULT_SCALE) == entries
@@ -0,0 +1,84 @@
+import random
+
+from conftest import course, make_major
+
+from advisee_catalog import Catalog
+from advisee_grading import DEFAULT_SCALE
+from advisee_whatif import EligibilityMatrix, earned_courses, greedy_is_exact, patterns_nest
+
+CODES = ('BIOL1020', 'BIOL1025', 'BIOL2100', 'BIOL2200', 'BIOL3105', 'BIOL3210', 'CHEM1010', 'CHEM2100', 'CHEM3110')
+
+
+def catalog():
+    course_data = {code: course(code, level=int(code[4])) for code in CODES}
+    return Catalog(course_data, {
+        # Nested slot patterns, all 3 credits: placed greedily
+        'BIO': make_major({
+            'Core': [('BIOL1020', 3, True), ('BIOL2XXX', 3, True), ('BIOL3XXX', 3, True)],
+            'Electives': [('ELEC2XXX', 3, False), ('ELEC3XXX', 3, False)]
+        }, name='Biology'),
+        # Mixed credits: re-matched exactly
+        'CHEM': make_major({
+            'Core': [('CHEM1010', 3, True), ('CHEMXXXX', 4, True)],
+            'Electives': [('ELEC1XXX', 3, False), ('ELEC3XXX', 3, False)]
+        }, name='Chemistry')
+    }, version='test')
+
+
+def taken(code, credits=3):
+    return {'code': code, 'credits': credits, 'grade': DEFAULT_SCALE.encode('A'), 'status': 'Completed'}
+
+
+def test_patterns_nest():
+    assert patterns_nest('BIOL3XXX', 'ELEC3XXX')
+    assert patterns_nest('BIOL3105', 'BIOL3XXX')
+    assert patterns_nest('BIOL2XXX', 'CHEM2XXX')
+    assert not patterns_nest('BIOL2XXX', 'ELEC21XX')
+
+
+def test_greedy_is_exact_only_for_nested_equal_credit_plans():
+    c = catalog()
+    assert greedy_is_exact(c.plan('BIO'))
+    assert not greedy_is_exact(c.plan('CHEM'))
+
+
+def test_evaluate_matches_an_exact_matching_for_every_major():
+    c = catalog()
+    matrix = EligibilityMatrix(c)
+    rng = random.Random(7)
+    for _ in range(50):
+        credits = rng.choice((3, 4))
+        courses = [taken(code, rng.choice((3, credits))) for code in rng.sample(CODES, rng.randint(0, len(CODES)))]
+        rows = {row['major']: row for row in matrix.evaluate(courses)}
+        for major_key in c.major_requirements:
+            satisfied, filled, used = matrix.exact(c.plan(major_key), courses)
+            row = rows[major_key]
+            assert (row['required_filled'], row['courses_used']) == (filled, used)
+            if credits == 3:
+                assert row['credits_satisfied'] == satisfied
+
+
+def test_rows_are_ranked_closest_to_graduating_first():
+    rows = EligibilityMatrix(catalog()).evaluate([taken('BIOL1020'), taken('BIOL2100'), taken('BIOL3105')])
+    assert [row['major'] for row in rows] == ['BIO', 'CHEM']
+    assert rows[0] == {
+        'major': 'BIO', 'name': 'Biology', 'credits_satisfied': 9, 'total_credits': 15, 'remaining_credits': 6,
+        'progress': 60.0, 'required_filled': 3, 'required_slots': 3, 'courses_used': 3
+    }
+
+
+def test_courses_outside_the_catalog_still_fit_wildcards():
+    rows = {row['major']: row for row in EligibilityMatrix(catalog()).evaluate([taken('PHYS3999')])}
+    assert rows['BIO']['courses_used'] == 1
+    assert rows['BIO']['credits_satisfied'] == 3
+
+
+def test_earned_courses_keeps_each_course_with_earned_credits_once():
+    entries = {
+        'a': taken('biol1020 '),
+        'b': taken('BIOL1020'),
+        'c': dict(taken('BIOL2100'), status='Not Taken'),
+        'd': dict(taken('BIOL3105'), grade=DEFAULT_SCALE.encode('')),
+        'e': taken('')
+    }
+    assert [course['code'] for course in earned_courses(entries, DEFAULT_SCALE)] == ['BIOL1020']